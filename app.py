@@ -1,12 +1,36 @@
-from flask import Flask, render_template, request, flash, redirect, url_for, jsonify, send_from_directory, session
+from flask import Flask, render_template, request, flash, redirect, url_for, jsonify, send_from_directory, session, Response, abort
 from flask_compress import Compress
+import click
+import gzip
 import os
 from datetime import datetime, timedelta
 import random
 import secrets
 import hashlib
+import sqlite3
+import time
+from flask.sessions import SecureCookieSessionInterface
 from database import (get_rental_items, get_package_items, get_team_members, get_site_settings, get_carousel_items,
                      db_manager)
+from cache import PageCache
+import carousel
+import content
+import errors
+import health
+import hints
+import images
+import inquiries
+import metrics
+from profiling import profiler
+import profiling
+import replication
+import resize
+import settings
+from sitemap import SitemapBuilder
+from audit import audit_assets
+import assets
+import backup
+from export import StaticExporter
 
 try:
     from dotenv import load_dotenv, find_dotenv  # type: ignore
@@ -20,6 +44,21 @@ except Exception:
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'glitzme-rentals-secret-key-2024')
 
+# The browser only sends the session cookie to /admin, and public responses never
+# set one, so public pages don't vary by visitor and shared caches can keep them
+ADMIN_PATH = '/admin'
+
+class AdminSessionInterface(SecureCookieSessionInterface):
+    """Cookie session for /admin only; public requests get an empty, read-only session"""
+
+    def open_session(self, app, request):
+        if not request.path.startswith(ADMIN_PATH):
+            return None  # Flask substitutes a NullSession, which is never saved
+        return super().open_session(app, request)
+
+app.config['SESSION_COOKIE_PATH'] = ADMIN_PATH
+app.session_interface = AdminSessionInterface()
+
 # Admin configuration
 # Read secrets from environment (use .env in development). No hardcoded defaults.
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD')
@@ -29,11 +68,29 @@ if not ADMIN_PASSWORD:
     )
 ADMIN_TOKEN_EXPIRY = 3600  # 1 hour in seconds
 
+# Public site configuration
+SITE_URL = os.environ.get('SITE_URL', 'https://glitzmerentals.com')
+ITEMS_PER_PAGE = 4  # rentals/packages listing page size (also used by the sitemap)
+# How long shared caches (CDN, proxy) may serve public HTML without asking us
+SHARED_CACHE_MAX_AGE = int(os.environ.get('SHARED_CACHE_MAX_AGE', 600))
+# Per-visitor or operational responses that must never land in a shared cache
+PRIVATE_PATHS = (ADMIN_PATH, '/health', '/metrics')
+
 # Template and loader behavior
-# Enable template auto-reload in development so edited templates reflect without full restarts
-app.config['TEMPLATES_AUTO_RELOAD'] = True
+# Enable template auto-reload in development so edited templates reflect without full restarts.
+# In production it stays off (None falls back to app.debug) so Jinja doesn't stat every template per render.
+IS_DEVELOPMENT = os.environ.get('FLASK_ENV', 'production') == 'development'
+app.config['TEMPLATES_AUTO_RELOAD'] = True if IS_DEVELOPMENT else None
 app.config['EXPLAIN_TEMPLATE_LOADING'] = False
 
+# Request instrumentation (/metrics). Registered before compression so it
+# runs after it and records the size actually sent.
+metrics.init_app(app, db_manager)
+profiling.init_app(app, db_manager)
+health.init_app(app, db_manager)
+# Read nodes of a replicated deployment send admin pages and form posts to the writer
+replication.init_app(app, db_manager)
+
 # Initialize gzip compression
 compress = Compress()
 compress.init_app(app)
@@ -86,8 +143,18 @@ def add_headers(response):
     )
     response.headers['Permissions-Policy'] = permissions
 
-    # Add caching headers for static files
-    if request.path.startswith('/static/'):
+    # Add caching headers for static files (error responses keep their own)
+    if response.status_code >= 400:
+        pass
+    elif request.path.startswith(f'{app.static_url_path}/{assets.BUILD_DIR}/'):
+        # Built assets have their content hash in the name
+        response.cache_control.max_age = 31536000
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.headers['Vary'] = 'Accept-Encoding'
+    elif request.path.startswith(f'{resize.URL_PREFIX}/'):
+        pass  # resized images set their own (immutable when the URL carries the source version)
+    elif request.path.startswith('/static/'):
         # Cache static files for 1 week
         response.cache_control.max_age = 604800  # 7 days in seconds
         response.cache_control.public = True
@@ -96,43 +163,66 @@ def add_headers(response):
         # Add expires header
         expires_date = datetime.utcnow() + timedelta(days=7)
         response.headers['Expires'] = expires_date.strftime('%a, %d %b %Y %H:%M:%S GMT')
+    elif request.path.startswith(PRIVATE_PATHS) or request.method not in ('GET', 'HEAD'):
+        response.cache_control.private = True
+        response.cache_control.no_store = True
     else:
-        # For HTML pages, shorter cache with revalidation
+        # Public pages are cookie-free, so proxies and CDNs may share them;
+        # browsers keep the shorter cache with revalidation
+        response.cache_control.public = True
         response.cache_control.max_age = 3600  # 1 hour
+        response.cache_control.s_maxage = SHARED_CACHE_MAX_AGE
         response.cache_control.must_revalidate = True
         response.headers['Vary'] = 'Accept-Encoding'
 
     # Add compression hints for better performance
     if response.content_type.startswith(('text/', 'application/javascript', 'application/json')):
         response.headers['Vary'] = 'Accept-Encoding'
+    
+    # Let the browser (or a CDN, as 103 Early Hints) start on the page's subresources
+    preload_hints.apply(request, response)
 
     return response
 
+# Editable copy blocks for templates: {% call content_block('about') %}built-in copy{% endcall %}
+content_blocks = content.init_app(app, db_manager)
+
+# Pruned per-page stylesheets with inline critical CSS, minified scripts (flask build-assets)
+site_assets = assets.init_app(app)
+
+# Catalog images scaled down for cards: /img/<width>/<path>, resized_url() / resized_srcset()
+resize.init_app(app)
+
+# Rendered pages, reused until the catalog changes or a scheduled carousel item starts/ends
+page_cache = PageCache(db_manager.cache.backend)
+
 @app.route('/')
 def index():
     """Homepage route"""
-    # Get dynamic content from database
-    team_members = get_team_members()
-    site_settings = get_site_settings()
-    carousel_items = get_carousel_items()
-    
-    return render_template('index.html', 
-                         team_members=team_members,
-                         site_settings=site_settings,
-                         carousel_items=carousel_items)
+    now = time.time()
+    version = db_manager.catalog_version()
+    html = page_cache.get('index', version, now)
+    if html is None:
+        # Get dynamic content from database
+        team_members = get_team_members()
+        site_settings = get_site_settings()
+        carousel_items, next_change = carousel.schedule(get_carousel_items(), now)
+        
+        html = render_template('index.html', 
+                             team_members=team_members,
+                             site_settings=site_settings,
+                             carousel_items=carousel_items)
+        page_cache.set('index', version, html, expires_at=next_change)
+    return html
 
 @app.route('/rentals', methods=['GET', 'POST'])
 def rentals():
     """Rentals page route with pagination"""
     # Get rental items from database
     rental_items = get_rental_items()
-    
-    # Convert database format to template format (add 'image' key for compatibility)
-    for item in rental_items:
-        item['image'] = item['image_path']
 
     # Pagination
-    items_per_page = 4
+    items_per_page = ITEMS_PER_PAGE
     total_items = len(rental_items)
     total_pages = (total_items + items_per_page - 1) // items_per_page  # Ceiling division
 
@@ -160,13 +250,9 @@ def packages():
     """Packages page route with pagination"""
     # Get package items from database
     package_items = get_package_items()
-    
-    # Convert database format to template format (add 'image' key for compatibility)
-    for item in package_items:
-        item['image'] = item['image_path']
 
     # Pagination
-    items_per_page = 4
+    items_per_page = ITEMS_PER_PAGE
     total_items = len(package_items)
     total_pages = (total_items + items_per_page - 1) // items_per_page  # Ceiling division
 
@@ -189,6 +275,22 @@ def packages():
                          current_page=current_page,
                          total_pages=total_pages)
 
+@app.route('/rentals/<int:item_id>')
+def rental_detail(item_id):
+    """Single rental item page"""
+    item = db_manager.get_rental_item(item_id)
+    if not item or not item.is_active:
+        abort(404)
+    return render_template('item_detail.html', item=item, kind='rental', site_url=SITE_URL)
+
+@app.route('/packages/<int:item_id>')
+def package_detail(item_id):
+    """Single package page"""
+    item = db_manager.get_package_item(item_id)
+    if not item or not item.is_active:
+        abort(404)
+    return render_template('item_detail.html', item=item, kind='package', site_url=SITE_URL)
+
 @app.route('/about')
 def about():
     """About page route"""
@@ -208,76 +310,44 @@ def gallery():
 
 @app.route('/contact')
 def contact_page():
-    """Contact page route"""
-    return render_template('contact.html')
+    """Contact page route (?inquiry=<token> shows the result of a submission)"""
+    feedback = inquiries.feedback(request.args.get('inquiry'))
+    return render_template('contact.html', feedback=feedback)
 
 @app.route('/contact/submit', methods=['POST'])
 def contact_submit():
-    """Handle contact form submissions"""
-    # Get form data
-    name = request.form.get('name', '').strip()
-    email = request.form.get('email', '').strip()
-    phone = request.form.get('phone', '').strip()
-    event_date = request.form.get('event_date', '').strip()
-    event_type = request.form.get('event_type', '').strip()
-    message = request.form.get('message', '').strip()
-    
-    # Basic validation
-    if not name or not email or not message:
-        flash('Please fill in all required fields (Name, Email, and Message).', 'error')
-        return redirect(url_for('contact_page'))
-    
-    # For now, we'll just show a success message
-    flash('Thank you for your inquiry! We will contact you within 24 hours to discuss your event needs.', 'success')
-    
-    return redirect(url_for('contact_page'))
-
-@app.route('/sitemap.xml')
-def sitemap():
-    """Generate sitemap for SEO"""
-    from flask import Response
-    
-    sitemap_xml = '''<?xml version="1.0" encoding="UTF-8"?>
-<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
-    <url>
-        <loc>https://glitzmerentals.com/</loc>
-        <lastmod>{}</lastmod>
-        <changefreq>weekly</changefreq>
-        <priority>1.0</priority>
-    </url>
-    <url>
-        <loc>https://glitzmerentals.com/rentals</loc>
-        <lastmod>{}</lastmod>
-        <changefreq>weekly</changefreq>
-        <priority>0.8</priority>
-    </url>
-    <url>
-        <loc>https://glitzmerentals.com/packages</loc>
-        <lastmod>{}</lastmod>
-        <changefreq>weekly</changefreq>
-        <priority>0.8</priority>
-    </url>
-    <url>
-        <loc>https://glitzmerentals.com/about</loc>
-        <lastmod>{}</lastmod>
-        <changefreq>monthly</changefreq>
-        <priority>0.6</priority>
-    </url>
-    <url>
-        <loc>https://glitzmerentals.com/gallery</loc>
-        <lastmod>{}</lastmod>
-        <changefreq>weekly</changefreq>
-        <priority>0.7</priority>
-    </url>
-    <url>
-        <loc>https://glitzmerentals.com/contact</loc>
-        <lastmod>{}</lastmod>
-        <changefreq>monthly</changefreq>
-        <priority>0.5</priority>
-    </url>
-</urlset>'''.format(*([datetime.now().strftime('%Y-%m-%d')] * 6))
-    
-    return Response(sitemap_xml, mimetype='application/xml')
+    """Handle contact form submissions (asgi.py serves this natively in ASGI mode)"""
+    fields, error = inquiries.parse(request.form)
+    if error:
+        return redirect(url_for('contact_page', inquiry=error))
+    
+    db_manager.add_inquiry(**fields)
+    return redirect(url_for('contact_page', inquiry=inquiries.SENT))
+
+sitemaps = SitemapBuilder(db_manager, base_url=SITE_URL, items_per_page=ITEMS_PER_PAGE,
+                          template_folder=os.path.join(app.root_path, app.template_folder),
+                          static_folder=app.static_folder)
+
+@app.route('/sitemap.xml', defaults={'number': None})
+@app.route('/sitemap-<int:number>.xml')
+def sitemap(number):
+    """Serve the sitemap (or one chunk of it) from the per-catalog-version cache"""
+    document = sitemaps.get('sitemap.xml' if number is None else f'sitemap-{number}.xml')
+    if document is None:
+        return Response('Not found', status=404, mimetype='text/plain')
+    body, digest = document
+    
+    if request.if_none_match.contains_weak(digest):
+        response = Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        # Already compressed once per catalog version; Flask-Compress skips encoded responses
+        response = Response(body, mimetype='application/xml')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(gzip.decompress(body), mimetype='application/xml')
+    # Weak: the same ETag covers the gzip and identity representations
+    response.set_etag(digest, weak=True)
+    return response
 
 @app.route('/robots.txt')
 def robots():
@@ -286,28 +356,27 @@ def robots():
 
 @app.route('/health')
 def health_check():
-    """Health check endpoint for monitoring"""
+    """Health check endpoint for monitoring (liveness only; see /health/ready)"""
     return jsonify({
         'status': 'healthy',
         'service': 'GlitzME Rentals',
         'timestamp': datetime.now().isoformat()
     })
 
-@app.errorhandler(404)
-def not_found(error):
-    """Handle 404 errors"""
-    return redirect(url_for('index'))
+# 404s: legacy redirect map, tiny body for static/probe misses, cached HTML page otherwise
+not_found_handler = errors.init_app(app)
 
 # AUTHENTICATION HELPERS
 def generate_admin_token():
     """Generate a secure token for admin access"""
     return secrets.token_urlsafe(32)
 
-def is_admin_authenticated():
-    """Check if current session is authenticated as admin"""
-    return session.get('admin_authenticated') == True and \
-           session.get('admin_token') and \
-           session.get('admin_expires', 0) > datetime.now().timestamp()
+def is_admin_authenticated(data=None):
+    """Check if current session (or decoded session data, see asgi.py) is authenticated as admin"""
+    data = session if data is None else data
+    return data.get('admin_authenticated') == True and \
+           data.get('admin_token') and \
+           data.get('admin_expires', 0) > datetime.now().timestamp()
 
 def require_admin_auth(f):
     """Decorator to require admin authentication"""
@@ -348,23 +417,19 @@ def admin_logout():
     session.pop('admin_authenticated', None)
     session.pop('admin_token', None)
     session.pop('admin_expires', None)
+    # Flashes live in the /admin-scoped session, so show this one on the login page
     flash('Successfully logged out of admin area.', 'success')
-    return redirect(url_for('index'))
+    return redirect(url_for('admin_login'))
 
 # ADMIN ROUTES
 @app.route('/admin')
 @require_admin_auth
 def admin_dashboard():
     """Admin dashboard homepage"""
-    # Get counts for dashboard overview
-    rental_count = len(get_rental_items(active_only=False))
-    package_count = len(get_package_items(active_only=False))
-    team_count = len(get_team_members(active_only=False))
+    # Counts for the overview tiles (catalog counts cached per catalog version)
+    stats = db_manager.get_dashboard_stats()
     
-    return render_template('admin/dashboard.html',
-                         rental_count=rental_count,
-                         package_count=package_count,
-                         team_count=team_count)
+    return render_template('admin/dashboard.html', stats=stats)
 
 # Friendly aliases to prevent accidental 404s (e.g., trailing slash or pluralization)
 @app.route('/admin/')
@@ -605,6 +670,129 @@ def admin_team_delete(member_id):
         flash('Error deleting team member.', 'error')
     return redirect(url_for('admin_team'))
 
+@app.route('/admin/carousel')
+@require_admin_auth
+def admin_carousel():
+    """Admin page for managing homepage carousel items"""
+    now = time.time()
+    items = [(item, carousel.status(item, now)) for item in get_carousel_items(active_only=False)]
+    return render_template('admin/carousel.html', items=items, to_form=carousel.to_form)
+
+def _carousel_form_fields():
+    """Validated carousel fields from the submitted form, or None after flashing an error"""
+    fields = {
+        'title': request.form.get('title', '').strip(),
+        'image_path': request.form.get('image_path', '').strip(),
+        'mobile_image_path': request.form.get('mobile_image_path', '').strip() or None,
+        'alt_text': request.form.get('alt_text', '').strip(),
+        'link_url': request.form.get('link_url', '').strip() or None,
+        'link_text': request.form.get('link_text', '').strip() or None,
+        'display_order': request.form.get('display_order', 0, type=int),
+    }
+    if not (fields['title'] and fields['image_path'] and fields['alt_text']):
+        flash('Please fill in all required fields (Title, Image Path, Alt Text).', 'error')
+        return None
+    try:
+        fields['starts_at'] = carousel.from_form(request.form.get('starts_at', '').strip())
+        fields['ends_at'] = carousel.from_form(request.form.get('ends_at', '').strip())
+    except ValueError:
+        flash('Start and end must be valid dates and times.', 'error')
+        return None
+    if fields['starts_at'] and fields['ends_at'] and fields['ends_at'] <= fields['starts_at']:
+        flash('The end time must be after the start time.', 'error')
+        return None
+    return fields
+
+@app.route('/admin/carousel/add', methods=['GET', 'POST'])
+@require_admin_auth
+def admin_carousel_add():
+    """Add new carousel item"""
+    if request.method == 'POST':
+        fields = _carousel_form_fields()
+        if fields:
+            db_manager.add_carousel_item(**fields)
+            flash('Carousel item added successfully!', 'success')
+            return redirect(url_for('admin_carousel'))
+    
+    return render_template('admin/carousel_form.html', item=None, action='Add', to_form=carousel.to_form)
+
+@app.route('/admin/carousel/<int:item_id>/edit', methods=['GET', 'POST'])
+@require_admin_auth
+def admin_carousel_edit(item_id):
+    """Edit carousel item"""
+    item = db_manager.get_carousel_item(item_id)
+    if not item:
+        flash('Carousel item not found.', 'error')
+        return redirect(url_for('admin_carousel'))
+    
+    if request.method == 'POST':
+        fields = _carousel_form_fields()
+        if fields:
+            db_manager.update_carousel_item(item_id, is_active=bool(request.form.get('is_active')), **fields)
+            flash('Carousel item updated successfully!', 'success')
+            return redirect(url_for('admin_carousel'))
+    
+    return render_template('admin/carousel_form.html', item=item, action='Edit', to_form=carousel.to_form)
+
+@app.route('/admin/carousel/<int:item_id>/delete', methods=['POST'])
+@require_admin_auth
+def admin_carousel_delete(item_id):
+    """Delete carousel item"""
+    if db_manager.delete_carousel_item(item_id):
+        flash('Carousel item deleted successfully!', 'success')
+    else:
+        flash('Error deleting carousel item.', 'error')
+    return redirect(url_for('admin_carousel'))
+
+@app.route('/admin/content')
+@require_admin_auth
+def admin_content():
+    """Admin page listing the editable content blocks"""
+    saved = db_manager.get_content_blocks()
+    blocks = []
+    for key, (page, label, content_type) in content.CONTENT_SLOTS.items():
+        blocks.append({'key': key, 'page': page, 'label': label, 'content_type': content_type,
+                       'saved': saved.pop(key, None)})
+    # Rows saved under keys no template uses (yet)
+    for key, row in saved.items():
+        blocks.append({'key': key, 'page': row['section_key'], 'label': key,
+                       'content_type': row['content_type'], 'saved': row})
+    return render_template('admin/content.html', blocks=blocks)
+
+@app.route('/admin/content/<key>', methods=['GET', 'POST'])
+@require_admin_auth
+def admin_content_edit(key):
+    """Edit a content block"""
+    saved = db_manager.get_content_blocks().get(key)
+    slot = content.CONTENT_SLOTS.get(key)
+    if slot is None and saved is None:
+        flash('Content block not found.', 'error')
+        return redirect(url_for('admin_content'))
+    page, label, content_type = slot or (saved['section_key'], key, saved['content_type'])
+    
+    if request.method == 'POST':
+        source = request.form.get('content', '').strip()
+        if not source:
+            flash('Content cannot be empty. Use "Restore built-in copy" to remove a block.', 'error')
+        else:
+            db_manager.save_content_block(key, page, source, content_type)
+            flash('Content block saved successfully!', 'success')
+            return redirect(url_for('admin_content'))
+    
+    return render_template('admin/content_form.html', key=key, page=page, label=label,
+                           content_type=content_type, saved=saved,
+                           preview=content.compile_block(saved['content'], content_type) if saved else None)
+
+@app.route('/admin/content/<key>/delete', methods=['POST'])
+@require_admin_auth
+def admin_content_delete(key):
+    """Delete a content block so the page shows its built-in copy again"""
+    if db_manager.delete_content_block(key):
+        flash('Content block removed; the page now shows its built-in copy.', 'success')
+    else:
+        flash('Error removing content block.', 'error')
+    return redirect(url_for('admin_content'))
+
 @app.route('/admin/api/images')
 @require_admin_auth
 def admin_api_images():
@@ -619,44 +807,366 @@ def admin_api_images():
         'static/Images/Logos/*.webp'
     ]
     
-    all_images = []
+    all_images = set()
     for folder_pattern in image_folders:
-        images = glob.glob(folder_pattern)
-        for img_path in images:
+        for img_path in glob.glob(folder_pattern):
             # Convert to relative path from static folder
             relative_path = img_path.replace('static/', '')
-            all_images.append(relative_path)
+            all_images.add(relative_path)
+    
+    # Uploads land in the same folders, plus EventPhotos for the gallery
+    all_images.update(asset['path'] for asset in db_manager.get_image_assets(status='ready'))
     
     return jsonify(sorted(all_images))
 
+# Streaming image uploads into the inventory (POST /admin/api/images/upload)
+images.init_app(app, db_manager, require_admin_auth)
+
+# Admin list name -> table for /admin/api/batch
+BATCH_LISTS = {'rentals': 'rental_items', 'packages': 'package_items', 'team': 'team_members'}
+
+@app.route('/admin/api/batch', methods=['POST'])
+@require_admin_auth
+def admin_api_batch():
+    """Apply bulk activate/deactivate, reorder and category changes in one transaction"""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'success': False, 'error': 'Expected a JSON object'}), 400
+    table = BATCH_LISTS.get(payload.get('list'))
+    if table is None:
+        return jsonify({'success': False, 'error': 'Unknown list'}), 400
+    operations = payload.get('operations', [])
+    if not isinstance(operations, list) or not all(
+            isinstance(operation, dict) and isinstance(operation.get('ids', []), list) for operation in operations):
+        return jsonify({'success': False, 'error': 'operations must be a list of objects with an ids list'}), 400
+    
+    changes = []
+    try:
+        for operation in operations:
+            action = operation.get('action')
+            ids = [int(item_id) for item_id in operation.get('ids', [])]
+            if action in ('activate', 'deactivate'):
+                changes.extend((item_id, 'is_active', 1 if action == 'activate' else 0) for item_id in ids)
+            elif action == 'reorder':
+                changes.extend((item_id, 'display_order', position) for position, item_id in enumerate(ids, start=1))
+            elif action == 'set_category':
+                category = str(operation.get('category', '')).strip()
+                if not category:
+                    raise ValueError('A category is required')
+                changes.extend((item_id, 'category', category) for item_id in ids)
+            else:
+                raise ValueError(f'Unknown action: {action}')
+        updated = db_manager.apply_batch(table, changes)
+    except (TypeError, ValueError) as e:  # ids that aren't integers, unknown actions
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({'success': True, 'updated': updated})
+
 @app.route('/admin/settings', methods=['GET', 'POST'])
 @require_admin_auth
 def admin_settings():
     """Admin page for managing site settings"""
     if request.method == 'POST':
-        # Get all form data and update settings
-        settings_to_update = [
-            'business_name', 'business_description', 'phone_primary', 'phone_secondary',
-            'email', 'address', 'tagline', 'instagram_url', 'meta_description',
-            'meta_keywords', 'team_section_quote'
-        ]
-        
-        for setting_key in settings_to_update:
-            value = request.form.get(setting_key, '').strip()
-            if value:  # Only update if value is provided
-                db_manager.set_site_setting(setting_key, value)
-        
-        flash('Site settings updated successfully!', 'success')
+        rows = db_manager.get_site_setting_rows()
+        changes, problems = settings.parse(request.form, rows)
+        if problems:
+            # Nothing is written unless the whole form is valid
+            for row in rows:
+                if row.setting_key in problems:
+                    flash(f'{settings.label(row)} {problems[row.setting_key]}.', 'error')
+            submitted = dict(get_site_settings().values, **changes,
+                             **{key: request.form[key].strip() for key in problems})
+            return render_template('admin/settings.html', settings=submitted), 400
+        changed = db_manager.update_site_settings(changes) if changes else []
+        if changed:
+            flash(f'Site settings updated ({len(changed)} changed).', 'success')
+        else:
+            flash('No changes to save.', 'info')
         return redirect(url_for('admin_settings'))
     
-    settings = get_site_settings()
-    return render_template('admin/settings.html', settings=settings)
+    return render_template('admin/settings.html', settings=get_site_settings())
+
+@app.route('/admin/assets')
+@require_admin_auth
+def admin_assets():
+    """Report broken image references, unreferenced files and oversized images"""
+    report = audit_assets(db_manager, app.static_folder, os.path.join(app.root_path, app.template_folder))
+    return render_template('admin/assets.html', report=report)
+
+@app.route('/admin/profiling', methods=['GET', 'POST'])
+@require_admin_auth
+def admin_profiling():
+    """Turn request sampling on/off and list recent profiles"""
+    if request.method == 'POST':
+        try:
+            profiler.set_sample_percent(request.form.get('sample_percent', '0'))
+        except ValueError:  # not a number, or nan/inf
+            flash('Sample percentage must be a number between 0 and 100.', 'error')
+            return redirect(url_for('admin_profiling'))
+        if profiler.sample_percent:
+            flash(f'Profiling {profiler.sample_percent:g}% of requests.', 'success')
+        else:
+            flash('Profiling disabled.', 'success')
+        return redirect(url_for('admin_profiling'))
+    
+    profiler.refresh()
+    return render_template('admin/profiling.html',
+                         sample_percent=profiler.sample_percent,
+                         profiles=profiler.list_profiles()[:50])
+
+@app.route('/admin/profiling/<path:filename>')
+@require_admin_auth
+def admin_profiling_download(filename):
+    """Download a collapsed-stack profile or its SQL log"""
+    return send_from_directory(profiler.directory, filename, as_attachment=True)
 
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors"""
     return "Internal server error", 500
 
+# PRODUCTION WARM START
+# Link: rel=preload headers per route, from the templates and the carousel (after every route exists)
+preload_hints = hints.init_app(app, site_assets, db_manager)
+
+def warm_start():
+    """Compile every template and load the catalog cache up front.
+
+    Called from wsgi.py, which Gunicorn preloads in the master process, so
+    forked workers share these pages copy-on-write instead of each paying
+    for them on their first requests.
+    """
+    for template_name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(template_name)
+    with app.test_request_context():
+        not_found_handler.html()
+    
+    # Same call shapes as the public views, so the cache keys match
+    get_team_members()
+    get_site_settings()
+    get_carousel_items()
+    get_rental_items()
+    get_package_items()
+    with app.test_request_context('/'):
+        index()  # fills page_cache
+    
+    # Don't carry open SQLite handles across fork
+    db_manager.close_connections()
+
+# CLI COMMANDS
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the database schema and seed default data (run once per deploy)"""
+    if db_manager.read_only:
+        raise click.ClickException('REPLICA_MODE=1: this node gets its database from `flask follow-snapshots`')
+    db_manager.init_database()
+    # Shared cache entries are keyed by catalog version, which a replaced database may reuse
+    db_manager.cache.clear()
+    click.echo(f'Initialized database at {db_manager.db_path}')
+
+@app.cli.command('profile-replay')
+@click.argument('request_log', type=click.Path(exists=True, dir_okay=False))
+@click.option('--repeat', default=1, show_default=True, help='Replay the whole mix this many times.')
+@click.option('--output', default='profile-replay', show_default=True, help='Base name for the output files.')
+def profile_replay_command(request_log, repeat, output):
+    """Replay an access log (or "GET /path" lines) through the test client while profiling"""
+    requests = profiling.load_request_mix(request_log)
+    if not requests:
+        raise click.ClickException(f'No requests found in {request_log}')
+    samples, statements, latencies = profiling.replay(app, requests, repeat=repeat)
+    path = profiler.write(output, samples, statements)
+    for request_path, timings in sorted(latencies.items(), key=lambda item: -sum(item[1])):
+        click.echo(f'{request_path:<40} {len(timings):6d} req  {sum(timings) / len(timings) * 1000:8.2f} ms avg')
+    click.echo(f'{sum(samples.values())} samples, {len(statements)} SQL statements -> {path}')
+
+@app.cli.command('export-static')
+@click.argument('output_dir', default='export', type=click.Path(file_okay=False))
+@click.option('--watch', is_flag=True, help='Keep running and re-export whenever the catalog changes.')
+@click.option('--interval', default=2.0, show_default=True, help='Seconds between catalog checks with --watch.')
+def export_static_command(output_dir, watch, interval):
+    """Pre-render the public site to static HTML (+ .gz/.br) for the front proxy"""
+    exporter = StaticExporter(app, db_manager, sitemaps, output_dir)
+    
+    def report(summary):
+        click.echo(f"catalog v{summary['version']}: {summary['pages']} pages, {summary['written']} files written, "
+                   f"{summary['removed']} removed -> {output_dir}")
+        for path, status in summary['failed']:
+            click.echo(f'  skipped {path} (HTTP {status})', err=True)
+    
+    if watch:
+        exporter.watch(interval, on_export=report)
+    else:
+        report(exporter.export())
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Write pruned per-page CSS, critical CSS and minified JS to static/build/"""
+    manifest = assets.build(app.static_folder, os.path.join(app.root_path, app.template_folder))
+    sizes = manifest['sizes']
+    for source, built in manifest['files'].items():
+        original = os.path.getsize(os.path.join(app.static_folder, source))
+        click.echo(f'{source:<24} {original:8d} -> {sizes[built]:8d} bytes  {built}')
+    for variant, (source, _) in assets.VARIANTS.items():
+        original = os.path.getsize(os.path.join(app.static_folder, source))
+        for name, page in manifest['pages'].items():
+            entry = page[variant]
+            click.echo(f'{name:<17} {variant:<8}{original:8d} -> {sizes[entry["href"]]:8d} bytes, '
+                       f'{len(entry["critical"]):6d} critical inline')
+
+@app.cli.command('publish-snapshots')
+@click.option('--store', default=replication.REPLICA_STORE, required=True,
+              help='Snapshot directory shared with the read nodes (default: REPLICA_STORE).')
+@click.option('--watch', is_flag=True, help='Keep running and publish whenever the catalog changes.')
+@click.option('--interval', default=2.0, show_default=True, help='Seconds between catalog checks with --watch.')
+@click.option('--force', is_flag=True, help='Publish even if this catalog version was already published.')
+def publish_snapshots_command(store, watch, interval, force):
+    """Writer node: publish compressed catalog snapshots for read nodes"""
+    publisher = replication.SnapshotPublisher(db_manager, replication.DirectoryStore(store))
+    
+    def report(manifest):
+        click.echo(f"catalog v{manifest['version']}: {manifest['snapshot']} ({manifest['bytes'] / 1024:.0f} KB) -> {store}")
+    
+    manifest = publisher.publish(force=force)
+    if manifest:
+        report(manifest)
+    elif not watch:
+        click.echo(f'catalog v{db_manager.catalog_version()} is already published')
+    if watch:
+        publisher.watch(interval, on_publish=report)
+
+@app.cli.command('follow-snapshots')
+@click.option('--store', default=replication.REPLICA_STORE, required=True,
+              help='Snapshot directory the writer publishes to (default: REPLICA_STORE).')
+@click.option('--watch', is_flag=True, help='Keep running and install each new snapshot.')
+@click.option('--interval', default=2.0, show_default=True, help='Seconds between checks.')
+def follow_snapshots_command(store, watch, interval):
+    """Read node: install the latest catalog snapshot as DATABASE_PATH (waits for the first one)"""
+    follower = replication.SnapshotFollower(db_manager.db_path, replication.DirectoryStore(store))
+    
+    def report(manifest):
+        click.echo(f"installed catalog v{manifest['version']} ({manifest['snapshot']}) -> {db_manager.db_path}")
+    
+    while not os.path.exists(db_manager.db_path):
+        manifest = follower.sync()
+        if manifest:
+            report(manifest)
+        else:
+            time.sleep(interval)
+    if watch:
+        follower.watch(interval, on_sync=report)
+    else:
+        manifest = follower.sync()
+        if manifest:
+            report(manifest)
+
+def _backup_store(directory):
+    return backup.BackupStore(directory or os.path.join(os.path.dirname(os.path.abspath(db_manager.db_path)),
+                                                        'backups'))
+
+@app.cli.command('backup-db')
+@click.option('--dir', 'directory', default=backup.BACKUP_DIR, help='Backup directory (default: BACKUP_DIR or backups/ next to the database).')
+@click.option('--every', type=float, help='Keep running and back up every this many seconds.')
+@click.option('--keep-last', default=backup.KEEP_LAST, show_default=True, help='Newest backups always kept.')
+@click.option('--keep-daily', default=backup.KEEP_DAILY, show_default=True, help='Days for which the last backup of the day is kept.')
+def backup_db_command(directory, every, keep_last, keep_daily):
+    """Online, incremental backup of the database (never blocks readers)"""
+    store = _backup_store(directory)
+    os.nice(10)  # hashing and compressing chunks shouldn't compete with requests for CPU
+    while True:
+        entry, written, elapsed = backup.backup(db_manager.db_path, store)
+        removed_sets, removed_chunks = store.apply_retention(keep_last, keep_daily)
+        click.echo(f"backup {entry['id']}: catalog v{entry['catalog_version']}, {entry['size'] / 1048576:.1f} MB, "
+                   f"{written / 1024:.0f} KB new in {elapsed:.2f}s; pruned {removed_sets} sets, {removed_chunks} chunks")
+        if not every:
+            break
+        time.sleep(every)
+
+@app.cli.command('list-backups')
+@click.option('--dir', 'directory', default=backup.BACKUP_DIR, help='Backup directory.')
+def list_backups_command(directory):
+    """List backup sets, oldest first"""
+    for entry in _backup_store(directory).sets():
+        taken = datetime.fromtimestamp(entry['created_at']).strftime('%Y-%m-%d %H:%M:%S')
+        click.echo(f"{entry['id']}  {taken}  catalog v{entry['catalog_version']:<6} {entry['size'] / 1048576:8.1f} MB")
+
+@app.cli.command('verify-backups')
+@click.option('--dir', 'directory', default=backup.BACKUP_DIR, help='Backup directory.')
+@click.option('--latest', is_flag=True, help='Only verify the newest backup.')
+def verify_backups_command(directory, latest):
+    """Rebuild each backup from its chunks and integrity-check it (exit 1 on damage)"""
+    store = _backup_store(directory)
+    entries = store.sets()
+    if latest:
+        entries = entries[-1:]
+    damaged = 0
+    for entry in entries:
+        try:
+            store.verify(entry)
+            click.echo(f"{entry['id']}  ok")
+        except ValueError as e:
+            damaged += 1
+            click.echo(f"{entry['id']}  DAMAGED: {e}", err=True)
+    if damaged:
+        raise SystemExit(1)
+
+@app.cli.command('restore-backup')
+@click.argument('backup_id', required=False)
+@click.option('--at', 'moment', type=click.DateTime(), help='Restore the newest backup taken at or before this local time.')
+@click.option('--dir', 'directory', default=backup.BACKUP_DIR, help='Backup directory.')
+@click.option('--yes', is_flag=True, help="Don't ask for confirmation.")
+def restore_backup_command(backup_id, moment, directory, yes):
+    """Replace the live database with a backup (the newest one unless BACKUP_ID or --at is given)"""
+    if db_manager.read_only:
+        raise click.ClickException('REPLICA_MODE=1: restore on the writer node')
+    store = _backup_store(directory)
+    if backup_id:
+        entry = store.get(backup_id)
+    elif moment:
+        entry = store.at(moment.astimezone())
+    else:
+        entry = (store.sets() or [None])[-1]
+    if entry is None:
+        raise click.ClickException('No matching backup')
+    taken = datetime.fromtimestamp(entry['created_at']).strftime('%Y-%m-%d %H:%M:%S')
+    if not yes:
+        click.confirm(f"Replace {db_manager.db_path} with backup {entry['id']} ({taken})?", abort=True)
+    try:
+        version = backup.restore(store, entry, db_manager.db_path)
+    except backup.RestoreIncomplete as e:
+        db_manager.cache.clear()
+        raise click.ClickException(f"Restore incomplete: {db_manager.db_path} now holds backup {entry['id']}, "
+                                   f"but {e}. Restart the workers so none serves cached pages from before "
+                                   f"the restore.")
+    except (OSError, ValueError, sqlite3.Error) as e:
+        # The single-step backup API rolls back on failure, so the live file is as it was
+        raise click.ClickException(f'Restore failed, live database untouched: {e}')
+    db_manager.init_database()  # brings an older backup's schema up to date
+    db_manager.cache.clear()
+    click.echo(f"Restored backup {entry['id']} ({taken}); catalog is now v{version}")
+
+@app.cli.command('audit-assets')
+@click.option('--oversized-kb', default=500, show_default=True, help='Report images larger than this.')
+@click.option('--workers', default=8, show_default=True, help='Directories scanned in parallel.')
+@click.option('--fail-on-broken', is_flag=True, help='Exit with status 1 if any reference is broken (for CI).')
+def audit_assets_command(oversized_kb, workers, fail_on_broken):
+    """Check image references in the database and templates against static/Images"""
+    report = audit_assets(db_manager, app.static_folder, os.path.join(app.root_path, app.template_folder),
+                          oversized_bytes=oversized_kb * 1024, workers=workers)
+    for entry in report['broken']:
+        click.echo(f"BROKEN       {entry['path']}  <- {', '.join(entry['sources'])}")
+    for entry in report['unreferenced']:
+        click.echo(f"UNREFERENCED {entry['path']}  ({entry['bytes'] / 1024:.0f} KB)")
+    for entry in report['oversized']:
+        click.echo(f"OVERSIZED    {entry['path']}  ({entry['bytes'] / 1024:.0f} KB)")
+    click.echo(f"{report['files']} files ({report['bytes'] / 1048576:.1f} MB), {report['references']} references: "
+               f"{len(report['broken'])} broken, {len(report['unreferenced'])} unreferenced "
+               f"({report['unreferenced_bytes'] / 1048576:.1f} MB reclaimable), {len(report['oversized'])} oversized "
+               f"[{report['elapsed_ms']} ms]")
+    if fail_on_broken and report['broken']:
+        raise SystemExit(1)
+
 if __name__ == '__main__':
+    db_manager.init_database()
     port = int(os.environ.get('PORT', 6001))
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    # Development server only; production runs `gunicorn -c gunicorn.conf.py wsgi:app`
+    app.run(host='0.0.0.0', port=port, debug=IS_DEVELOPMENT or os.environ.get('FLASK_DEBUG') == '1')
\ No newline at end of file
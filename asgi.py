@@ -0,0 +1,301 @@
+"""
+Optional ASGI entry point.
+
+    pip install -r requirements-asgi.txt
+    uvicorn asgi:application --host 0.0.0.0 --port 6001 --workers 2
+
+The Flask app is served unchanged through asgiref's WSGI adapter, which
+reads each request body asynchronously before a thread runs the view. A few
+I/O-bound endpoints are handled natively so a slow client only parks a
+coroutine instead of holding a thread:
+
+    GET/HEAD /static/<video>              streamed in chunks with Range support
+    POST     /contact/submit              body read and inquiry stored asynchronously
+    GET      /admin/api/images/<id>       upload status polling (admin session)
+
+Page requests get a 103 Early Hints response with their preload links
+first when the server supports the ASGI early hint extension (see hints.py).
+
+Database access from those handlers goes through AsyncDatabase (aiosqlite).
+Anything a native handler doesn't accept (other methods, content types,
+missing files, no admin session) falls through to Flask, so errors, redirects
+and 404s look the same in both modes. Gunicorn + wsgi.py remains the default
+deployment; this mode is for sites with many slow or long-lived clients.
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qsl
+
+import aiosqlite
+from asgiref.wsgi import WsgiToAsgi
+from flask import url_for
+from itsdangerous import BadSignature
+from werkzeug.datastructures import MultiDict
+from werkzeug.security import safe_join
+
+import hints
+import inquiries
+from app import app, db_manager, is_admin_authenticated, preload_hints, warm_start
+from images import _asset_json
+
+MEDIA_EXTENSIONS = ('.mp4', '.webm', '.mov', '.m4v')
+CHUNK_SIZE = 256 * 1024
+MEDIA_MAX_AGE = 604800  # matches add_headers for /static/
+POOL_SIZE = 4
+IMAGE_STATUS_PATH = re.compile(r'^/admin/api/images/(\d+)$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+flask_app = WsgiToAsgi(app)
+
+
+class AsyncDatabase:
+    """Small aiosqlite connection pool on the same database file as db_manager"""
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._pool = None
+        self._lock = asyncio.Lock()
+
+    async def _connections(self):
+        async with self._lock:
+            if self._pool is None:
+                pool = asyncio.Queue()
+                for _ in range(self.size):
+                    conn = await aiosqlite.connect(self.db_path)
+                    conn.row_factory = aiosqlite.Row
+                    await conn.execute('PRAGMA busy_timeout = 5000')
+                    pool.put_nowait(conn)
+                self._pool = pool
+        return self._pool
+
+    async def fetchone(self, query, params=()):
+        pool = await self._connections()
+        conn = await pool.get()
+        try:
+            async with conn.execute(query, params) as cursor:
+                row = await cursor.fetchone()
+            return dict(row) if row else None
+        finally:
+            pool.put_nowait(conn)
+
+    async def execute(self, query, params=()):
+        """Run a write and commit it; returns lastrowid"""
+        pool = await self._connections()
+        conn = await pool.get()
+        try:
+            async with conn.execute(query, params) as cursor:
+                row_id = cursor.lastrowid
+            await conn.commit()
+            return row_id
+        finally:
+            pool.put_nowait(conn)
+
+    async def close(self):
+        if self._pool is not None:
+            while not self._pool.empty():
+                await self._pool.get_nowait().close()
+            self._pool = None
+
+    async def get_image_asset(self, asset_id):
+        return await self.fetchone('SELECT * FROM image_assets WHERE id = ?', (asset_id,))
+
+    async def add_inquiry(self, name, email, message, phone=None, event_date=None, event_type=None):
+        return await self.execute('''
+            INSERT INTO inquiries (name, email, phone, event_date, event_type, message)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (name, email, phone, event_date, event_type, message))
+
+
+db = AsyncDatabase(db_manager.db_path)
+
+
+# RESPONSE HELPERS
+def _headers(scope):
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+
+
+async def _respond(send, status, headers, body=b''):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(name.encode('latin-1'), str(value).encode('latin-1')) for name, value in headers]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _read_body(receive, limit):
+    """Request body, or None if it exceeds limit or the client went away"""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def _admin_session(scope):
+    """True if the request carries a valid admin session cookie"""
+    cookie = SimpleCookie(_headers(scope).get('cookie', ''))
+    morsel = cookie.get(app.config['SESSION_COOKIE_NAME'])
+    if morsel is None:
+        return False
+    serializer = app.session_interface.get_signing_serializer(app)
+    try:
+        data = serializer.loads(morsel.value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return False
+    return bool(is_admin_authenticated(data))
+
+
+# NATIVE HANDLERS
+async def media(scope, receive, send, path):
+    """Stream a video file, honouring a single byte range; no thread held while the client reads"""
+    stat = os.stat(path)
+    headers = _headers(scope)
+    etag = f'"{int(stat.st_mtime)}-{stat.st_size}"'
+    common = [('content-type', mimetypes.guess_type(path)[0] or 'application/octet-stream'),
+              ('accept-ranges', 'bytes'), ('etag', etag),
+              ('last-modified', formatdate(stat.st_mtime, usegmt=True)),
+              ('cache-control', f'public, max-age={MEDIA_MAX_AGE}')]
+
+    if headers.get('if-none-match') == etag:
+        return await _respond(send, 304, common)
+    if 'if-modified-since' in headers and 'if-none-match' not in headers:
+        try:
+            if int(stat.st_mtime) <= parsedate_to_datetime(headers['if-modified-since']).timestamp():
+                return await _respond(send, 304, common)
+        except (TypeError, ValueError):
+            pass
+
+    start, end, status = 0, stat.st_size - 1, 200
+    match = RANGE.match(headers.get('range', ''))
+    if match and (match.group(1) or match.group(2)) and headers.get('if-range', etag) == etag:
+        if match.group(1):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+        else:  # suffix range: the last N bytes
+            start = max(0, stat.st_size - int(match.group(2)))
+        if start > end:
+            return await _respond(send, 416, common + [('content-range', f'bytes */{stat.st_size}')])
+        status = 206
+        common.append(('content-range', f'bytes {start}-{end}/{stat.st_size}'))
+    length = end - start + 1
+
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(name.encode('latin-1'), value.encode('latin-1'))
+                            for name, value in common + [('content-length', str(length))]]})
+    if scope['method'] == 'HEAD':
+        return await send({'type': 'http.response.body', 'body': b''})
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            offset, remaining = start, length
+            while remaining and not disconnected.is_set():
+                chunk = await asyncio.to_thread(os.pread, fd, min(CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                # The server applies backpressure here: a slow reader suspends this coroutine
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': remaining > 0})
+        finally:
+            os.close(fd)
+    finally:
+        watcher.cancel()
+
+
+def _contact_redirect(token):
+    """Same Location the Flask view redirects to"""
+    with app.test_request_context():
+        return url_for('contact_page', inquiry=token)
+
+
+async def contact_submit(scope, receive, send):
+    body = await _read_body(receive, inquiries.MAX_BODY_BYTES)
+    if body is None:
+        return await _respond(send, 413, [('content-type', 'text/plain')], b'Request too large\n')
+    fields, error = inquiries.parse(MultiDict(parse_qsl(body.decode('utf-8', 'replace'), keep_blank_values=True)))
+    if not error:
+        await db.add_inquiry(**fields)
+    await _respond(send, 302, [('location', _contact_redirect(error or inquiries.SENT)),
+                               ('cache-control', 'private, no-store'), ('content-length', '0')])
+
+
+async def image_status(scope, receive, send, asset_id):
+    asset = await db.get_image_asset(asset_id)
+    if asset is None:
+        body, status = {'success': False, 'error': 'Unknown image'}, 404
+    else:
+        body, status = dict(_asset_json(asset), success=True), 200
+    await _respond(send, status, [('content-type', 'application/json'), ('cache-control', 'no-store')],
+                   json.dumps(body).encode())
+
+
+def _native_handler(scope):
+    """Coroutine for a natively handled request, or None to fall through to Flask"""
+    method, path = scope['method'], scope['path']
+    if method in ('GET', 'HEAD') and path.startswith('/static/') and path.lower().endswith(MEDIA_EXTENSIONS):
+        file_path = safe_join(app.static_folder, path[len('/static/'):])
+        if file_path and os.path.isfile(file_path):
+            return lambda receive, send: media(scope, receive, send, file_path)
+    elif db_manager.read_only:
+        pass  # read node: writes and admin requests go through Flask, which forwards them
+    elif method == 'POST' and path == '/contact/submit':
+        if _headers(scope).get('content-type', '').startswith('application/x-www-form-urlencoded'):
+            return lambda receive, send: contact_submit(scope, receive, send)
+    elif method == 'GET' and IMAGE_STATUS_PATH.match(path) and _admin_session(scope):
+        asset_id = int(IMAGE_STATUS_PATH.match(path).group(1))
+        return lambda receive, send: image_status(scope, receive, send, asset_id)
+    return None
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await asyncio.to_thread(warm_start)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await db.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] == 'http':
+        handler = _native_handler(scope)
+        if handler is not None:
+            return await handler(receive, send)
+        await _early_hints(scope, send)
+    return await flask_app(scope, receive, send)
+
+
+async def _early_hints(scope, send):
+    """Send a 103 with the page's preload links while Flask renders it, if the server can"""
+    if not hints.EARLY_HINTS or scope['method'] != 'GET' or \
+            'http.response.early_hint' not in scope.get('extensions', {}):
+        return
+    # The carousel part reads the catalog version from SQLite: keep it off the event loop
+    links = await asyncio.to_thread(preload_hints.for_path, scope['path'], _headers(scope))
+    if links:
+        await send({'type': 'http.response.early_hint', 'links': [link.encode('latin-1') for link in links]})
@@ -0,0 +1,499 @@
+"""
+Per-page stylesheets, critical CSS and minified scripts.
+
+    flask build-assets
+
+Every public page links desktop.css or mobile.css whole, although each
+template uses a fraction of their selectors. The build reads each template
+under templates/ (admin pages excluded) next to main.js and writes, per
+template and per variant (mobile, desktop):
+
+- a pruned stylesheet: only rules whose selectors can match something the
+  template, main.js or a content block can produce; selector lists keep only
+  their matching parts, and @keyframes nothing uses are dropped;
+- its critical subset: the rules that match markup above the fold, which is
+  the navigation plus the first FOLD_LINES lines of <main> (or everything
+  before a ``{# fold #}`` comment). It is inlined in a <style>, so the first
+  paint waits for no stylesheet request, and the pruned sheet loads without
+  blocking render.
+
+Stylesheets and main.js are minified and written under static/build/ with a
+content hash in their names, so they are served as immutable. manifest.json
+maps templates and source files to them.
+
+Templates call ``{{ page_styles() }}`` and ``{{ asset_url('js/main.js') }}``.
+With no build, once a template or source file is newer than the build, or
+in development (TEMPLATES_AUTO_RELOAD), they link the original files, so
+editing needs no build step.
+
+Matching is textual, like PurgeCSS: a class or id counts as used if the word
+appears anywhere in the sources, and a class="x-{{ ... }}" fragment keeps
+every class starting with x-. A class only ever produced outside these
+sources has to go in SAFELIST.
+
+Measure the difference with ``python benchmarks/css_pruning.py``.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+
+from jinja2 import pass_context
+from markupsafe import Markup, escape
+
+logger = logging.getLogger(__name__)
+
+BUILD_DIR = 'build'  # under the static folder
+MANIFEST = 'manifest.json'
+VARIANTS = {
+    # variant -> (source stylesheet, media query pages use unless they pass their own)
+    'mobile': ('CSS/mobile.css', 'screen and (max-width: 768px)'),
+    'desktop': ('CSS/desktop.css', 'screen and (min-width: 769px)'),
+}
+SCRIPTS = ('js/main.js',)
+FOLD_LINES = 45
+FOLD_MARKER = '{# fold #}'
+
+# Markup the sources don't show: the document itself and what content.py renders
+SAFELIST_TAGS = {'html', 'body', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'br', 'ul', 'ol', 'li', 'strong', 'em', 'a'}
+SAFELIST = set()
+
+COMMENT = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+STRING = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+WORD = re.compile(r'[A-Za-z0-9_-]+')
+TAG = re.compile(r'<([a-zA-Z][a-zA-Z0-9-]*)')
+CREATED_TAG = re.compile(r'createElement\(\s*[\'"]([a-zA-Z][a-zA-Z0-9-]*)')
+PSEUDO = re.compile(r'::?[a-zA-Z-]+(?:\((?:[^()]|\([^()]*\))*\))?')
+ATTRIBUTE = re.compile(r'\[[^\]]*\]')
+CLASS = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+ID = re.compile(r'#(-?[_a-zA-Z][\w-]*)')
+SELECTOR_TAG = re.compile(r'(?:^|[\s>+~])([a-zA-Z][a-zA-Z0-9-]*)')
+ANIMATION = re.compile(r'animation(?:-name)?\s*:([^;]+)')
+
+
+# -- CSS ------------------------------------------------------------------
+
+def _block_end(text, start):
+    """Index of the brace closing the block opened just before start"""
+    depth, i, quote = 1, start, None
+    while i < len(text):
+        c = text[i]
+        if quote:
+            if c == '\\':
+                i += 1
+            elif c == quote:
+                quote = None
+        elif c in '"\'':
+            quote = c
+        elif c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError('unbalanced braces in stylesheet')
+
+
+def parse_css(text):
+    """Stylesheet -> [(prelude, body)], body being a declaration string or, for
+    at-rules that contain rules (@media, @supports, @keyframes), a nested list"""
+    text = COMMENT.sub(lambda m: m.group(1) or '', text)
+    rules, i = [], 0
+    while True:
+        brace = text.find('{', i)
+        semicolon = text.find(';', i)
+        if brace == -1:
+            break
+        if 0 <= semicolon < brace and text[i:semicolon].strip().startswith('@'):
+            rules.append((text[i:semicolon].strip(), None))  # @import, @charset
+            i = semicolon + 1
+            continue
+        end = _block_end(text, brace + 1)
+        prelude, body = text[i:brace].strip(), text[brace + 1:end]
+        if prelude.startswith(('@media', '@supports', '@keyframes', '@-webkit-keyframes')):
+            body = parse_css(body)
+        rules.append((prelude, body))
+        i = end + 1
+    return rules
+
+
+class Usage:
+    """Words and tags that occur in a set of source texts"""
+
+    def __init__(self, *texts):
+        text = '\n'.join(texts)
+        self.words = set(WORD.findall(text)) | SAFELIST
+        # class="x-{{ ... }}" leaves "x-": any class with that prefix may be rendered
+        self.prefixes = tuple(word for word in self.words if word.endswith('-') and len(word) > 1)
+        self.tags = {tag.lower() for tag in TAG.findall(text) + CREATED_TAG.findall(text)} | SAFELIST_TAGS
+
+    def has(self, name):
+        return name in self.words or name.startswith(self.prefixes)
+
+    def matches(self, selector):
+        """Whether selector can match markup these sources produce (pseudo-classes and attributes ignored)"""
+        simple = ATTRIBUTE.sub('', PSEUDO.sub('', selector))
+        if not all(self.has(name) for name in CLASS.findall(simple) + ID.findall(simple)):
+            return False
+        simple = CLASS.sub('', ID.sub('', simple))
+        return all(tag.lower() in self.tags for tag in SELECTOR_TAG.findall(simple))
+
+
+def _split_top_level(text, separator):
+    parts, depth, start, quote = [], 0, 0, None
+    for i, c in enumerate(text):
+        if quote:
+            if c == quote and text[i - 1] != '\\':
+                quote = None
+        elif c in '"\'':
+            quote = c
+        elif c in '([':
+            depth += 1
+        elif c in ')]':
+            depth -= 1
+        elif c == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def prune(rules, usage, nested=False):
+    """Rules (as parse_css returns them) that can apply to markup with this usage"""
+    kept = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            if prelude.startswith(('@media', '@supports')):
+                body = prune(body, usage, nested=True)
+                if body:
+                    kept.append((prelude, body))
+            else:
+                kept.append((prelude, body))  # keyframes: dropped later if unused
+        elif prelude.startswith('@'):
+            kept.append((prelude, body))
+        else:
+            selectors = [s for s in _split_top_level(prelude, ',') if s.strip() and usage.matches(s)]
+            if selectors:
+                kept.append((','.join(selectors), body))
+    return kept if nested else _drop_unused_keyframes(kept)
+
+
+def _declarations(rules):
+    for prelude, body in rules:
+        if isinstance(body, list):
+            if not prelude.startswith(('@keyframes', '@-webkit-keyframes')):
+                yield from _declarations(body)
+        elif body:
+            yield body
+
+
+def _drop_unused_keyframes(rules):
+    animated = set()
+    for body in _declarations(rules):
+        for value in ANIMATION.findall(body):
+            animated.update(WORD.findall(value))
+
+    def keep(rule):
+        prelude, body = rule
+        if prelude.startswith(('@keyframes', '@-webkit-keyframes')):
+            return prelude.split(None, 1)[-1].strip() in animated
+        if isinstance(body, list) and prelude.startswith(('@media', '@supports')):
+            body[:] = [r for r in body if keep(r)]
+            return bool(body)
+        return True
+    return [rule for rule in rules if keep(rule)]
+
+
+def _outside_strings(text, transform):
+    parts = STRING.split(text)
+    return ''.join(part if i % 2 else transform(part) for i, part in enumerate(parts))
+
+
+def _squeeze(text, around):
+    text = re.sub(r'\s+', ' ', text).strip()
+    return re.sub(rf'\s*([{re.escape(around)}])\s*', r'\1', text)
+
+
+def minify_css(rules):
+    """parse_css / prune output -> minified stylesheet text"""
+    out = []
+    for prelude, body in rules:
+        if body is None:
+            out.append(_outside_strings(prelude, lambda s: re.sub(r'\s+', ' ', s).strip()) + ';')
+            continue
+        if prelude.startswith('@'):
+            head = _outside_strings(prelude, lambda s: re.sub(r'\(\s*([\w-]+)\s*:\s*', r'(\1:',
+                                                              _squeeze(s, ',')))
+        else:
+            head = _outside_strings(prelude, lambda s: _squeeze(s, ',>+~'))
+        if isinstance(body, list):
+            out.append(head + '{' + minify_css(body) + '}')
+            continue
+        declarations = []
+        for declaration in _split_top_level(body, ';'):
+            name, colon, value = declaration.partition(':')
+            if colon and name.strip():
+                value = _outside_strings(value, lambda s: _squeeze(s, ',').replace(' !important', '!important'))
+                declarations.append(name.strip() + ':' + value)
+        if declarations:
+            out.append(head + '{' + ';'.join(declarations) + '}')
+    return ''.join(out)
+
+
+# -- JavaScript -----------------------------------------------------------
+
+REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case', 'do',
+                  'else', 'yield', 'await'}
+JS_TIGHT = re.compile(r' ?([{}()\[\];,:=<>!&|*]) ?')
+
+
+def _literal_end(source, i):
+    """End of the string, template or regex literal starting at source[i]"""
+    quote = '/' if source[i] == '/' else source[i]
+    in_class = False
+    i += 1
+    while i < len(source):
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if quote == '/':
+            if c == '[':
+                in_class = True
+            elif c == ']':
+                in_class = False
+            elif c == '/' and not in_class:
+                i += 1
+                while i < len(source) and (source[i].isalnum()):
+                    i += 1  # flags
+                return i
+        elif c == quote:
+            return i + 1
+        i += 1
+    raise ValueError('unterminated literal in script')
+
+
+def minify_js(source):
+    """Drop comments and redundant whitespace; keeps line breaks, so automatic semicolon insertion is unaffected"""
+    pieces, code, i = [], [], 0
+
+    def flush():
+        text = ''.join(code)
+        code.clear()
+        text = re.sub(r'[ \t]+', ' ', text)
+        text = re.sub(r' ?\n[\s]*', '\n', text)
+        pieces.append(JS_TIGHT.sub(r'\1', text))
+
+    def previous():
+        """Code before the current position, as far back as the last literal"""
+        return ''.join(code).rstrip() or (pieces[-1].rstrip() if pieces else '')
+
+    while i < len(source):
+        c = source[i]
+        if c in '"\'`':
+            end = _literal_end(source, i)
+            flush()
+            pieces.append(source[i:end])
+            i = end
+        elif source.startswith('//', i):
+            i = source.find('\n', i)
+            i = len(source) if i == -1 else i
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = len(source) if end == -1 else end + 2
+            code.append('\n' if '\n' in source[i:end] else ' ')
+            i = end
+        elif c == '/':
+            before = previous()
+            word = re.search(r'[\w$]+$', before)
+            if not before or before[-1] in REGEX_AFTER or (word and word.group() in REGEX_KEYWORDS):
+                end = _literal_end(source, i)
+                flush()
+                pieces.append(source[i:end])
+                i = end
+            else:
+                code.append(c)
+                i += 1
+        else:
+            code.append(c)
+            i += 1
+    flush()
+    return ''.join(pieces).strip() + '\n'
+
+
+# -- Build ----------------------------------------------------------------
+
+def page_templates(template_folder):
+    """Public page templates (file names), admin ones excluded"""
+    return sorted(name for name in os.listdir(template_folder) if name.endswith('.html'))
+
+
+def above_the_fold(template):
+    """The part of a template's body that renders above the fold"""
+    body = template[template.find('<body'):]
+    if FOLD_MARKER in body:
+        return body[:body.index(FOLD_MARKER)]
+    main = body.find('<main')
+    if main == -1:
+        return '\n'.join(body.splitlines()[:FOLD_LINES])
+    return body[:main] + '\n'.join(body[main:].splitlines()[:FOLD_LINES])
+
+
+def _write_hashed(build_dir, stem, suffix, text):
+    data = text.encode()
+    name = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{suffix}'
+    path = os.path.join(build_dir, name)
+    if not os.path.exists(path):
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+    return f'{BUILD_DIR}/{name}'
+
+
+def build(static_folder, template_folder):
+    """Write pruned/critical CSS and minified JS under static/build/; returns the manifest"""
+    build_dir = os.path.join(static_folder, BUILD_DIR)
+    os.makedirs(build_dir, exist_ok=True)
+
+    def read(path):
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    scripts = {path: read(os.path.join(static_folder, path)) for path in SCRIPTS}
+    stylesheets = {variant: parse_css(read(os.path.join(static_folder, source)))
+                   for variant, (source, _) in VARIANTS.items()}
+    manifest = {'files': {}, 'pages': {}, 'sizes': {}}
+    for path, source in scripts.items():
+        stem = os.path.splitext(os.path.basename(path))[0]
+        manifest['files'][path] = _write_hashed(build_dir, stem, '.min.js', minify_js(source))
+
+    for name in page_templates(template_folder):
+        template = read(os.path.join(template_folder, name))
+        if 'page_styles(' not in template:
+            continue
+        page = {}
+        usage = Usage(template, *scripts.values())
+        fold = Usage(above_the_fold(template))
+        for variant, rules in stylesheets.items():
+            pruned = prune(rules, usage)
+            critical = minify_css(prune(pruned, fold))
+            href = _write_hashed(build_dir, f'{os.path.splitext(name)[0]}.{variant}', '.css', minify_css(pruned))
+            page[variant] = {'href': href, 'critical': critical}
+        manifest['pages'][name] = page
+
+    manifest['sources'] = sorted([source for source, _ in VARIANTS.values()] + list(SCRIPTS))
+    for path in manifest['files'].values():
+        manifest['sizes'][path] = os.path.getsize(os.path.join(static_folder, path))
+    for page in manifest['pages'].values():
+        for entry in page.values():
+            manifest['sizes'][entry['href']] = os.path.getsize(os.path.join(static_folder, entry['href']))
+
+    path = os.path.join(build_dir, MANIFEST)
+    _remove_stale(build_dir, manifest, path)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + '.tmp', path)
+    return manifest
+
+
+def _remove_stale(build_dir, manifest, manifest_path):
+    """Delete built files neither this build nor the previous one links.
+
+    The previous build's files stay one more round: pages rendered with it
+    may still be in a shared cache or an export.
+    """
+    keep = set(manifest['sizes'])
+    try:
+        with open(manifest_path) as f:
+            keep.update(json.load(f)['sizes'])
+    except (OSError, ValueError, KeyError):
+        pass
+    keep = {os.path.basename(path) for path in keep}
+    for name in os.listdir(build_dir):
+        if name != MANIFEST and name not in keep:
+            os.unlink(os.path.join(build_dir, name))
+
+
+# -- Serving --------------------------------------------------------------
+
+class Assets:
+    """Template helpers that link built assets when a current build exists"""
+
+    def __init__(self, static_folder, template_folder, static_url_path='/static'):
+        self.static_folder = static_folder
+        self.template_folder = template_folder
+        self.static_url_path = static_url_path
+        self.manifest = self.load()
+
+    def load(self):
+        """The build manifest, or None when there is no build or it is older than its sources"""
+        path = os.path.join(self.static_folder, BUILD_DIR, MANIFEST)
+        try:
+            built_at = os.path.getmtime(path)
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        sources = [os.path.join(self.static_folder, source) for source in manifest['sources']]
+        sources += [os.path.join(self.template_folder, name) for name in manifest['pages']]
+        stale = [source for source in sources if os.path.getmtime(source) > built_at]
+        if stale:
+            logger.warning('Asset build is older than %s; serving the original stylesheets and scripts '
+                           '(run `flask build-assets`)', os.path.relpath(stale[0], os.path.dirname(self.static_folder)))
+            return None
+        return manifest
+
+    def _url(self, path):
+        return f'{self.static_url_path}/{path}'
+
+    def _source_url(self, path):
+        # Unbuilt files still change between deploys: version them by mtime
+        version = int(os.path.getmtime(os.path.join(self.static_folder, path)))
+        return f'{self._url(path)}?v={version}'
+
+    def asset_url(self, path):
+        """asset_url('js/main.js'): the minified build of a static file if there is one"""
+        built = self.manifest and self.manifest['files'].get(path)
+        return self._url(built) if built else self._source_url(path)
+
+    def stylesheets(self, template_name, mobile=None, desktop=None):
+        """[(variant, url, media query, critical CSS)] for a template; critical is None without a build"""
+        media = {'mobile': mobile, 'desktop': desktop}
+        page = self.manifest and self.manifest['pages'].get(template_name)
+        sheets = []
+        for variant, (source, default_media) in VARIANTS.items():
+            query = media[variant] or default_media
+            if page is None:
+                sheets.append((variant, self._source_url(source), query, None))
+            else:
+                sheets.append((variant, self._url(page[variant]['href']), query, page[variant]['critical']))
+        return sheets
+
+    @pass_context
+    def page_styles(self, context, mobile=None, desktop=None):
+        """Stylesheet tags for the calling template: critical CSS inline and the
+        pruned sheets loaded without blocking render, or the full stylesheets"""
+        tags = []
+        for variant, href, query, critical in self.stylesheets(context.name, mobile, desktop):
+            query = escape(query)
+            if critical is None:
+                tags.append(f'<link rel="stylesheet" href="{href}" media="{query}">')
+                continue
+            if critical:
+                tags.append(f'<style media="{query}">{critical}</style>')
+            tags.append(f'<link rel="stylesheet" href="{href}" media="print" '
+                        f'onload="this.media=\'{query}\'; this.onload=null;">')
+            tags.append(f'<noscript><link rel="stylesheet" href="{href}" media="{query}"></noscript>')
+        return Markup('\n    '.join(tags))
+
+
+def init_app(app):
+    assets = Assets(app.static_folder, os.path.join(app.root_path, app.template_folder), app.static_url_path)
+    if app.config.get('TEMPLATES_AUTO_RELOAD'):
+        assets.manifest = None  # development: templates change under a running server
+    app.add_template_global(assets.asset_url, 'asset_url')
+    app.add_template_global(assets.page_styles, 'page_styles')
+    return assets
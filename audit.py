@@ -0,0 +1,163 @@
+"""
+Static image audit.
+
+Joins every image reference (catalog rows, site_settings values and
+url_for('static', filename=...) literals in templates) against what is on
+disk under static/Images, in one query and one directory walk, and reports:
+
+    broken        referenced paths with no file (these 404 on the site)
+    unreferenced  files nothing points at (candidates for deletion)
+    oversized     files over the size limit, largest first
+
+Subdirectories are scanned in parallel. Files in DIRECTORY_REFERENCES are
+used by listing the directory, so they count as referenced. A thumbnail or
+AVIF variant made by the upload pipeline counts as referenced when its WebP
+is.
+"""
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # dimensions are reported only when Pillow is installed
+    Image = None
+
+IMAGES_DIR = 'Images'
+IMAGE_EXTENSIONS = ('.webp', '.avif', '.jpg', '.jpeg', '.png', '.gif', '.svg')
+OVERSIZED_BYTES = int(os.environ.get('AUDIT_OVERSIZED_KB', 500)) * 1024
+AUDIT_WORKERS = 8
+
+# Directories the site lists at request time rather than referencing file by file
+DIRECTORY_REFERENCES = {
+    'Images/EventPhotos': 'gallery page (random selection)',
+}
+
+# (source label, column expression, table) for every image column in the database
+REFERENCE_COLUMNS = (
+    ('rental_items.image_path', 'image_path', 'rental_items'),
+    ('package_items.image_path', 'image_path', 'package_items'),
+    ('team_members.image_path', 'image_path', 'team_members'),
+    ('team_members.mobile_image_path', 'mobile_image_path', 'team_members'),
+    ('carousel_items.image_path', 'image_path', 'carousel_items'),
+    ('carousel_items.mobile_image_path', 'mobile_image_path', 'carousel_items'),
+    ('gallery_images.filename', "CASE WHEN instr(filename, '/') THEN filename "
+                                "ELSE 'Images/EventPhotos/' || filename END", 'gallery_images'),
+    ('site_settings.setting_value', 'setting_value', 'site_settings'),
+)
+
+TEMPLATE_REFERENCE = re.compile(r"""filename=['"]([^'"]+\.(?:webp|avif|jpe?g|png|gif|svg))['"]""", re.IGNORECASE)
+VARIANT_SUFFIX = re.compile(r'(-thumb\.webp|\.avif)$')
+
+
+def database_references(db_manager):
+    """{static path: [sources]} from every image column, in one query"""
+    query = ' UNION ALL '.join(
+        f"SELECT '{label}', id, {column} FROM {table} WHERE {column} IS NOT NULL AND {column} != ''"
+        for label, column, table in REFERENCE_COLUMNS)
+    references = {}
+    conn = db_manager.get_connection()
+    for label, row_id, path in conn.execute(query):
+        path = path.strip().lstrip('/')
+        if label.startswith('site_settings') and not path.lower().endswith(IMAGE_EXTENSIONS):
+            continue  # ordinary text settings
+        references.setdefault(path, []).append(f'{label}#{row_id}')
+    conn.close()
+    return references
+
+
+def template_references(template_folder):
+    """{static path: [sources]} from url_for('static', filename=...) literals"""
+    references = {}
+    for directory, _, names in os.walk(template_folder):
+        for name in names:
+            if not name.endswith('.html'):
+                continue
+            path = os.path.join(directory, name)
+            with open(path, encoding='utf-8') as f:
+                for match in TEMPLATE_REFERENCE.finditer(f.read()):
+                    source = f'templates/{os.path.relpath(path, template_folder)}'
+                    sources = references.setdefault(match.group(1), [])
+                    if source not in sources:
+                        sources.append(source)
+    return references
+
+
+def _scan_directory(static_folder, directory):
+    """[(static path, bytes)] for image files directly in directory"""
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                relative_path = os.path.relpath(entry.path, static_folder).replace(os.sep, '/')
+                files.append((relative_path, entry.stat().st_size))
+    return files
+
+
+def disk_inventory(static_folder, workers=AUDIT_WORKERS):
+    """{static path: bytes} for every image under static/Images, scanned in parallel"""
+    root = os.path.join(static_folder, IMAGES_DIR)
+    directories = [directory for directory, _, _ in os.walk(root)]
+    inventory = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for files in pool.map(lambda directory: _scan_directory(static_folder, directory), directories):
+            inventory.update(files)
+    return inventory
+
+
+def _dimensions(path):
+    try:
+        with Image.open(path) as image:  # reads the header only
+            return image.size
+    except Exception:
+        return None
+
+
+def audit_assets(db_manager, static_folder, template_folder, oversized_bytes=OVERSIZED_BYTES,
+                 workers=AUDIT_WORKERS):
+    """Run the audit; returns a dict of broken, unreferenced and oversized entries plus totals"""
+    started = time.perf_counter()
+    references = database_references(db_manager)
+    for path, sources in template_references(template_folder).items():
+        references.setdefault(path, []).extend(sources)
+    inventory = disk_inventory(static_folder, workers)
+
+    broken = []
+    for path, sources in sorted(references.items()):
+        if path in inventory:
+            continue
+        # References outside static/Images (e.g. CSS, favicons elsewhere) aren't in the scan
+        if not path.startswith(IMAGES_DIR + '/') and os.path.isfile(os.path.join(static_folder, path)):
+            continue
+        broken.append({'path': path, 'sources': sources})
+
+    unreferenced = []
+    for path, size in sorted(inventory.items()):
+        if path in references or os.path.dirname(path) in DIRECTORY_REFERENCES:
+            continue
+        variant_of = VARIANT_SUFFIX.sub('.webp', path)
+        if variant_of != path and variant_of in references:
+            continue
+        unreferenced.append({'path': path, 'bytes': size})
+
+    oversized = []
+    for path, size in sorted(inventory.items(), key=lambda item: -item[1]):
+        if size <= oversized_bytes:
+            break
+        entry = {'path': path, 'bytes': size, 'referenced': path in references}
+        if Image is not None:
+            entry['dimensions'] = _dimensions(os.path.join(static_folder, path))
+        oversized.append(entry)
+
+    return {
+        'broken': broken,
+        'unreferenced': unreferenced,
+        'oversized': oversized,
+        'files': len(inventory),
+        'bytes': sum(inventory.values()),
+        'references': len(references),
+        'unreferenced_bytes': sum(entry['bytes'] for entry in unreferenced),
+        'oversized_limit': oversized_bytes,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
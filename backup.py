@@ -0,0 +1,305 @@
+"""
+Online backups of the database.
+
+    flask backup-db --every 3600     back up hourly (or run `flask backup-db` from cron)
+    flask list-backups
+    flask verify-backups             re-hash every chunk and integrity-check each backup
+    flask restore-backup --at "2026-10-19 12:00"
+
+A backup copies the live database with the SQLite online backup API a few
+pages at a time (STEP_PAGES, pausing STEP_SLEEP between steps). The copy only
+ever holds a read lock, so public requests keep reading throughout, and a
+write waits at most for one step. A write restarts the copy, though; if
+writes keep coming (MAX_RESTARTS), the remainder is copied in one step, which
+holds writes (never reads) for that long. The copy is integrity-checked
+before it is stored.
+
+Backups are incremental: each copy is split into CHUNK_SIZE pieces stored
+under their SHA-256, and a backup set (sets/<id>.json) lists its chunks.
+Unchanged parts of the database are stored once however many backups
+reference them. Retention keeps the newest `keep_last` sets plus the newest
+set of each of the last `keep_daily` days; compaction then deletes chunks no
+retained set references. Adding a set and compacting both hold an exclusive
+flock on the store's lock file, so a `backup-db --every` run and another
+process applying retention can't delete the chunks of a set still being
+written.
+
+Restoring picks the newest set at or before a point in time, rebuilds and
+verifies it, and writes it into the live database with the backup API. It
+then moves catalog_meta.version past both the old and the restored
+version, so every worker's cache drops what it had.
+"""
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+BACKUP_DIR = os.environ.get('BACKUP_DIR')  # default: backups/ next to the database
+STEP_PAGES = 64
+STEP_SLEEP = 0.005
+# A write from another connection restarts a stepped copy; after this many
+# restarts the rest is copied in one step, so a busy writer can't starve it
+MAX_RESTARTS = 3
+CHUNK_SIZE = 1024 * 1024  # a multiple of every SQLite page size, so unchanged pages dedupe
+KEEP_LAST = 24
+KEEP_DAILY = 14
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupStore:
+    """Backup sets and the content-addressed chunks they are built from"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.sets_dir = os.path.join(directory, 'sets')
+        self.chunks_dir = os.path.join(directory, 'chunks')
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunks_dir, digest[:2], digest + '.gz')
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, '.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # releases the lock
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def sets(self):
+        """Backup sets, oldest first"""
+        try:
+            names = sorted(name for name in os.listdir(self.sets_dir) if name.endswith('.json'))
+        except FileNotFoundError:
+            return []
+        result = []
+        for name in names:
+            with open(os.path.join(self.sets_dir, name)) as f:
+                result.append(json.load(f))
+        return result
+
+    def get(self, backup_id):
+        try:
+            with open(os.path.join(self.sets_dir, backup_id + '.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def at(self, moment):
+        """Newest set taken at or before moment (an aware datetime), or None"""
+        candidates = [entry for entry in self.sets() if entry['created_at'] <= moment.timestamp()]
+        return candidates[-1] if candidates else None
+
+    def add(self, snapshot_path, **metadata):
+        """Store a database file as a new set; returns (set, bytes of new chunks written)"""
+        with self._locked():
+            return self._add(snapshot_path, **metadata)
+
+    def _add(self, snapshot_path, **metadata):
+        chunks, written = [], 0
+        with open(snapshot_path, 'rb') as f:
+            while data := f.read(CHUNK_SIZE):
+                digest = hashlib.sha256(data).hexdigest()
+                path = self._chunk_path(digest)
+                if not os.path.exists(path):
+                    compressed = gzip.compress(data, compresslevel=6, mtime=0)
+                    self._write_atomic(path, compressed)
+                    written += len(compressed)
+                chunks.append(digest)
+        created_at = time.time()
+        entry = dict(metadata,
+                     id=datetime.fromtimestamp(created_at, timezone.utc).strftime('%Y%m%dT%H%M%S%fZ'),
+                     created_at=created_at,
+                     size=os.path.getsize(snapshot_path),
+                     sha256=_hash_file(snapshot_path),
+                     chunks=chunks)
+        # The set file is written last: a set only exists once all its chunks do
+        self._write_atomic(os.path.join(self.sets_dir, entry['id'] + '.json'), json.dumps(entry, indent=1).encode())
+        return entry, written
+
+    def assemble(self, entry, target_path):
+        """Rebuild a set into target_path, checking every chunk and the whole-file digest"""
+        whole = hashlib.sha256()
+        with open(target_path, 'wb') as out:
+            for digest in entry['chunks']:
+                try:
+                    with open(self._chunk_path(digest), 'rb') as f:
+                        data = gzip.decompress(f.read())
+                except FileNotFoundError:
+                    raise ValueError(f"backup {entry['id']}: chunk {digest[:12]} is missing") from None
+                except (gzip.BadGzipFile, EOFError, zlib.error):
+                    data = None
+                if data is None or hashlib.sha256(data).hexdigest() != digest:
+                    raise ValueError(f"backup {entry['id']}: chunk {digest[:12]} is corrupt")
+                whole.update(data)
+                out.write(data)
+        if whole.hexdigest() != entry['sha256']:
+            raise ValueError(f"backup {entry['id']}: rebuilt file doesn't match its digest")
+
+    def verify(self, entry):
+        """Rebuild a set in a temp file and integrity-check it; raises ValueError if it is damaged"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'verify.db')
+            self.assemble(entry, path)
+            _integrity_check(path)
+
+    def apply_retention(self, keep_last=KEEP_LAST, keep_daily=KEEP_DAILY, now=None):
+        """Delete sets outside the retention policy, then unreferenced chunks; returns (sets, chunks) removed"""
+        with self._locked():
+            return self._apply_retention(keep_last, keep_daily, now)
+
+    def _apply_retention(self, keep_last, keep_daily, now):
+        entries = self.sets()
+        keep = {entry['id'] for entry in entries[-keep_last:]} if keep_last else set()
+        today = datetime.fromtimestamp(now or time.time(), timezone.utc).date()
+        newest_per_day = {}
+        for entry in entries:
+            day = datetime.fromtimestamp(entry['created_at'], timezone.utc).date()
+            if today - day < timedelta(days=keep_daily):
+                newest_per_day[day] = entry['id']
+        keep.update(newest_per_day.values())
+
+        removed_sets = 0
+        for entry in entries:
+            if entry['id'] not in keep:
+                os.unlink(os.path.join(self.sets_dir, entry['id'] + '.json'))
+                removed_sets += 1
+        return removed_sets, self._compact()
+
+    def compact(self):
+        """Delete chunks (and interrupted writes) no remaining set references"""
+        with self._locked():
+            return self._compact()
+
+    def _compact(self):
+        referenced = {digest for entry in self.sets() for digest in entry['chunks']}
+        removed = 0
+        for folder, _, files in os.walk(self.chunks_dir):
+            for name in files:
+                if name.startswith('.tmp-') or name[:-len('.gz')] not in referenced:
+                    os.unlink(os.path.join(folder, name))
+                    removed += 1
+        return removed
+
+
+def _integrity_check(path):
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        result = conn.execute('PRAGMA integrity_check').fetchall()
+    finally:
+        conn.close()
+    if result != [('ok',)]:
+        raise ValueError(f'integrity check failed: {"; ".join(row[0] for row in result[:5])}')
+
+
+def _catalog_version(conn):
+    try:
+        return conn.execute('SELECT version FROM catalog_meta').fetchone()[0]
+    except sqlite3.Error:
+        return 0
+
+
+class _Restarted(Exception):
+    pass
+
+
+class RestoreIncomplete(Exception):
+    """The live database holds the backup, but its catalog version couldn't be bumped"""
+
+
+def _copy(source, target, step_pages, step_sleep):
+    last = None
+    restarts = 0
+
+    def progress(status, remaining, total):
+        nonlocal last, restarts
+        if last is not None and remaining > last:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise _Restarted
+        last = remaining
+
+    try:
+        source.backup(target, pages=step_pages, progress=progress, sleep=step_sleep)
+    except _Restarted:
+        source.backup(target)
+
+
+def backup(db_path, store, step_pages=STEP_PAGES, step_sleep=STEP_SLEEP):
+    """Take one online backup of db_path into store; returns (set, bytes of new chunks, seconds)"""
+    started = time.perf_counter()
+    os.makedirs(store.directory, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=store.directory) as tmp:
+        path = os.path.join(tmp, 'backup.db')
+        source = sqlite3.connect(f'file:{os.path.abspath(db_path)}?mode=ro', uri=True)
+        target = sqlite3.connect(path)
+        try:
+            _copy(source, target, step_pages, step_sleep)
+            metadata = {
+                'copy_seconds': round(time.perf_counter() - started, 3),  # time spent reading the live file
+                'catalog_version': _catalog_version(target),
+                'schema_version': target.execute('PRAGMA user_version').fetchone()[0],
+            }
+        finally:
+            target.close()
+            source.close()
+        _integrity_check(path)
+        entry, written = store.add(path, **metadata)
+    return entry, written, time.perf_counter() - started
+
+
+def restore(store, entry, db_path):
+    """Write a backup set into the live database at db_path; returns the new catalog version"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'restore.db')
+        store.assemble(entry, path)
+        _integrity_check(path)
+        restored = sqlite3.connect(path)
+        live = None
+        try:
+            # Without a catalog_meta row the version bump below would fail (or do nothing)
+            # after the live file is already overwritten, so check before touching it
+            try:
+                restored.execute('SELECT version FROM catalog_meta').fetchone()[0]
+            except (sqlite3.Error, TypeError):
+                raise ValueError(f"backup {entry['id']} has no catalog_meta version to restore from") from None
+            live = sqlite3.connect(db_path, timeout=30)
+            previous = _catalog_version(live)
+            # One step: readers wait for the swap instead of seeing a half-restored file
+            restored.backup(live)
+            # Past both versions, so no cache keeps entries that look current
+            version = max(previous, entry['catalog_version']) + 1
+            try:
+                live.execute('UPDATE catalog_meta SET version = ?', (version,))
+                live.commit()
+            except sqlite3.Error as e:
+                raise RestoreIncomplete(f'the catalog version could not be bumped to {version} ({e})') from e
+        finally:
+            if live is not None:
+                live.close()
+            restored.close()
+    return version
@@ -0,0 +1,134 @@
+"""
+Backup pause benchmark: how long an online backup holds up live traffic on a
+large database.
+
+Seeds a throwaway database of roughly --size-mb, then runs reader threads
+(point lookups and listing queries on fresh connections, like requests do)
+and a writer thread (one small UPDATE every 50 ms, like admin edits) while
+a backup runs in a separate process. Compared modes:
+
+    none       no backup: the baseline
+    stepped    backup.backup() with its default STEP_PAGES / STEP_SLEEP
+    one-step   the backup API copying every page in a single step
+
+Reports read and write latency during each run, how long the backup took
+and how much of that it spent copying the live file (the rest is chunking,
+compression and the integrity check, which touch only the copy).
+
+Usage:
+    python benchmarks/backup_pause.py --size-mb 200
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from row_memory import SCHEMA
+from startup_time import ROOT
+
+BACKUP_SCRIPT = '''
+import os, sys, time
+sys.path.insert(0, {root!r})
+import backup
+os.nice(10)  # as `flask backup-db` does
+store = backup.BackupStore({store!r})
+started = time.perf_counter()
+if {step_pages} > 0:
+    entry, _, _ = backup.backup({db!r}, store, step_pages={step_pages})
+else:
+    entry, _, _ = backup.backup({db!r}, store, step_pages=-1, step_sleep=0)
+print(time.perf_counter() - started, entry['copy_seconds'])
+'''
+
+
+def seed(path, size_mb):
+    conn = sqlite3.connect(path)
+    conn.execute(SCHEMA)
+    rows = size_mb * 1024  # ~1 KB per row
+    conn.executemany(
+        'INSERT INTO rental_items (name, image_path, price, category, description, display_order) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        ((f'Rental {i}', f'Images/SingularRentals/rental-{i}.webp', f'${i % 400}',
+          ('furniture', 'entertainment', 'decor')[i % 3], os.urandom(400).hex(), i) for i in range(rows)))
+    conn.execute('CREATE INDEX rental_order ON rental_items (display_order)')
+    conn.commit()
+    conn.close()
+    return rows
+
+
+def reader(path, rows, stop, latencies):
+    i = 0
+    while not stop.is_set():
+        i += 7919
+        started = time.perf_counter()
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute('SELECT * FROM rental_items WHERE id = ?', (i % rows + 1,)).fetchone()
+        conn.execute('SELECT id, name, price FROM rental_items ORDER BY display_order LIMIT 20 OFFSET ?',
+                     (i % 1000,)).fetchall()
+        conn.close()
+        latencies.append(time.perf_counter() - started)
+
+
+def writer(path, stop, latencies):
+    i = 0
+    while not stop.is_set():
+        i += 1
+        started = time.perf_counter()
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute('UPDATE rental_items SET price = ? WHERE id = 1', (f'${i}',))
+        conn.commit()
+        conn.close()
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.05)
+
+
+def run(mode, path, rows, tmp, args):
+    stop = threading.Event()
+    reads, writes = [], []
+    threads = [threading.Thread(target=reader, args=(path, rows, stop, reads)) for _ in range(args.readers)]
+    threads.append(threading.Thread(target=writer, args=(path, stop, writes)))
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    took = ''
+    if mode == 'none':
+        time.sleep(args.baseline)
+    else:
+        script = BACKUP_SCRIPT.format(root=ROOT, store=os.path.join(tmp, f'backups-{mode}'), db=path,
+                                      step_pages=0 if mode == 'one-step' else 64)
+        result = subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True)
+        total, copy = result.stdout.split()
+        took = f'backup {float(total):.2f}s (copying the live file {float(copy):.2f}s)'
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    def summary(values):
+        values = sorted(values)
+        return (f'p50 {statistics.median(values) * 1000:7.2f} ms  p99 {values[int(len(values) * 0.99)] * 1000:8.2f} ms  '
+                f'max {values[-1] * 1000:8.2f} ms')
+    print(f'{mode:<9} reads {summary(reads)}\n{"":<9} writes {summary(writes)}   {took}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=200)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--baseline', type=float, default=3.0, help='seconds of traffic without a backup')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'large.db')
+        rows = seed(path, args.size_mb)
+        print(f'{os.path.getsize(path) / 1048576:.0f} MB database, {args.readers} readers + 1 writer')
+        for mode in ('none', 'stepped', 'one-step'):
+            run(mode, path, rows, tmp, args)
+
+
+if __name__ == '__main__':
+    main()
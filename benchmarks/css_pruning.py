@@ -0,0 +1,103 @@
+"""
+CSS pruning benchmark: bytes and first render per route, with and without
+`flask build-assets`.
+
+Builds the assets into a temporary static folder (the repository's
+static/build/ is left alone), renders each public route through the Flask
+test client both ways and compares, per variant (mobile, desktop):
+
+    blocking   gzipped CSS the browser must download before the first paint
+    html       the gzipped page itself (the build inlines critical CSS into it)
+    deferred   gzipped CSS loaded without blocking render (the pruned sheet)
+
+First render is modelled rather than measured, with one connection on the
+given link: the page costs one round trip plus its transfer time, and a
+render-blocking stylesheet adds another round trip plus its own. Fonts,
+images and scripts are the same either way and left out.
+
+Usage:
+    python benchmarks/css_pruning.py
+    python benchmarks/css_pruning.py --rtt-ms 40 --kbps 10000   # a fast connection
+"""
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+from startup_time import ROOT
+
+LINK = re.compile(r'<link rel="stylesheet" href="/static/([^"?]+)[^"]*" media="([^"]+)"')
+
+
+def gzipped(data):
+    return len(gzip.compress(data if isinstance(data, bytes) else data.encode(), compresslevel=6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rtt-ms', type=float, default=150, help='round trip time (default: Lighthouse slow 4G)')
+    parser.add_argument('--kbps', type=float, default=1638.4, help='download bandwidth in kbit/s')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        shutil.copy(os.path.join(ROOT, 'glitzme_rentals.db'), db_path)
+        os.environ['DATABASE_PATH'] = db_path
+        os.environ.setdefault('ADMIN_PASSWORD', 'benchmark')
+        sys.path.insert(0, ROOT)
+        import app as site
+        import assets
+
+        static = os.path.join(tmp, 'static')
+        for folder in ('CSS', 'js'):
+            shutil.copytree(os.path.join(site.app.static_folder, folder), os.path.join(static, folder))
+        template_folder = os.path.join(site.app.root_path, site.app.template_folder)
+        manifest = assets.build(static, template_folder)
+        built = assets.Assets(static, template_folder, site.app.static_url_path)
+
+        def read(path):
+            with open(os.path.join(static, path), 'rb') as f:
+                return f.read()
+
+        item_id = site.db_manager.get_rental_items()[0].id
+        routes = ['/', '/rentals', '/packages', '/gallery', '/about', '/contact', f'/rentals/{item_id}',
+                  '/admin/login']
+        client = site.app.test_client()
+
+        def render(path, manifest):
+            site.site_assets.manifest = manifest
+            site.page_cache.clear()
+            return client.get(path).get_data(as_text=True)
+
+        def first_render_ms(html, blocking):
+            seconds_per_byte = 8 / (args.kbps * 1000)
+            total = args.rtt_ms / 1000 + html * seconds_per_byte
+            if blocking:
+                total += args.rtt_ms / 1000 + blocking * seconds_per_byte
+            return total * 1000
+
+        print(f'link: {args.rtt_ms:g} ms RTT, {args.kbps:g} kbit/s; sizes are gzipped bytes')
+        print(f'{"route":<16} {"variant":<8} {"blocking":>17} {"html":>17} {"deferred":>9} '
+              f'{"first render":>28}')
+        for path in routes:
+            before, after = render(path, None), render(path, built.manifest)
+            for variant, (source, _) in assets.VARIANTS.items():
+                linked = [href for href, media in LINK.findall(before) if href == source]
+                blocking = gzipped(read(source)) if linked else 0
+                pruned = [href for href, media in LINK.findall(after) if f'.{variant}.' in href]
+                deferred = gzipped(read(pruned[0])) if pruned else 0
+                html_before, html_after = gzipped(before), gzipped(after)
+                old, new = first_render_ms(html_before, blocking), first_render_ms(html_after, 0)
+                print(f'{path:<16} {variant:<8} {blocking:7d} -> {0:7d} {html_before:7d} -> {html_after:7d} '
+                      f'{deferred:9d} {old:7.0f} -> {new:5.0f} ms, {old - new:4.0f} faster')
+
+        for source, target in manifest['files'].items():
+            print(f'{source}: {gzipped(read(source))} -> {gzipped(read(target))} bytes gzipped '
+                  f'({len(read(source))} -> {len(read(target))} raw)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Image resizing benchmark: bytes per card page, and what a cache miss and hit
+cost for /img/<width>/<path>.
+
+Uses a throwaway cache directory. Times one miss (resize in the pool, write,
+index) and repeated hits (index lookup, send_file) for the largest event
+photo, then renders the rentals, packages and gallery pages through the
+Flask test client and adds up the card images each one loads, as the
+originals and at the width a browser would pick from the srcset (--width).
+
+Usage:
+    python benchmarks/image_resizing.py
+    python benchmarks/image_resizing.py --width 800   # 400px cards on a 2x display
+"""
+import argparse
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from startup_time import ROOT
+
+CARD_IMAGE = re.compile(r'<img src="(/img/\d+/[^"]+)"')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=480, help='srcset candidate the browser picks')
+    parser.add_argument('--hits', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        shutil.copy(os.path.join(ROOT, 'glitzme_rentals.db'), db_path)
+        os.environ['DATABASE_PATH'] = db_path
+        os.environ['RESIZE_CACHE_DIR'] = os.path.join(tmp, 'resized')
+        os.environ.setdefault('ADMIN_PASSWORD', 'benchmark')
+        sys.path.insert(0, ROOT)
+        import app as site
+
+        client = site.app.test_client()
+
+        def size(url):
+            response = client.get(url)
+            body = response.get_data()
+            response.close()
+            return len(body)
+
+        photos = os.path.join(site.app.static_folder, 'Images', 'EventPhotos')
+        largest = max(os.listdir(photos), key=lambda name: os.path.getsize(os.path.join(photos, name)))
+        url = f'/img/{args.width}/Images/EventPhotos/{largest}'
+        for width in (w for w in (240, 800, 1200) if w != args.width):
+            size(f'/img/{width}/Images/EventPhotos/{largest}')  # start the pool outside the timing
+        started = time.perf_counter()
+        size(url)
+        miss = time.perf_counter() - started
+        hits = []
+        for _ in range(args.hits):
+            started = time.perf_counter()
+            size(url)
+            hits.append(time.perf_counter() - started)
+        print(f'{largest} ({os.path.getsize(os.path.join(photos, largest)) // 1024} KB) at {args.width}px: '
+              f'miss {miss * 1000:.1f} ms, hit p50 {statistics.median(hits) * 1000:.2f} ms')
+
+        print(f'{"page":<10} {"images":>6} {"originals":>12} {"resized":>12}')
+        for path in ('/rentals', '/packages', '/gallery'):
+            urls = [url.replace('&amp;', '&') for url in CARD_IMAGE.findall(client.get(path).get_data(as_text=True))]
+            resized = [re.sub(r'^/img/\d+/', f'/img/{args.width}/', url) for url in urls]
+            originals = [site.app.static_url_path + '/' + url.split('/', 3)[3].split('?')[0] for url in urls]
+            before, after = sum(map(size, originals)), sum(map(size, resized))
+            print(f'{path:<10} {len(urls):6d} {before / 1024:9.0f} KB {after / 1024:9.0f} KB')
+
+
+if __name__ == '__main__':
+    main()
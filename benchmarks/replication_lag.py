@@ -0,0 +1,102 @@
+"""
+Replication benchmark: how long a catalog edit on the writer takes to show
+up on every read node, with everything running locally.
+
+Starts a writer (`flask publish-snapshots --watch`) and N read nodes (each
+`flask follow-snapshots --watch` plus Gunicorn with REPLICA_MODE=1), all
+sharing a temporary directory as the snapshot store. Then it renames a
+rental item on the writer repeatedly and times how long each read node
+takes to serve the new name. Each run uses a throwaway copy of the
+database.
+
+Usage:
+    python benchmarks/replication_lag.py --readers 3 --edits 10
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from startup_time import ROOT, free_port, stop, wait_for_first_response
+
+sys.path.insert(0, ROOT)
+
+
+def flask(env, *args, **popen):
+    return subprocess.Popen([sys.executable, '-m', 'flask', '--app', 'app', *args], cwd=ROOT, env=env,
+                            start_new_session=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **popen)
+
+
+def wait_for(url, text, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            if text in response.read().decode():
+                return
+        time.sleep(0.01)
+    raise TimeoutError(f'{url} never showed {text!r}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=3)
+    parser.add_argument('--edits', type=int, default=10)
+    parser.add_argument('--interval', type=float, default=0.25, help='publisher/follower poll interval')
+    args = parser.parse_args()
+
+    processes = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, 'store')
+        writer_db = os.path.join(tmp, 'writer.db')
+        shutil.copy(os.path.join(ROOT, 'glitzme_rentals.db'), writer_db)
+        base = dict(os.environ, ADMIN_PASSWORD=os.environ.get('ADMIN_PASSWORD', 'benchmark'), REPLICA_STORE=store)
+        writer_env = dict(base, DATABASE_PATH=writer_db)
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], cwd=ROOT, env=writer_env,
+                       check=True, stdout=subprocess.DEVNULL)
+        try:
+            processes.append(flask(writer_env, 'publish-snapshots', '--watch', '--interval', str(args.interval)))
+            ports = []
+            for i in range(args.readers):
+                env = dict(base, DATABASE_PATH=os.path.join(tmp, f'reader-{i}', 'catalog.db'), REPLICA_MODE='1',
+                           WEB_CONCURRENCY='1')
+                os.makedirs(os.path.dirname(env['DATABASE_PATH']))
+                processes.append(flask(env, 'follow-snapshots', '--watch', '--interval', str(args.interval)))
+                port = free_port()
+                while not os.path.exists(env['DATABASE_PATH']):
+                    time.sleep(0.05)
+                server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                           '-b', f'127.0.0.1:{port}', 'wsgi:app'], cwd=ROOT, env=env,
+                                          start_new_session=True, stdout=subprocess.DEVNULL,
+                                          stderr=subprocess.DEVNULL)
+                processes.append(server)
+                wait_for_first_response(f'http://127.0.0.1:{port}/health', server, 30)
+                ports.append(port)
+
+            os.environ['DATABASE_PATH'] = writer_db
+            from database import DatabaseManager
+            writer = DatabaseManager(writer_db)
+            item_id = writer.get_rental_items()[0].id
+            lags = []
+            for edit in range(args.edits):
+                name = f'Replicated rental {edit}'
+                started = time.perf_counter()
+                writer.update_rental_item(item_id, name=name)
+                for port in ports:
+                    wait_for(f'http://127.0.0.1:{port}/rentals/{item_id}', name)
+                lags.append(time.perf_counter() - started)
+        finally:
+            for proc in processes:
+                stop(proc)
+
+    print(f'{args.readers} read nodes, {args.edits} edits, poll interval {args.interval:g}s')
+    print(f'  edit visible on every reader: p50 {statistics.median(lags) * 1000:.0f} ms, '
+          f'max {max(lags) * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Row memory benchmark: bytes held by cached catalog rows as per-row dicts
+(the old ``dict(sqlite3.Row)`` copies) versus the slotted models in models.py.
+
+Seeds a throwaway database with N rental items, loads them both ways and
+reports tracemalloc's count of the memory each result list keeps alive,
+scaled to 10k rows, plus the load time.
+
+Usage:
+    python benchmarks/row_memory.py --rows 10000
+"""
+import argparse
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models import RentalItem, row_factory  # noqa: E402
+
+SCHEMA = '''
+    CREATE TABLE rental_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        image_path TEXT NOT NULL,
+        price TEXT NOT NULL,
+        deposit TEXT,
+        price_text TEXT DEFAULT 'Price',
+        deposit_text TEXT DEFAULT 'Required Deposit (Refundable)',
+        category TEXT DEFAULT 'general',
+        description TEXT,
+        is_active BOOLEAN DEFAULT 1,
+        display_order INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def seed(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(SCHEMA)
+    conn.executemany(
+        'INSERT INTO rental_items (name, image_path, price, deposit, category, description, display_order) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((f'Rental {i}', f'Images/SingularRentals/rental-{i}.webp', f'${i % 400}', '$50',
+          ('furniture', 'entertainment', 'decor')[i % 3], f'Description for rental {i}', i)
+         for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def load_dicts(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    rows = [dict(row) for row in conn.execute('SELECT * FROM rental_items ORDER BY display_order, name')]
+    conn.close()
+    return rows
+
+
+def load_models(path):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory(RentalItem)
+    rows = cursor.execute('SELECT * FROM rental_items ORDER BY display_order, name').fetchall()
+    conn.close()
+    return rows
+
+
+def measure(loader, path):
+    """(bytes retained by the result, seconds to load)"""
+    started = time.perf_counter()
+    loader(path)  # timed without tracemalloc, which slows allocation down
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    rows = loader(path)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return retained, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rows.db')
+        seed(path, args.rows)
+        scale = 10000 / args.rows
+        print(f'{args.rows} rental rows (figures per 10k rows)')
+        results = {}
+        for label, loader in (('dict rows', load_dicts), ('RentalItem', load_models)):
+            retained, elapsed = measure(loader, path)
+            results[label] = retained
+            print(f'  {label:<12} {retained * scale / 1048576:7.2f} MB   '
+                  f'{retained / args.rows:6.0f} B/row   load {elapsed * 1000 * scale:6.1f} ms')
+        saved = 1 - results['RentalItem'] / results['dict rows']
+        print(f'  slotted rows hold {saved:.0%} less memory')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Slow client benchmark: how a server copes with thousands of simultaneous
+slow connections while ordinary visitors keep loading the homepage.
+
+Opens N raw sockets that each either read a video a few KB at a time or
+trickle an inquiry body to /contact/submit, holds them for the duration, and
+meanwhile measures the latency of fast GET / requests. Runs against the
+default Gunicorn config (`gunicorn -c gunicorn.conf.py wsgi:app`) and the
+optional ASGI mode (`uvicorn asgi:application`). Each run uses a throwaway
+copy of the database.
+
+Usage:
+    python benchmarks/slow_clients.py --slow 2000 --duration 20
+    python benchmarks/slow_clients.py --servers asgi --slow 5000
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from startup_time import ROOT, free_port, stop, wait_for_first_response
+
+VIDEO_SUFFIXES = ('.mp4', '.webm', '.mov', '.m4v')
+INQUIRY = b'name=Slow+Client&email=slow%40example.com&message=' + b'x' * 2000
+
+SERVERS = {
+    'gunicorn': lambda port: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                              '-b', f'127.0.0.1:{port}', 'wsgi:app'],
+    'asgi': lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1',
+                          '--port', str(port), '--log-level', 'warning', '--backlog', '8192'],
+}
+
+
+def find_video():
+    """Path under /static/ of the largest video in static/, or None"""
+    videos = []
+    for folder, _, files in os.walk(os.path.join(ROOT, 'static')):
+        for name in files:
+            if name.lower().endswith(VIDEO_SUFFIXES):
+                path = os.path.join(folder, name)
+                videos.append((os.path.getsize(path), path))
+    if not videos:
+        return None
+    return '/' + os.path.relpath(max(videos)[1], ROOT).replace(os.sep, '/')
+
+
+async def slow_video(port, path, deadline, stats):
+    """Request the video and read it 4 KB every 100 ms"""
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection('127.0.0.1', port, limit=4096), timeout=10)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+        await writer.drain()
+        stats['connected'] += 1
+        first = True
+        while time.perf_counter() < deadline:
+            try:
+                chunk = await asyncio.wait_for(reader.read(4096), timeout=max(0.1, deadline - time.perf_counter()))
+            except asyncio.TimeoutError:  # never answered before the deadline
+                break
+            if not chunk:
+                break
+            if first:
+                stats['served'] += 1
+                first = False
+            await asyncio.sleep(0.1)
+        writer.close()
+    except (OSError, asyncio.TimeoutError):
+        stats['failed'] += 1
+
+
+async def slow_post(port, deadline, stats):
+    """Send an inquiry body 64 bytes every 100 ms, then read the response"""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout=10)
+        writer.write(f'POST /contact/submit HTTP/1.1\r\nHost: localhost\r\n'
+                     f'Content-Type: application/x-www-form-urlencoded\r\n'
+                     f'Content-Length: {len(INQUIRY)}\r\n\r\n'.encode())
+        stats['connected'] += 1
+        sent = 0
+        while sent < len(INQUIRY) and time.perf_counter() < deadline:
+            writer.write(INQUIRY[sent:sent + 64])
+            await asyncio.wait_for(writer.drain(), timeout=5)
+            sent += 64
+            await asyncio.sleep(0.1)
+        if sent >= len(INQUIRY):
+            status = await asyncio.wait_for(reader.readline(), timeout=5)
+            if status.startswith(b'HTTP/1.1 3'):
+                stats['served'] += 1
+        writer.close()
+    except (OSError, asyncio.TimeoutError):
+        stats['failed'] += 1
+
+
+async def fast_requests(port, deadline, latencies, timeouts):
+    """GET / one after another on fresh connections, recording latency"""
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout=5)
+            writer.write(b'GET / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+            await asyncio.wait_for(reader.read(), timeout=5)
+            writer.close()
+            latencies.append(time.perf_counter() - started)
+        except (OSError, asyncio.TimeoutError):
+            timeouts.append(started)
+        await asyncio.sleep(0.05)
+
+
+async def load(port, video, args):
+    deadline = time.perf_counter() + args.duration
+    stats = {'connected': 0, 'served': 0, 'failed': 0}
+    latencies, timeouts = [], []
+    slow = []
+    for i in range(args.slow):
+        if video and i % 2 == 0:
+            slow.append(slow_video(port, video, deadline, stats))
+        else:
+            slow.append(slow_post(port, deadline, stats))
+    tasks = [asyncio.create_task(coroutine) for coroutine in slow]
+    await asyncio.sleep(2)  # let the slow connections pile up first
+    await asyncio.gather(*(fast_requests(port, deadline, latencies, timeouts) for _ in range(4)))
+    await asyncio.gather(*tasks)
+    return stats, latencies, timeouts
+
+
+def run(server, video, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'glitzme_rentals.db')
+        shutil.copy(os.path.join(ROOT, 'glitzme_rentals.db'), db_path)
+        env = dict(os.environ, DATABASE_PATH=db_path)
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], cwd=ROOT, env=env,
+                       check=True, stdout=subprocess.DEVNULL)
+        port = free_port()
+        proc = subprocess.Popen(SERVERS[server](port), cwd=ROOT, env=env, start_new_session=True,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_first_response(f'http://127.0.0.1:{port}/health', proc, 30)
+            time.sleep(1)
+            stats, latencies, timeouts = asyncio.run(load(port, video, args))
+        finally:
+            stop(proc)
+
+    if latencies:
+        latencies.sort()
+        fast = (f'GET / p50 {statistics.median(latencies) * 1000:7.1f} ms   '
+                f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.1f} ms')
+    else:
+        fast = 'GET / never answered'
+    print(f'{server:<9} {fast}   timeouts {len(timeouts):4}   slow clients: '
+          f'{stats["connected"]} connected, {stats["served"]} served, {stats["failed"]} failed')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', nargs='+', default=['gunicorn', 'asgi'], choices=sorted(SERVERS))
+    parser.add_argument('--slow', type=int, default=2000, help='simultaneous slow connections')
+    parser.add_argument('--duration', type=float, default=20.0)
+    args = parser.parse_args()
+    os.environ.setdefault('ADMIN_PASSWORD', 'benchmark')
+
+    # Every slow client is a file descriptor on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if args.slow * 2 + 100 > hard:
+        print(f'warning: open file limit {hard} is too low for {args.slow} slow clients')
+
+    video = find_video()
+    print(f'{args.slow} slow clients ({"video readers and " if video else ""}trickled inquiries), '
+          f'{args.duration:g}s per server')
+    for server in args.servers:
+        if server == 'asgi' and importlib.util.find_spec('uvicorn') is None:
+            print('asgi      skipped (pip install -r requirements-asgi.txt)')
+            continue
+        run(server, video, args)
+
+
+if __name__ == '__main__':
+    main()
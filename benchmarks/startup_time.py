@@ -0,0 +1,105 @@
+"""
+Startup benchmark: time from process launch to the first successful request.
+
+Measures `python app.py` (development server) and Gunicorn with N workers.
+Each run uses a throwaway copy of the database so the repository copy is
+never modified.
+
+Usage:
+    python benchmarks/startup_time.py --workers 1 2 4 --runs 3
+    python benchmarks/startup_time.py --fresh   # include schema creation + seeding
+"""
+import argparse
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_first_response(url, proc, timeout):
+    """Poll url until it answers 200; return elapsed seconds since now"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'server exited with code {proc.returncode}')
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.005)
+    raise TimeoutError(f'no response from {url} within {timeout}s')
+
+
+def stop(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def time_to_first_request(command, env, port, timeout):
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=ROOT, env=env, start_new_session=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_first_response(f'http://127.0.0.1:{port}/', proc, timeout)
+        return time.perf_counter() - start
+    finally:
+        stop(proc)
+
+
+def run(label, build_command, args):
+    samples = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'glitzme_rentals.db')
+            if not args.fresh:
+                shutil.copy(os.path.join(ROOT, 'glitzme_rentals.db'), db_path)
+                # Apply the migration step up front, like a deploy would
+                subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], cwd=ROOT,
+                               env=dict(os.environ, DATABASE_PATH=db_path), check=True,
+                               stdout=subprocess.DEVNULL)
+            port = free_port()
+            env = dict(os.environ, DATABASE_PATH=db_path, PORT=str(port))
+            env.setdefault('ADMIN_PASSWORD', 'benchmark')
+            samples.append(time_to_first_request(build_command(port), env, port, args.timeout))
+    print(f'{label:<28} median {statistics.median(samples) * 1000:8.1f} ms   '
+          f'min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--fresh', action='store_true', help='start from an empty database')
+    args = parser.parse_args()
+    os.environ.setdefault('ADMIN_PASSWORD', 'benchmark')
+
+    run('python app.py', lambda port: [sys.executable, 'app.py'], args)
+    for workers in args.workers:
+        run(f'gunicorn -w {workers}',
+            lambda port, workers=workers: [sys.executable, '-m', 'gunicorn', '-w', str(workers),
+                                           '-b', f'127.0.0.1:{port}', 'app:app'],
+            args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Warm-start benchmark: per-worker memory and first-request latency for a cold
+Gunicorn boot (`app:app`) versus the preloaded production boot
+(`-c gunicorn.conf.py wsgi:app`).
+
+RSS counts shared pages in every worker; PSS divides them between the
+processes sharing them, so a drop in PSS is the copy-on-write saving.
+
+Usage:
+    python benchmarks/warm_start.py --workers 4
+"""
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from startup_time import ROOT, free_port, stop, wait_for_first_response
+
+ROUTES = ['/', '/rentals', '/packages', '/about', '/gallery', '/contact']
+
+
+def worker_pids(master_pid):
+    pids = []
+    for path in glob.glob(f'/proc/{master_pid}/task/*/children'):
+        with open(path) as f:
+            pids.extend(int(pid) for pid in f.read().split())
+    return pids
+
+
+def memory_kb(pid):
+    """(rss, pss) in kB from /proc/<pid>/smaps_rollup"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0]] = int(parts[1])
+    return values.get('Rss:', 0), values.get('Pss:', 0)
+
+
+def first_request_ms(port, path):
+    start = time.perf_counter()
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=10) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def measure(label, extra_args, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'glitzme_rentals.db')
+        shutil.copy(os.path.join(ROOT, 'glitzme_rentals.db'), db_path)
+        env = dict(os.environ, DATABASE_PATH=db_path)
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], cwd=ROOT, env=env,
+                       check=True, stdout=subprocess.DEVNULL)
+        port = free_port()
+        command = [sys.executable, '-m', 'gunicorn', *extra_args, '-w', str(workers), '-b', f'127.0.0.1:{port}']
+        proc = subprocess.Popen(command, cwd=ROOT, env=env, start_new_session=True,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_first_response(f'http://127.0.0.1:{port}/health', proc, 30)
+            while len(worker_pids(proc.pid)) < workers:
+                time.sleep(0.05)
+            time.sleep(0.5)  # let the remaining workers finish booting
+
+            # First hit on each route lands on a worker that has not served it yet
+            latencies = {path: first_request_ms(port, path) for path in ROUTES}
+            memory = [memory_kb(pid) for pid in worker_pids(proc.pid)]
+        finally:
+            stop(proc)
+
+    print(f'\n{label}')
+    for path, ms in latencies.items():
+        print(f'  first GET {path:<10} {ms:8.1f} ms')
+    for i, (rss, pss) in enumerate(memory):
+        print(f'  worker {i}: RSS {rss / 1024:6.1f} MiB   PSS {pss / 1024:6.1f} MiB')
+    print(f'  total worker PSS: {sum(pss for _, pss in memory) / 1024:.1f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    os.environ.setdefault('ADMIN_PASSWORD', 'benchmark')
+
+    # -c /dev/null: Gunicorn would otherwise pick up ./gunicorn.conf.py (and preload_app)
+    measure('cold workers (gunicorn app:app)', ['-c', '/dev/null', 'app:app'], args.workers)
+    measure('preloaded + warmed (gunicorn -c gunicorn.conf.py wsgi:app)',
+            ['-c', 'gunicorn.conf.py', 'wsgi:app'], args.workers)
+
+
+if __name__ == '__main__':
+    main()
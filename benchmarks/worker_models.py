@@ -0,0 +1,109 @@
+"""
+Worker model benchmark: throughput and latency of the production config
+(`gunicorn -c gunicorn.conf.py wsgi:app`) with each worker class, against
+the real public routes.
+
+Each client thread keeps one HTTP/1.1 connection open (as the reverse proxy
+does) and requests the routes round-robin for a fixed duration. gevent is
+skipped when it isn't installed. Each run uses a throwaway copy of the
+database.
+
+Usage:
+    python benchmarks/worker_models.py --clients 16 --duration 10
+    python benchmarks/worker_models.py --models sync gthread --workers 2
+"""
+import argparse
+import http.client
+import importlib.util
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from startup_time import ROOT, free_port, stop, wait_for_first_response
+
+ROUTES = ['/', '/rentals', '/rentals?page=2', '/packages', '/about', '/gallery', '/contact',
+          '/rentals/1', '/sitemap.xml']
+
+
+def client(port, duration, latencies, errors):
+    """Request ROUTES round-robin over one persistent connection until duration elapses"""
+    deadline = time.perf_counter() + duration
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    i = 0
+    while time.perf_counter() < deadline:
+        path = ROUTES[i % len(ROUTES)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+            response = conn.getresponse()
+            response.read()
+            if response.will_close:  # sync workers close after every response
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        except (OSError, http.client.HTTPException):
+            errors.append(path)
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def run(worker_class, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'glitzme_rentals.db')
+        shutil.copy(os.path.join(ROOT, 'glitzme_rentals.db'), db_path)
+        env = dict(os.environ, DATABASE_PATH=db_path, GUNICORN_WORKER_CLASS=worker_class)
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], cwd=ROOT, env=env,
+                       check=True, stdout=subprocess.DEVNULL)
+        if args.workers:
+            env['WEB_CONCURRENCY'] = str(args.workers)
+        port = free_port()
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-b', f'127.0.0.1:{port}', 'wsgi:app']
+        proc = subprocess.Popen(command, cwd=ROOT, env=env, start_new_session=True,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_first_response(f'http://127.0.0.1:{port}/health', proc, 30)
+            time.sleep(1)  # let every worker finish booting
+            latencies, errors = [], []
+            threads = [threading.Thread(target=client, args=(port, args.duration, latencies, errors))
+                       for _ in range(args.clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            stop(proc)
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else float('nan')
+    print(f'{worker_class:<8} {len(latencies) / args.duration:8.0f} req/s   '
+          f'p50 {statistics.median(latencies) * 1000:6.1f} ms   p99 {p99 * 1000:6.1f} ms   '
+          f'errors {len(errors)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--workers', type=int, help='override the computed worker count for every model')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+    os.environ.setdefault('ADMIN_PASSWORD', 'benchmark')
+
+    print(f'{args.clients} keep-alive clients, {args.duration:g}s per worker model')
+    for worker_class in args.models:
+        if worker_class == 'gevent' and importlib.util.find_spec('gevent') is None:
+            print('gevent   skipped (pip install gevent)')
+            continue
+        run(worker_class, args)
+
+
+if __name__ == '__main__':
+    main()
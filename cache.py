@@ -0,0 +1,169 @@
+"""
+In-process caching for GlitzME Rentals.
+
+Catalog reads are memoized per catalog version. The version lives in the
+database (``catalog_meta``) and is bumped by triggers on every write, so an
+edit made in any worker invalidates every other worker's cache on its next
+lookup. PageCache does the same for whole rendered pages, optionally expiring
+them at a known moment (see carousel.py).
+
+Both can sit in front of a shared backend (see cache_backends.py): a miss in
+this process is looked up there before anything is loaded or rendered, and
+what is loaded is written back for the other workers. Catalog values go
+there as JSON (rows as their model name and field values, see encode()),
+never pickles, so reading the cache can't run code; a value that doesn't
+decode is treated as a miss.
+"""
+import copy
+import functools
+import json
+import logging
+import time
+from dataclasses import fields
+
+import models
+from cache_backends import SHARED_TTL
+
+logger = logging.getLogger(__name__)
+
+# Model name -> class, for decoding shared catalog values
+MODELS = {model.__name__: model for model in models.Model.__subclasses__()}
+
+
+def encode(value):
+    """JSON-ready form of a catalog value: rows, SiteSettings, lists, dicts and scalars"""
+    if isinstance(value, models.Model):
+        return {'model': type(value).__name__, 'fields': [getattr(value, field.name) for field in fields(value)]}
+    if isinstance(value, models.SiteSettings):
+        return {'settings': list(value.values.items())}
+    if isinstance(value, dict):
+        return {'dict': [[key, encode(item)] for key, item in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    raise TypeError(f'{type(value).__name__} values are not shared')
+
+
+def decode(data):
+    """Inverse of encode()"""
+    if isinstance(data, list):
+        return [decode(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    if 'model' in data:
+        return MODELS[data['model']](*data['fields'])
+    if 'settings' in data:
+        return models.SiteSettings.from_rows(data['settings'])
+    return {key: decode(item) for key, item in data['dict']}
+
+
+class CatalogCache:
+    """Memoizes query results for a single catalog version"""
+
+    def __init__(self, backend=None):
+        # (version, entries) is swapped as one tuple so readers never pair
+        # entries with the wrong version
+        self._state = (None, {})
+        self.backend = backend
+
+    def get_or_load(self, version, key, loader):
+        """Return the cached value for key, loading it if the version moved on"""
+        cached_version, entries = self._state
+        if cached_version != version:
+            entries = {}
+            self._state = (version, entries)
+        try:
+            return entries[key]
+        except KeyError:
+            value = entries[key] = self._shared(version, key, loader)
+            return value
+
+    def _shared(self, version, key, loader):
+        if self.backend is None:
+            return loader()
+        shared_key = f'catalog:{version}:{key!r}'
+        data = self.backend.get(shared_key)
+        if data is not None:
+            try:
+                return decode(json.loads(data))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning('Ignoring undecodable shared cache entry %s (%s)', shared_key, e)
+        value = loader()
+        try:
+            data = json.dumps(encode(value), separators=(',', ':')).encode()
+        except TypeError:
+            return value  # not a catalog value we share; this worker still memoizes it
+        self.backend.set(shared_key, data)
+        return value
+
+    def clear(self):
+        """Drop this process's entries and everything in the shared backend"""
+        self._state = (None, {})
+        if self.backend is not None:
+            self.backend.clear()
+
+    @property
+    def version(self):
+        return self._state[0]
+
+    def __len__(self):
+        return len(self._state[1])
+
+
+def cached_read(method):
+    """Cache a DatabaseManager read method against the current catalog version.
+
+    Rows are frozen models (see models.py) shared by every caller; callers get
+    their own list or dict around them.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        value = self.cache.get_or_load(self.catalog_version(), key,
+                                       lambda: method(self, *args, **kwargs))
+        if isinstance(value, (list, dict)):
+            return copy.copy(value)
+        return value
+    return wrapper
+
+
+class PageCache:
+    """Rendered pages, each valid for one catalog version and until an optional expiry"""
+
+    def __init__(self, backend=None):
+        self._pages = {}  # key -> (version, expires_at epoch or None, body)
+        self.backend = backend
+
+    def get(self, key, version, now):
+        entry = self._pages.get(key)
+        if entry is None or entry[0] != version:
+            entry = self._shared_get(key, version)
+            if entry is None:
+                return None
+            self._pages[key] = entry
+        cached_version, expires_at, body = entry
+        if expires_at is not None and now >= expires_at:
+            return None
+        return body
+
+    def set(self, key, version, body, expires_at=None):
+        self._pages[key] = (version, expires_at, body)
+        if self.backend is not None:
+            ttl = SHARED_TTL if expires_at is None else min(SHARED_TTL, expires_at - time.time())
+            if ttl > 0:
+                # "<expires_at or empty>\n<html>": the page stays plain UTF-8, no pickling
+                header = b'' if expires_at is None else repr(expires_at).encode()
+                self.backend.set(f'page:{version}:{key}', header + b'\n' + body.encode(), ttl)
+
+    def _shared_get(self, key, version):
+        if self.backend is None:
+            return None
+        data = self.backend.get(f'page:{version}:{key}')
+        if data is None:
+            return None
+        header, _, body = data.partition(b'\n')
+        return version, float(header) if header else None, body.decode()
+
+    def clear(self):
+        self._pages = {}
@@ -0,0 +1,199 @@
+"""
+Shared cache backends.
+
+Every Gunicorn worker keeps its own in-process caches (see cache.py). A
+backend adds a second tier shared by all workers on a host, so a new catalog
+version is read from the database, and a page rendered, once per host
+instead of once per worker. Workers still memoize what they read from the
+backend, so steady-state requests never touch it.
+
+Backends store bytes; cache.py decides how values are encoded. Keys always
+include the catalog version or block revision they belong to, so nothing
+is ever invalidated in place: a write bumps the version and old entries
+simply expire (SHARED_TTL).
+
+Select one with CACHE_BACKEND:
+
+    local                 no shared tier (default)
+    sqlite                a SQLite file memory-mapped by every worker, in a private
+                          directory (mode 0700) next to DATABASE_PATH
+    sqlite:////path/x.db  the same, at an explicit path
+    redis://host:6379/0   a Redis-compatible server (needs `pip install redis`)
+
+Backend failures are logged and treated as misses; the site keeps serving
+from the database. The SQLite backend refuses a cache file (or its -wal/-shm
+files) owned by another user, as it does a default directory that isn't
+ours alone: whoever can write the cache decides what pages are served.
+"""
+import logging
+import os
+import sqlite3
+import stat
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SHARED_TTL = 3600  # seconds an entry may outlive the catalog version it was written for
+MMAP_SIZE = 64 * 1024 * 1024
+PRUNE_EVERY = 256  # SQLite backend: drop expired rows once per this many writes
+WARN_INTERVAL = 60  # seconds between repeated backend error log lines
+PRIVATE_DIR = '.glitzme-cache'  # default SQLite cache directory, next to the database
+
+
+class CacheBackend:
+    """Bytes key/value store shared between processes"""
+
+    def __init__(self):
+        self._warned_at = 0.0
+
+    def get(self, key):
+        """Stored bytes, or None when missing or expired"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=SHARED_TTL):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def _warn(self, action, error):
+        now = time.monotonic()
+        if now - self._warned_at >= WARN_INTERVAL:
+            self._warned_at = now
+            logger.warning('%s %s failed (%s); serving without the shared cache', type(self).__name__, action, error)
+
+
+class SQLiteBackend(CacheBackend):
+    """Cache table in a WAL-mode SQLite file.
+
+    Reads go through SQLite's memory map, so every worker reads the same
+    pages of the OS page cache rather than a copy over a socket.
+    """
+
+    def __init__(self, path, private_directory=False):
+        super().__init__()
+        self.path = path
+        self.private_directory = private_directory  # create the directory 0700 and insist on owning it
+        self._local = threading.local()  # one connection per thread, reopened after fork
+        self._writes = 0
+
+    def _check_files(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if self.private_directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            info = os.lstat(directory)
+            if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+                raise PermissionError(f'{directory} is not a directory owned by this user')
+            if stat.S_IMODE(info.st_mode) & 0o077:
+                os.chmod(directory, 0o700)
+        for name in (self.path, f'{self.path}-wal', f'{self.path}-shm'):
+            try:
+                info = os.lstat(name)
+            except FileNotFoundError:
+                continue
+            if not stat.S_ISREG(info.st_mode) or info.st_uid != os.getuid():
+                raise PermissionError(f'{name} is not a file owned by this user')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            self._check_files()
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')  # losing the cache in a crash is fine
+            conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                         'expires_at REAL NOT NULL)')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        try:
+            row = self._connection().execute('SELECT value FROM cache WHERE key = ? AND expires_at > ?',
+                                             (key, time.time())).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            self._warn('get', e)
+            return None
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=SHARED_TTL):
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute('INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                         (key, value, now + ttl))
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+        except (sqlite3.Error, OSError) as e:
+            self._warn('set', e)
+
+    def clear(self):
+        try:
+            self._connection().execute('DELETE FROM cache')
+        except (sqlite3.Error, OSError) as e:
+            self._warn('clear', e)
+
+
+class RedisBackend(CacheBackend):
+    """Adapter for a Redis-compatible server (Redis, Valkey, KeyDB, ...).
+
+    Takes any client with redis-py's get/set/delete/scan_iter methods, so a
+    stand-in such as fakeredis can replace the server in tests. Values are
+    JSON and page HTML: only use a server you trust with the pages it serves.
+    """
+
+    def __init__(self, client, prefix='glitzme:'):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, prefix='glitzme:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(f'CACHE_BACKEND={url} needs the redis package (pip install redis)') from None
+        # Short timeouts: a slow cache must not be slower than the database it fronts
+        return cls(redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25), prefix)
+
+    def get(self, key):
+        try:
+            return self.client.get(self.prefix + key)
+        except Exception as e:  # redis.RedisError, or whatever a stand-in raises
+            self._warn('get', e)
+            return None
+
+    def set(self, key, value, ttl=SHARED_TTL):
+        try:
+            self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+        except Exception as e:
+            self._warn('set', e)
+
+    def clear(self):
+        try:
+            keys = list(self.client.scan_iter(match=self.prefix + '*'))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as e:
+            self._warn('clear', e)
+
+
+def default_sqlite_path(db_path):
+    """Per-database cache file, so every process serving that database shares it"""
+    db_path = os.path.abspath(db_path)
+    return os.path.join(os.path.dirname(db_path), PRIVATE_DIR, f'{os.path.basename(db_path)}.cache')
+
+
+def from_url(url, db_path):
+    """Backend for a CACHE_BACKEND value, or None for process-local caching only"""
+    if not url or url == 'local':
+        return None
+    if url == 'sqlite':
+        return SQLiteBackend(default_sqlite_path(db_path), private_directory=True)
+    if url.startswith('sqlite:///'):
+        return SQLiteBackend(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend.from_url(url)
+    raise ValueError(f'Unknown CACHE_BACKEND {url!r} (expected local, sqlite, sqlite:///<path> or redis://...)')
@@ -0,0 +1,74 @@
+"""
+Homepage carousel scheduling.
+
+carousel_items rows can carry a starts_at/ends_at window, stored in UTC as
+'YYYY-MM-DD HH:MM:SS' (NULL means open-ended). The catalog cache holds every
+active row. Which rows are showing right now is worked out here, along with
+the next moment that answer changes, so the rendered homepage can be cached
+until exactly then instead of filtering by time in SQL on every hit.
+
+The admin form works in SITE_TIMEZONE and converts to UTC on save.
+"""
+import calendar
+import os
+import time
+from datetime import datetime, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+    SITE_TIMEZONE = ZoneInfo(os.environ.get('SITE_TIMEZONE', 'America/Los_Angeles'))
+except Exception:  # no tz database available: treat admin input as UTC
+    SITE_TIMEZONE = timezone.utc
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+FORM_FORMAT = '%Y-%m-%dT%H:%M'  # <input type="datetime-local">
+
+
+def parse_timestamp(value):
+    """Stored UTC timestamp -> epoch seconds (None stays None)"""
+    if not value:
+        return None
+    return calendar.timegm(time.strptime(str(value)[:19], TIMESTAMP_FORMAT))
+
+
+def status(item, now=None):
+    """'inactive', 'scheduled', 'live' or 'ended' for the admin list"""
+    now = time.time() if now is None else now
+    if not item.is_active:
+        return 'inactive'
+    starts_at, ends_at = parse_timestamp(item.starts_at), parse_timestamp(item.ends_at)
+    if starts_at is not None and now < starts_at:
+        return 'scheduled'
+    if ends_at is not None and now >= ends_at:
+        return 'ended'
+    return 'live'
+
+
+def schedule(items, now=None):
+    """(items showing at now, epoch of the next start/end after now or None)"""
+    now = time.time() if now is None else now
+    showing, next_change = [], None
+    for item in items:
+        starts_at, ends_at = parse_timestamp(item.starts_at), parse_timestamp(item.ends_at)
+        for moment in (starts_at, ends_at):
+            if moment is not None and moment > now and (next_change is None or moment < next_change):
+                next_change = moment
+        if (starts_at is None or starts_at <= now) and (ends_at is None or now < ends_at):
+            showing.append(item)
+    return showing, next_change
+
+
+def from_form(value):
+    """datetime-local value in SITE_TIMEZONE -> stored UTC timestamp (blank -> None)"""
+    if not value:
+        return None
+    local = datetime.strptime(value, FORM_FORMAT).replace(tzinfo=SITE_TIMEZONE)
+    return local.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def to_form(value):
+    """Stored UTC timestamp -> datetime-local value in SITE_TIMEZONE"""
+    if not value:
+        return ''
+    utc = datetime.strptime(str(value)[:19], TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+    return utc.astimezone(SITE_TIMEZONE).strftime(FORM_FORMAT)
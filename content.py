@@ -0,0 +1,156 @@
+"""
+Editable content blocks.
+
+Copy on the about, contact and home pages can be overridden from
+/admin/content. Each block is a content_pages row: page_identifier is the
+key templates use, section_key the page it belongs to, and content_type
+either 'markdown' (headings, paragraphs, lists) or 'text' (a single inline
+run: emphasis and links only, for spots like headings).
+
+Templates wrap their built-in copy in a call block, which is what shows
+until an admin saves the block:
+
+    {% call content_block('about') %}...built-in copy...{% endcall %}
+
+Source is HTML-escaped before any markup is added, so saved content can't
+inject tags or scripts. Each block is compiled once per revision (keyed by
+updated_at) and then served from memory, or from the shared cache backend
+when one is configured; rows come through the catalog cache, so a save shows
+up in every worker as soon as it sees the new catalog version.
+"""
+import re
+import threading
+
+from markupsafe import Markup, escape
+
+CONTENT_TYPES = ('markdown', 'text')
+
+# Blocks the templates know about: key -> (page, label, content_type)
+CONTENT_SLOTS = {
+    'home-team-intro': ('home', 'Homepage team section intro', 'text'),
+    'about': ('about', 'About page text', 'markdown'),
+    'contact-intro': ('contact', 'Contact page subheading', 'text'),
+}
+
+HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*$')
+LIST_ITEM = re.compile(r'^(?:([-*+])|(\d+)[.)])\s+(.*)$')
+LINK = re.compile(r'\[([^\]]+)\]\(([^)\s]+)\)')
+STRONG = re.compile(r'\*\*(.+?)\*\*|__(.+?)__')
+EMPHASIS = re.compile(r'\*(.+?)\*|\b_(.+?)_\b')
+SAFE_URL = re.compile(r'^(?:https?:|mailto:|tel:|/|#)', re.IGNORECASE)
+
+
+def _link(match):
+    text, url = match.group(1), match.group(2)
+    if not SAFE_URL.match(url):
+        return text
+    external = url.lower().startswith(('http:', 'https:'))
+    rel = ' target="_blank" rel="noopener noreferrer"' if external else ''
+    return f'<a href="{url}"{rel}>{text}</a>'
+
+
+def render_inline(source):
+    """Escape a run of text, then apply links, **strong** and *emphasis*"""
+    html = str(escape(source))
+    html = LINK.sub(_link, html)
+    html = STRONG.sub(lambda m: f'<strong>{m.group(1) or m.group(2)}</strong>', html)
+    html = EMPHASIS.sub(lambda m: f'<em>{m.group(1) or m.group(2)}</em>', html)
+    return html
+
+
+def render_markdown(source):
+    """Block-level Markdown subset -> HTML: headings, paragraphs and lists"""
+    html, paragraph, items, list_tag = [], [], [], None
+
+    def flush_paragraph():
+        if paragraph:
+            html.append('<p>' + '<br>\n'.join(render_inline(line) for line in paragraph) + '</p>')
+            paragraph.clear()
+
+    def flush_list():
+        nonlocal list_tag
+        if items:
+            html.append(f'<{list_tag}>' + ''.join(f'<li>{render_inline(item)}</li>' for item in items)
+                        + f'</{list_tag}>')
+            items.clear()
+        list_tag = None
+
+    for line in source.replace('\r\n', '\n').split('\n'):
+        stripped = line.strip()
+        heading = HEADING.match(stripped)
+        item = LIST_ITEM.match(stripped)
+        if not stripped:
+            flush_paragraph()
+            flush_list()
+        elif heading:
+            flush_paragraph()
+            flush_list()
+            level = max(len(heading.group(1)), 2)  # the page template owns the <h1>
+            html.append(f'<h{level}>{render_inline(heading.group(2))}</h{level}>')
+        elif item:
+            flush_paragraph()
+            tag = 'ul' if item.group(1) else 'ol'
+            if tag != list_tag:
+                flush_list()
+                list_tag = tag
+            items.append(item.group(3))
+        else:
+            flush_list()
+            paragraph.append(stripped)
+    flush_paragraph()
+    flush_list()
+    return '\n'.join(html)
+
+
+def compile_block(content, content_type):
+    """Stored block source -> safe Markup"""
+    if content_type == 'markdown':
+        return Markup(render_markdown(content))
+    return Markup(' '.join(render_inline(line.strip()) for line in content.splitlines() if line.strip()))
+
+
+class ContentBlocks:
+    """Compiled fragment cache in front of the content_pages rows"""
+
+    def __init__(self, db_manager, backend=None):
+        self.db_manager = db_manager
+        self.backend = backend
+        self._fragments = {}  # key -> (updated_at, content_type, Markup)
+        self._lock = threading.Lock()
+
+    def fragment(self, key):
+        """Compiled HTML for a saved block, or None if there isn't one"""
+        row = self.db_manager.get_content_blocks().get(key)
+        if row is None:
+            return None
+        cached = self._fragments.get(key)
+        if cached is not None and cached[:2] == (row['updated_at'], row['content_type']):
+            return cached[2]
+        html = self._compile(key, row)
+        with self._lock:
+            self._fragments[key] = (row['updated_at'], row['content_type'], html)
+        return html
+
+    def _compile(self, key, row):
+        if self.backend is None:
+            return compile_block(row['content'], row['content_type'])
+        shared_key = f"fragment:{key}:{row['updated_at']}:{row['content_type']}"
+        data = self.backend.get(shared_key)
+        if data is not None:
+            return Markup(data.decode())
+        html = compile_block(row['content'], row['content_type'])
+        self.backend.set(shared_key, str(html).encode())
+        return html
+
+    def template_global(self, key, caller=None):
+        """content_block(key): the saved block, else the template's built-in copy"""
+        html = self.fragment(key)
+        if html is not None:
+            return html
+        return caller() if caller is not None else Markup('')
+
+
+def init_app(app, db_manager):
+    blocks = ContentBlocks(db_manager, db_manager.cache.backend)
+    app.add_template_global(blocks.template_global, 'content_block')
+    return blocks
@@ -1,9 +1,83 @@
 import sqlite3
 import os
+import logging
+import threading
+import time
 from datetime import datetime
 from typing import List, Dict, Optional, Union
 
-DATABASE_PATH = 'glitzme_rentals.db'
+import cache_backends
+from cache import CatalogCache, cached_read
+from models import CarouselItem, PackageItem, RentalItem, SiteSetting, SiteSettings, TeamMember, row_factory
+
+DATABASE_PATH = os.environ.get('DATABASE_PATH', 'glitzme_rentals.db')
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+# Seconds a worker may reuse the catalog version it last read; a write made
+# through another worker reaches this one's caches within this delay (0: check
+# on every cached read)
+CATALOG_VERSION_TTL = float(os.environ.get('CATALOG_VERSION_TTL', 0))
+# Read node of a replicated deployment: DATABASE_PATH is a published snapshot (see replication.py)
+REPLICA_MODE = os.environ.get('REPLICA_MODE', '0') == '1'
+REPLICA_MMAP_SIZE = 256 * 1024 * 1024
+
+# Bump whenever init_database gains new tables/columns; stored in PRAGMA user_version
+SCHEMA_VERSION = 5
+
+# Tables whose writes bump catalog_meta.version (and so invalidate cached reads)
+CATALOG_TABLES = ('rental_items', 'package_items', 'team_members', 'site_settings',
+                  'gallery_images', 'content_pages', 'carousel_items')
+
+# Columns each admin list may change in bulk (see DatabaseManager.apply_batch)
+BATCH_COLUMNS = {
+    'rental_items': ('is_active', 'display_order', 'category'),
+    'package_items': ('is_active', 'display_order'),
+    'team_members': ('is_active', 'display_order'),
+}
+
+# Admin dashboard statistics: name -> query selecting (category, total, active)
+# rows (NULL category for tables without one). The catalog ones run as a
+# single UNION ALL cached per catalog version, the rest (LIVE_DASHBOARD_STATS)
+# as a second UNION ALL on every call; add more with register_dashboard_stat.
+DASHBOARD_STATS = {
+    'rentals': "SELECT category, COUNT(*), COALESCE(SUM(is_active), 0) FROM rental_items GROUP BY category",
+    'packages': "SELECT NULL, COUNT(*), COALESCE(SUM(is_active), 0) FROM package_items",
+    'team': "SELECT NULL, COUNT(*), COALESCE(SUM(is_active), 0) FROM team_members",
+}
+
+LIVE_DASHBOARD_STATS = set()
+
+def register_dashboard_stat(name: str, query: str, cached: bool = False):
+    """Add a dashboard statistic (e.g. bookings or inquiries).
+    
+    Pass cached=True only when every table the query reads is in
+    CATALOG_TABLES, so the catalog version moves when its counts do.
+    """
+    DASHBOARD_STATS[name] = query
+    if cached:
+        LIVE_DASHBOARD_STATS.discard(name)
+    else:
+        LIVE_DASHBOARD_STATS.add(name)
+
+logger = logging.getLogger(__name__)
+
+class TimedConnection(sqlite3.Connection):
+    """Connection that reports how long it was open to the manager's query observers"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.observers = ()
+        self.opened_at = time.perf_counter()
+        self.on_write = None
+    
+    def close(self):
+        wrote = self.on_write is not None and self.total_changes
+        super().close()
+        if wrote:
+            self.on_write()
+        if self.observers:
+            elapsed = time.perf_counter() - self.opened_at
+            for observer in self.observers:
+                observer(elapsed)
 
 class DatabaseManager:
     """
@@ -12,20 +86,111 @@ class DatabaseManager:
     and data management for the admin dashboard.
     """
     
-    def __init__(self, db_path: str = DATABASE_PATH):
+    def __init__(self, db_path: str = DATABASE_PATH, cache_backend=None,
+                 version_ttl: float = CATALOG_VERSION_TTL, read_only: bool = False):
+        # No I/O here: the schema is created by `flask init-db` and each
+        # process only verifies it on first use (see get_connection)
         self.db_path = db_path
-        self.init_database()
+        self.read_only = read_only
+        self._schema_checked = False
+        self.cache = CatalogCache(cache_backend)
+        self.version_ttl = version_ttl
+        self._version = None
+        self._version_read_at = 0.0
+        # Long-lived connection used only to read catalog_meta.version;
+        # reopened per process so it is never shared across a fork
+        self._version_conn = None
+        self._version_pid = None
+        self._version_inode = None
+        self._version_lock = threading.Lock()
+        # Callables receiving the seconds each connection spent open (see metrics.py)
+        self.query_observers = []
+        # Optional sqlite3 trace callback installed on new connections (see profiling.py)
+        self.statement_tracer = None
+    
+    def _open(self, **kwargs):
+        if self.read_only:
+            # Snapshots are replaced, never modified, so SQLite can skip locking and map the file
+            conn = sqlite3.connect(f'file:{os.path.abspath(self.db_path)}?mode=ro&immutable=1', uri=True, **kwargs)
+            conn.execute(f'PRAGMA mmap_size = {REPLICA_MMAP_SIZE}')
+            return conn
+        return sqlite3.connect(self.db_path, **kwargs)
+    
+    def _connect(self):
+        """Open a raw connection without the schema check"""
+        conn = self._open(factory=TimedConnection)
+        conn.row_factory = sqlite3.Row
+        conn.observers = self.query_observers
+        conn.on_write = self._catalog_written
+        if self.statement_tracer is not None:
+            conn.set_trace_callback(self.statement_tracer)
+        return conn
     
     def get_connection(self):
         """Get database connection with row factory for easier access"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._connect()
+        if not self._schema_checked:
+            self._ensure_schema(conn)
         return conn
     
+    def _ensure_schema(self, conn):
+        """Verify the schema version once per process, initializing it if the migration step was skipped"""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION and self.read_only:
+            logger.error("Snapshot %s is at schema version %s (expected %s); publish one from an upgraded writer",
+                         self.db_path, version, SCHEMA_VERSION)
+        elif version < SCHEMA_VERSION:
+            logger.warning("Database %s is at schema version %s (expected %s); run `flask init-db` "
+                           "before starting workers. Initializing now.", self.db_path, version, SCHEMA_VERSION)
+            self.init_database()
+        self._schema_checked = True
+    
+    def catalog_version(self) -> int:
+        """Current catalog version, bumped by triggers on every catalog write"""
+        if not self._schema_checked:
+            self.get_connection().close()
+        if self.version_ttl and self._version_pid == os.getpid() and \
+                time.monotonic() - self._version_read_at < self.version_ttl:
+            return self._version
+        with self._version_lock:
+            if self.read_only and self._version_conn is not None and \
+                    os.stat(self.db_path).st_ino != self._version_inode:
+                # A new snapshot was swapped in; this connection still reads the old file
+                self._version_conn.close()
+                self._version_conn = None
+            if self._version_conn is None or self._version_pid != os.getpid():
+                self._version_conn = self._open(check_same_thread=False)
+                self._version_pid = os.getpid()
+                self._version_inode = os.stat(self.db_path).st_ino
+            started = time.perf_counter()
+            version = self._version_conn.execute("SELECT version FROM catalog_meta").fetchone()[0]
+            self._version, self._version_read_at = version, time.monotonic()
+        for observer in self.query_observers:
+            observer(time.perf_counter() - started)
+        return version
+    
+    def _catalog_written(self):
+        """A connection of ours wrote: don't reuse the remembered version"""
+        self._version_read_at = 0.0
+    
+    def close_connections(self):
+        """Close long-lived connections (call in the Gunicorn master before forking)"""
+        with self._version_lock:
+            if self._version_conn is not None and self._version_pid == os.getpid():
+                self._version_conn.close()
+            self._version_conn = None
+            self._version_pid = None
+    
     def init_database(self):
-        """Initialize database with all required tables"""
-        conn = self.get_connection()
+        """Initialize database with all required tables and default data.
+        
+        Runs as a single transaction so concurrent callers can't seed twice.
+        Intended to be run once per deploy via `flask init-db`.
+        """
+        conn = self._connect()
+        conn.isolation_level = None  # manage the transaction explicitly
         cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
         
         # Create rental_items table
         cursor.execute('''
@@ -128,20 +293,90 @@ class DatabaseManager:
                 link_text TEXT,
                 display_order INTEGER DEFAULT 0,
                 is_active BOOLEAN DEFAULT 1,
+                starts_at TIMESTAMP,
+                ends_at TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        # Scheduling window (UTC, NULL = open-ended), added in schema version 4
+        self._add_missing_columns(cursor, 'carousel_items', {'starts_at': 'TIMESTAMP', 'ends_at': 'TIMESTAMP'})
         
-        conn.commit()
-        conn.close()
+        # Uploaded image inventory (see images.py); one row per distinct file content
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS image_assets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sha256 TEXT NOT NULL UNIQUE,
+                path TEXT,
+                thumbnail_path TEXT,
+                original_filename TEXT,
+                folder TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                status TEXT NOT NULL DEFAULT 'processing',
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Contact form submissions (see inquiries.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS inquiries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                email TEXT NOT NULL,
+                phone TEXT,
+                event_date TEXT,
+                event_type TEXT,
+                message TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Catalog version counter, bumped by triggers so every worker can
+        # cheaply tell whether its cached reads are still current
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS catalog_meta (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO catalog_meta (id, version) VALUES (1, 0)")
+        for table in CATALOG_TABLES:
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_bump_version
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE catalog_meta SET version = version + 1 WHERE id = 1;
+                    END
+                ''')
         
-        # Initialize with default data if tables are empty
-        self._populate_default_data()
+        try:
+            # Initialize with default data if tables are empty
+            self._populate_default_data(cursor)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        self._schema_checked = True
+    
+    def _add_missing_columns(self, cursor, table: str, columns: Dict[str, str]):
+        """ALTER TABLE ADD COLUMN for columns an older schema doesn't have yet"""
+        existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        for name, column_type in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
     
-    def _populate_default_data(self):
+    def _populate_default_data(self, cursor):
         """Populate database with existing hardcoded data"""
         # Check if we need to populate data
-        if self.get_rental_items():
+        cursor.execute("SELECT 1 FROM rental_items LIMIT 1")
+        if cursor.fetchone():
             return  # Data already exists
         
         # Insert default rental items
@@ -220,9 +455,10 @@ class DatabaseManager:
             }
         ]
         
-        for i, rental in enumerate(default_rentals):
-            rental['display_order'] = i
-            self.add_rental_item(**rental)
+        cursor.executemany('''
+            INSERT INTO rental_items (name, image_path, price, deposit, price_text, category, display_order)
+            VALUES (:name, :image_path, :price, :deposit, :price_text, :category, :display_order)
+        ''', [dict(rental, display_order=i) for i, rental in enumerate(default_rentals)])
         
         # Insert default package items
         default_packages = [
@@ -288,9 +524,10 @@ class DatabaseManager:
             }
         ]
         
-        for i, package in enumerate(default_packages):
-            package['display_order'] = i
-            self.add_package_item(**package)
+        cursor.executemany('''
+            INSERT INTO package_items (name, image_path, price, display_order)
+            VALUES (:name, :image_path, :price, :display_order)
+        ''', [dict(package, display_order=i) for i, package in enumerate(default_packages)])
         
         # Insert default team members
         default_team = [
@@ -317,8 +554,10 @@ class DatabaseManager:
             }
         ]
         
-        for member in default_team:
-            self.add_team_member(**member)
+        cursor.executemany('''
+            INSERT INTO team_members (name, role, image_path, mobile_image_path, display_order)
+            VALUES (:name, :role, :image_path, :mobile_image_path, :display_order)
+        ''', default_team)
         
         # Insert default site settings
         default_settings = [
@@ -335,8 +574,10 @@ class DatabaseManager:
             ('team_section_quote', '"None of us is as smart as all of us." - Ken Blanchard', 'text', 'Team section quote'),
         ]
         
-        for key, value, setting_type, description in default_settings:
-            self.set_site_setting(key, value, setting_type, description)
+        cursor.executemany('''
+            INSERT OR REPLACE INTO site_settings (setting_key, setting_value, setting_type, description)
+            VALUES (?, ?, ?, ?)
+        ''', default_settings)
         
         # Insert default carousel items
         default_carousel = [
@@ -358,14 +599,19 @@ class DatabaseManager:
             }
         ]
         
-        for item in default_carousel:
-            self.add_carousel_item(**item)
+        cursor.executemany('''
+            INSERT INTO carousel_items
+            (title, image_path, mobile_image_path, alt_text, link_url, link_text, display_order)
+            VALUES (:title, :image_path, :mobile_image_path, :alt_text, :link_url, :link_text, :display_order)
+        ''', [dict({'link_url': None, 'link_text': None}, **item) for item in default_carousel])
     
     # RENTAL ITEMS METHODS
-    def get_rental_items(self, active_only: bool = True, category: str = None) -> List[Dict]:
+    @cached_read
+    def get_rental_items(self, active_only: bool = True, category: str = None) -> List[RentalItem]:
         """Get all rental items"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = row_factory(RentalItem)
         
         query = "SELECT * FROM rental_items"
         params = []
@@ -383,18 +629,20 @@ class DatabaseManager:
         query += " ORDER BY display_order, name"
         
         cursor.execute(query, params)
-        items = [dict(row) for row in cursor.fetchall()]
+        items = cursor.fetchall()
         conn.close()
         return items
     
-    def get_rental_item(self, item_id: int) -> Optional[Dict]:
+    @cached_read
+    def get_rental_item(self, item_id: int) -> Optional[RentalItem]:
         """Get single rental item by ID"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = row_factory(RentalItem)
         cursor.execute("SELECT * FROM rental_items WHERE id = ?", (item_id,))
         row = cursor.fetchone()
         conn.close()
-        return dict(row) if row else None
+        return row
     
     def add_rental_item(self, name: str, image_path: str, price: str, deposit: str = None, 
                        price_text: str = 'Price', deposit_text: str = 'Required Deposit (Refundable)',
@@ -454,10 +702,12 @@ class DatabaseManager:
         return success
     
     # PACKAGE ITEMS METHODS
-    def get_package_items(self, active_only: bool = True) -> List[Dict]:
+    @cached_read
+    def get_package_items(self, active_only: bool = True) -> List[PackageItem]:
         """Get all package items"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = row_factory(PackageItem)
         
         query = "SELECT * FROM package_items"
         if active_only:
@@ -465,18 +715,20 @@ class DatabaseManager:
         query += " ORDER BY display_order, name"
         
         cursor.execute(query)
-        items = [dict(row) for row in cursor.fetchall()]
+        items = cursor.fetchall()
         conn.close()
         return items
     
-    def get_package_item(self, item_id: int) -> Optional[Dict]:
+    @cached_read
+    def get_package_item(self, item_id: int) -> Optional[PackageItem]:
         """Get single package item by ID"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = row_factory(PackageItem)
         cursor.execute("SELECT * FROM package_items WHERE id = ?", (item_id,))
         row = cursor.fetchone()
         conn.close()
-        return dict(row) if row else None
+        return row
     
     def add_package_item(self, name: str, image_path: str, price: str, 
                         price_text: str = 'Contact For Details', description: str = None, 
@@ -533,10 +785,12 @@ class DatabaseManager:
         return success
     
     # TEAM MEMBERS METHODS
-    def get_team_members(self, active_only: bool = True) -> List[Dict]:
+    @cached_read
+    def get_team_members(self, active_only: bool = True) -> List[TeamMember]:
         """Get all team members"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = row_factory(TeamMember)
         
         query = "SELECT * FROM team_members"
         if active_only:
@@ -544,18 +798,20 @@ class DatabaseManager:
         query += " ORDER BY display_order, name"
         
         cursor.execute(query)
-        members = [dict(row) for row in cursor.fetchall()]
+        members = cursor.fetchall()
         conn.close()
         return members
     
-    def get_team_member(self, member_id: int) -> Optional[Dict]:
+    @cached_read
+    def get_team_member(self, member_id: int) -> Optional[TeamMember]:
         """Get single team member by ID"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = row_factory(TeamMember)
         cursor.execute("SELECT * FROM team_members WHERE id = ?", (member_id,))
         row = cursor.fetchone()
         conn.close()
-        return dict(row) if row else None
+        return row
     
     def add_team_member(self, name: str, role: str, image_path: str, 
                        mobile_image_path: str = None,
@@ -612,6 +868,7 @@ class DatabaseManager:
         return success
     
     # SITE SETTINGS METHODS
+    @cached_read
     def get_site_setting(self, key: str) -> Optional[str]:
         """Get site setting value"""
         conn = self.get_connection()
@@ -621,32 +878,86 @@ class DatabaseManager:
         conn.close()
         return row['setting_value'] if row else None
     
-    def get_all_site_settings(self) -> Dict[str, str]:
-        """Get all site settings as dict"""
+    @cached_read
+    def get_site_setting_rows(self) -> List[SiteSetting]:
+        """All site settings with their type and description, by key"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT setting_key, setting_value FROM site_settings")
-        settings = {row['setting_key']: row['setting_value'] for row in cursor.fetchall()}
+        cursor.row_factory = row_factory(SiteSetting)
+        cursor.execute("SELECT * FROM site_settings ORDER BY setting_key")
+        rows = cursor.fetchall()
         conn.close()
-        return settings
+        return rows
+    
+    @cached_read
+    def get_all_site_settings(self) -> SiteSettings:
+        """Get all site settings (read-only, supports .get)"""
+        return SiteSettings.from_rows((row.setting_key, row.setting_value) for row in self.get_site_setting_rows())
     
-    def set_site_setting(self, key: str, value: str, setting_type: str = 'text', description: str = None) -> bool:
-        """Set or update site setting"""
+    @cached_read
+    def get_site_settings_updated_at(self) -> Optional[str]:
+        """Most recent site settings change (UTC timestamp string)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(updated_at) FROM site_settings")
+        row = cursor.fetchone()
+        conn.close()
+        return row[0]
+    
+    def set_site_setting(self, key: str, value: str, setting_type: str = None, description: str = None) -> bool:
+        """Set or update one site setting, keeping its type and description unless given"""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT OR REPLACE INTO site_settings (setting_key, setting_value, setting_type, description, updated_at)
-            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (key, value, setting_type, description))
+            INSERT INTO site_settings (setting_key, setting_value, setting_type, description, updated_at)
+            VALUES (?, ?, COALESCE(?, 'text'), ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (setting_key) DO UPDATE SET
+                setting_value = excluded.setting_value,
+                setting_type = COALESCE(?, setting_type),
+                description = COALESCE(excluded.description, description),
+                updated_at = CURRENT_TIMESTAMP
+        ''', (key, value, setting_type, description, setting_type))
         conn.commit()
         conn.close()
         return True
     
+    def update_site_settings(self, values: Dict[str, str]) -> List[str]:
+        """Write setting values in a single transaction, touching only keys whose value changed.
+        
+        Existing rows keep their type and description. Other workers see one
+        catalog version change for the whole save, so dependent caches are
+        invalidated once. Returns the changed keys.
+        """
+        conn = self.get_connection()
+        conn.isolation_level = None  # manage the transaction explicitly
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            changed = []
+            for key, value in values.items():
+                cursor.execute('''
+                    INSERT INTO site_settings (setting_key, setting_value) VALUES (?, ?)
+                    ON CONFLICT (setting_key) DO UPDATE SET
+                        setting_value = excluded.setting_value, updated_at = CURRENT_TIMESTAMP
+                    WHERE setting_value IS NOT excluded.setting_value
+                ''', (key, value))
+                if cursor.rowcount:
+                    changed.append(key)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return changed
+    
     # CAROUSEL METHODS
-    def get_carousel_items(self, active_only: bool = True) -> List[Dict]:
+    @cached_read
+    def get_carousel_items(self, active_only: bool = True) -> List[CarouselItem]:
         """Get carousel items"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = row_factory(CarouselItem)
         
         query = "SELECT * FROM carousel_items"
         if active_only:
@@ -654,29 +965,266 @@ class DatabaseManager:
         query += " ORDER BY display_order"
         
         cursor.execute(query)
-        items = [dict(row) for row in cursor.fetchall()]
+        items = cursor.fetchall()
         conn.close()
         return items
     
+    @cached_read
+    def get_carousel_item(self, item_id: int) -> Optional[CarouselItem]:
+        """Get single carousel item by ID"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory(CarouselItem)
+        cursor.execute("SELECT * FROM carousel_items WHERE id = ?", (item_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return row
+    
     def add_carousel_item(self, title: str, image_path: str, alt_text: str, 
                          mobile_image_path: str = None, link_url: str = None, 
-                         link_text: str = None, display_order: int = 0) -> int:
-        """Add carousel item"""
+                         link_text: str = None, display_order: int = 0,
+                         starts_at: str = None, ends_at: str = None) -> int:
+        """Add carousel item (starts_at/ends_at: UTC 'YYYY-MM-DD HH:MM:SS' or None)"""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO carousel_items 
-            (title, image_path, mobile_image_path, alt_text, link_url, link_text, display_order)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (title, image_path, mobile_image_path, alt_text, link_url, link_text, display_order))
+            (title, image_path, mobile_image_path, alt_text, link_url, link_text, display_order, starts_at, ends_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (title, image_path, mobile_image_path, alt_text, link_url, link_text, display_order, starts_at, ends_at))
         item_id = cursor.lastrowid
         conn.commit()
         conn.close()
         return item_id
+    
+    def update_carousel_item(self, item_id: int, **kwargs) -> bool:
+        """Update carousel item"""
+        if not kwargs:
+            return False
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        # Build dynamic update query
+        set_clauses = []
+        values = []
+        for key, value in kwargs.items():
+            if key in ['title', 'image_path', 'mobile_image_path', 'alt_text', 'link_url', 'link_text',
+                      'display_order', 'is_active', 'starts_at', 'ends_at']:
+                set_clauses.append(f"{key} = ?")
+                values.append(value)
+        
+        if not set_clauses:
+            conn.close()
+            return False
+        
+        values.append(item_id)
+        
+        query = f"UPDATE carousel_items SET {', '.join(set_clauses)} WHERE id = ?"
+        cursor.execute(query, values)
+        success = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return success
+    
+    def delete_carousel_item(self, item_id: int) -> bool:
+        """Delete carousel item"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM carousel_items WHERE id = ?", (item_id,))
+        success = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return success
+
+    # CONTENT BLOCK METHODS
+    @cached_read
+    def get_content_blocks(self) -> Dict[str, Dict]:
+        """All content blocks keyed by page_identifier"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM content_pages ORDER BY section_key, display_order, page_identifier")
+        blocks = {row['page_identifier']: dict(row) for row in cursor.fetchall()}
+        conn.close()
+        return blocks
+
+    def save_content_block(self, page_identifier: str, section_key: str, content: str,
+                           content_type: str = 'markdown', display_order: int = 0) -> bool:
+        """Create or replace a content block"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        # updated_at keys the compiled fragment cache, so it needs sub-second precision
+        cursor.execute('''
+            INSERT INTO content_pages (page_identifier, section_key, content, content_type, display_order, updated_at)
+            VALUES (?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+            ON CONFLICT(page_identifier) DO UPDATE SET
+                section_key = excluded.section_key,
+                content = excluded.content,
+                content_type = excluded.content_type,
+                display_order = excluded.display_order,
+                updated_at = excluded.updated_at
+        ''', (page_identifier, section_key, content, content_type, display_order))
+        success = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return success
+
+    def delete_content_block(self, page_identifier: str) -> bool:
+        """Delete a content block (the page falls back to its built-in copy)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM content_pages WHERE page_identifier = ?", (page_identifier,))
+        success = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return success
+
+    # INQUIRY METHODS
+    def add_inquiry(self, name: str, email: str, message: str, phone: str = None,
+                    event_date: str = None, event_type: str = None) -> int:
+        """Store a contact form submission"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO inquiries (name, email, phone, event_date, event_type, message)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (name, email, phone, event_date, event_type, message))
+        inquiry_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return inquiry_id
+    
+    # IMAGE ASSET METHODS
+    def add_image_asset(self, sha256: str, folder: str, size: int, original_filename: str = None) -> tuple:
+        """Register an upload by content hash; returns (asset, created).
+        
+        created is False when the same content was uploaded before, in which
+        case the existing asset is returned and nothing needs processing.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR IGNORE INTO image_assets (sha256, folder, bytes, original_filename)
+            VALUES (?, ?, ?, ?)
+        ''', (sha256, folder, size, original_filename))
+        created = cursor.rowcount > 0
+        conn.commit()
+        row = cursor.execute("SELECT * FROM image_assets WHERE sha256 = ?", (sha256,)).fetchone()
+        conn.close()
+        return dict(row), created
+    
+    def get_image_asset(self, asset_id: int) -> Optional[Dict]:
+        """Get single image asset by ID"""
+        conn = self.get_connection()
+        row = conn.execute("SELECT * FROM image_assets WHERE id = ?", (asset_id,)).fetchone()
+        conn.close()
+        return dict(row) if row else None
+    
+    def get_image_assets(self, status: str = None) -> List[Dict]:
+        """Get the image inventory, newest first"""
+        conn = self.get_connection()
+        query = "SELECT * FROM image_assets"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC, id DESC"
+        items = [dict(row) for row in conn.execute(query, params)]
+        conn.close()
+        return items
+    
+    def update_image_asset(self, asset_id: int, **kwargs) -> bool:
+        """Record processing results for an image asset"""
+        set_clauses = []
+        values = []
+        for key, value in kwargs.items():
+            if key in ['path', 'thumbnail_path', 'width', 'height', 'status', 'error']:
+                set_clauses.append(f"{key} = ?")
+                values.append(value)
+        if not set_clauses:
+            return False
+        
+        set_clauses.append("updated_at = CURRENT_TIMESTAMP")
+        values.append(asset_id)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"UPDATE image_assets SET {', '.join(set_clauses)} WHERE id = ?", values)
+        success = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return success
+    
+    # DASHBOARD METHODS
+    def get_dashboard_stats(self) -> Dict[str, Dict]:
+        """Total, active and per-category counts for every dashboard statistic"""
+        stats = self._catalog_dashboard_stats()
+        live = [name for name in DASHBOARD_STATS if name in LIVE_DASHBOARD_STATS]
+        if live:
+            stats.update(self._query_dashboard_stats(live))
+        return {name: stats[name] for name in DASHBOARD_STATS}
+    
+    @cached_read
+    def _catalog_dashboard_stats(self) -> Dict[str, Dict]:
+        return self._query_dashboard_stats([name for name in DASHBOARD_STATS if name not in LIVE_DASHBOARD_STATS])
+    
+    def _query_dashboard_stats(self, names: List[str]) -> Dict[str, Dict]:
+        """Counts for the named statistics, in one query"""
+        if not names:
+            return {}
+        query = ' UNION ALL '.join(f"SELECT {index}, * FROM ({DASHBOARD_STATS[name]})"
+                                   for index, name in enumerate(names))
+        stats = {name: {'total': 0, 'active': 0, 'categories': {}} for name in names}
+        conn = self.get_connection()
+        for index, category, total, active in conn.execute(query):
+            stat = stats[names[index]]
+            stat['total'] += total
+            stat['active'] += active
+            if category is not None:
+                stat['categories'][category] = {'total': total, 'active': active}
+        conn.close()
+        return stats
+    
+    # BATCH METHODS
+    def apply_batch(self, table: str, changes: List[tuple]) -> int:
+        """Apply (item_id, column, value) changes to one table in a single transaction.
+        
+        Rows already holding the value are skipped, so a reorder only touches
+        the rows that moved, and other workers see one catalog version change
+        for the whole batch. Returns the number of rows changed.
+        """
+        allowed = BATCH_COLUMNS.get(table)
+        if allowed is None:
+            raise ValueError(f"Batch edits are not supported for {table}")
+        by_column = {}
+        for item_id, column, value in changes:
+            if column not in allowed:
+                raise ValueError(f"Column {column} can't be batch edited on {table}")
+            by_column.setdefault(column, []).append((value, item_id, value))
+        
+        conn = self.get_connection()
+        conn.isolation_level = None  # manage the transaction explicitly
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            changed = 0
+            for column, rows in by_column.items():
+                cursor.executemany(f'''
+                    UPDATE {table} SET {column} = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND {column} IS NOT ?
+                ''', rows)
+                changed += cursor.rowcount
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return changed
 
 
-# Singleton instance
-db_manager = DatabaseManager()
+# Singleton instance (cheap: the database and any shared cache are opened lazily on first use)
+db_manager = DatabaseManager(cache_backend=cache_backends.from_url(CACHE_BACKEND, DATABASE_PATH),
+                             read_only=REPLICA_MODE)
 
 # Convenience functions for easy imports
 def get_rental_items(**kwargs):
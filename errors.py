@@ -0,0 +1,96 @@
+"""
+Cheap 404 handling.
+
+Unknown URLs used to redirect to the homepage, so every bot probe cost a
+redirect plus a full homepage render. Now a 404 is answered one of three ways,
+none of which touches the database:
+
+- known legacy URLs get a 301 from a redirect map, built once;
+- static files, probe paths (/wp-login.php, /.env, ...) and clients that
+  don't ask for HTML first get a tiny plain-text body;
+- browsers get templates/404.html, rendered once per process and then served
+  from memory.
+"""
+import re
+import threading
+
+from flask import Response, redirect, render_template, request, url_for
+
+# Old or guessable URLs -> endpoint they should land on (301)
+LEGACY_REDIRECTS = {
+    '/home': 'index',
+    '/index': 'index',
+    '/index.html': 'index',
+    '/index.php': 'index',
+    '/services': 'rentals',
+    '/rental': 'rentals',
+    '/package': 'packages',
+    '/about-us': 'about',
+    '/photos': 'gallery',
+    '/contact-us': 'contact_page',
+}
+# /rentals/, /about.html, /contact.htm ... -> the canonical page
+LEGACY_PAGE_PATTERN = re.compile(r'^/(rentals|packages|about|gallery|contact)(?:/|\.html?)$')
+PAGE_ENDPOINTS = {'rentals': 'rentals', 'packages': 'packages', 'about': 'about',
+                  'gallery': 'gallery', 'contact': 'contact_page'}
+
+PLAIN_PREFIXES = ('/static/', '/wp-', '/.', '/cgi-bin/', '/vendor/', '/api/')
+PLAIN_SUFFIXES = ('.php', '.asp', '.aspx', '.jsp', '.cgi', '.env', '.sql', '.bak', '.zip', '.gz',
+                  '.xml', '.txt', '.js', '.css', '.map', '.ico', '.png', '.jpg', '.jpeg', '.gif',
+                  '.webp', '.avif', '.svg', '.woff', '.woff2')
+
+NOT_FOUND_MAX_AGE = 300
+
+
+class NotFoundHandler:
+    """Answers 404s without rendering templates or querying the database per request"""
+
+    def __init__(self, app):
+        self.app = app
+        self._redirects = None
+        self._html = None
+        self._lock = threading.Lock()
+
+    def redirect_target(self, path):
+        if self._redirects is None:
+            # url_for needs a request context, so the map is resolved on the first 404
+            self._redirects = {source: url_for(endpoint) for source, endpoint in LEGACY_REDIRECTS.items()}
+        target = self._redirects.get(path.lower())
+        if target is None:
+            match = LEGACY_PAGE_PATTERN.match(path.lower())
+            if match:
+                target = url_for(PAGE_ENDPOINTS[match.group(1)])
+        return target
+
+    def wants_plain(self, path):
+        lowered = path.lower()
+        if lowered.startswith(PLAIN_PREFIXES) or lowered.endswith(PLAIN_SUFFIXES):
+            return True
+        # Browsers navigating put text/html first; curl, bots and fetch() calls don't
+        return request.accept_mimetypes.best != 'text/html'
+
+    def html(self):
+        if self._html is None:
+            with self._lock:
+                if self._html is None:
+                    self._html = render_template('404.html').encode('utf-8')
+        return self._html
+
+    def respond(self, error):
+        path = request.path
+        target = self.redirect_target(path)
+        if target is not None and request.method in ('GET', 'HEAD'):
+            response = redirect(target, code=301)
+        elif self.wants_plain(path):
+            response = Response(b'Not found\n', status=404, mimetype='text/plain')
+        else:
+            response = Response(self.html(), status=404, mimetype='text/html')
+        response.cache_control.public = True
+        response.cache_control.max_age = NOT_FOUND_MAX_AGE
+        return response
+
+
+def init_app(app):
+    handler = NotFoundHandler(app)
+    app.register_error_handler(404, handler.respond)
+    return handler
@@ -0,0 +1,137 @@
+"""
+Static export of the public site.
+
+Every public URL in the sitemap (plus the sitemap and robots.txt themselves)
+is rendered through the Flask test client and written to OUTPUT_DIR with
+precompressed .gz and .br siblings, so a front proxy can serve the public
+site without reaching Python:
+
+    /                   index.html
+    /rentals            rentals.html
+    /rentals?page=2     rentals/page/2.html
+    /rentals/5          rentals/5.html
+    /sitemap.xml        sitemap.xml
+
+Files whose content didn't change are left alone (mtimes and proxy caches
+stay valid), and files from a previous export that are no longer produced
+are removed. See the README for the matching Caddy config.
+"""
+import gzip
+import os
+import time
+from urllib.parse import parse_qs
+
+import carousel
+
+try:
+    import brotli  # installed with Flask-Compress
+except ImportError:
+    brotli = None
+
+EXTRA_PATHS = ('/sitemap.xml', '/robots.txt')
+MARKER = '.catalog-version'  # also marks a directory as ours to prune
+EXPORTED_SUFFIXES = ('.html', '.xml', '.txt')
+
+
+def output_path(path):
+    """URL path (optionally with ?page=N) -> file path relative to the export root"""
+    path, _, query = path.partition('?')
+    parts = [part for part in path.split('/') if part]
+    page = parse_qs(query).get('page')
+    if page:
+        parts += ['page', page[0]]
+    if not parts:
+        return 'index.html'
+    if parts[-1].endswith(EXPORTED_SUFFIXES):
+        return os.path.join(*parts)
+    return os.path.join(*parts) + '.html'
+
+
+def _compressed_variants(body):
+    variants = {'.gz': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(body, quality=11)
+    return variants
+
+
+class StaticExporter:
+    """Renders the public site into a directory of static files"""
+
+    def __init__(self, app, db_manager, sitemaps, output_dir):
+        self.app = app
+        self.db_manager = db_manager
+        self.sitemaps = sitemaps
+        self.output_dir = output_dir
+
+    def paths(self):
+        return [path for path, *_ in self.sitemaps.entries()] + list(EXTRA_PATHS)
+
+    def _write(self, relative_path, body):
+        """Atomically write body unless the file already holds it; returns True if written"""
+        path = os.path.join(self.output_dir, relative_path)
+        try:
+            with open(path, 'rb') as f:
+                if f.read() == body:
+                    return False
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        return True
+
+    def _prune(self, keep):
+        removed = 0
+        for directory, _, names in os.walk(self.output_dir, topdown=False):
+            for name in names:
+                relative_path = os.path.relpath(os.path.join(directory, name), self.output_dir)
+                base = relative_path[:-3] if relative_path.endswith(('.gz', '.br')) else relative_path
+                if relative_path in keep or not base.endswith(EXPORTED_SUFFIXES):
+                    continue
+                os.remove(os.path.join(directory, name))
+                removed += 1
+            if directory != self.output_dir and not os.listdir(directory):
+                os.rmdir(directory)
+        return removed
+
+    def export(self):
+        """Render every public page; returns a summary dict"""
+        version = self.db_manager.catalog_version()
+        prune = os.path.exists(os.path.join(self.output_dir, MARKER))
+        os.makedirs(self.output_dir, exist_ok=True)
+        client = self.app.test_client()
+        pages, written, keep, failed = 0, 0, {MARKER}, []
+        for path in self.paths():
+            response = client.get(path)
+            if response.status_code != 200:
+                failed.append((path, response.status_code))
+                continue
+            body = response.get_data()
+            relative_path = output_path(path)
+            pages += 1
+            files = {relative_path: body}
+            files.update((relative_path + suffix, data) for suffix, data in _compressed_variants(body).items())
+            for name, data in files.items():
+                written += self._write(name, data)
+                keep.add(name)
+        # Only prune a directory a previous export created, never an arbitrary one
+        removed = self._prune(keep) if prune and not failed else 0
+        self._write(MARKER, str(version).encode())
+        return {'version': version, 'pages': pages, 'written': written,
+                'removed': removed, 'failed': failed}
+
+    def watch(self, interval, on_export=None):
+        """Export now, then again whenever the catalog version changes or a carousel item starts/ends"""
+        exported_version, next_change = None, None
+        while True:
+            version = self.db_manager.catalog_version()
+            now = time.time()
+            if version != exported_version or (next_change is not None and now >= next_change):
+                summary = self.export()
+                exported_version = summary['version']
+                _, next_change = carousel.schedule(self.db_manager.get_carousel_items(), now)
+                if on_export:
+                    on_export(summary)
+            time.sleep(interval)
@@ -0,0 +1,139 @@
+"""
+Gunicorn configuration for GlitzME Rentals.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is preloaded in the master (see wsgi.py), so templates and the
+catalog cache are built once and shared copy-on-write by every worker.
+
+Worker model and counts come from the CPUs this container may actually use
+(cgroup CPU quota and affinity, not the host's core count) and its memory
+limit. Override with:
+
+    GUNICORN_WORKER_CLASS  sync | gthread | gevent | auto (default: auto = gthread,
+                           or gevent when it is installed and the CPU quota is
+                           below one core)
+    WEB_CONCURRENCY        worker processes
+    GUNICORN_THREADS       threads per gthread worker (default: 4)
+    GUNICORN_KEEPALIVE     seconds to hold idle keep-alive connections (default: 125)
+    GUNICORN_MAX_REQUESTS  recycle a worker after this many requests (default: 2000, 0 = never)
+
+Reloading: ``kill -HUP <master>`` re-reads this file and replaces workers
+gracefully, but because the app is preloaded the new workers fork from the
+master's copy of the code. To deploy new code without dropping connections,
+start a new master with ``kill -USR2 <master>``, then stop the old one with
+``kill -WINCH`` and ``kill -QUIT``; or simply restart the container.
+"""
+import gc
+import importlib.util
+import math
+import os
+
+WORKER_MEMORY_MB = 96  # generous per-worker budget (RSS of a warmed worker is ~45 MB)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """CPUs this process may use: affinity, capped by a cgroup v2/v1 CPU quota (fractional)"""
+    try:
+        cpus = float(len(os.sched_getaffinity(0)))
+    except AttributeError:  # not Linux
+        cpus = float(os.cpu_count() or 1)
+    quota = None
+    cpu_max = _read('/sys/fs/cgroup/cpu.max')  # cgroup v2: "<quota> <period>" or "max <period>"
+    if cpu_max and not cpu_max.startswith('max'):
+        limit, period = cpu_max.split()
+        quota = int(limit) / int(period)
+    else:
+        limit, period = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us'), _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+        if limit and period and int(limit) > 0:
+            quota = int(limit) / int(period)
+    return min(cpus, quota) if quota else cpus
+
+
+def memory_limit_mb():
+    """cgroup memory limit in MB, or None when unlimited"""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        value = _read(path)
+        if value and value != 'max' and int(value) < 1 << 60:  # v1 reports "unlimited" as a huge number
+            return int(value) // (1024 * 1024)
+    return None
+
+
+def choose_worker_class(cpus):
+    requested = os.environ.get('GUNICORN_WORKER_CLASS', 'auto')
+    if requested != 'auto':
+        return requested
+    # Below one core, one cooperative process beats several processes fighting over the quota
+    if cpus < 1 and importlib.util.find_spec('gevent') is not None:
+        return 'gevent'
+    # Threads let a worker keep serving while another request waits on SQLite or a slow client
+    return 'gthread'
+
+
+def choose_workers(worker_class, cpus):
+    if 'WEB_CONCURRENCY' in os.environ:
+        return int(os.environ['WEB_CONCURRENCY'])
+    if worker_class == 'sync':
+        count = 2 * math.ceil(cpus) + 1  # the classic formula: one per core waiting, one running
+    elif worker_class == 'gevent':
+        count = max(1, math.ceil(cpus))
+    else:
+        count = math.ceil(cpus) + 1
+    memory = memory_limit_mb()
+    if memory:
+        count = min(count, max(1, memory // WORKER_MEMORY_MB))
+    return max(1, count)
+
+
+cpu_count = available_cpus()
+worker_class = choose_worker_class(cpu_count)
+workers = choose_workers(worker_class, cpu_count)
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+if worker_class == 'gevent':
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 200))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '6001')}"
+preload_app = True
+
+# Caddy keeps idle upstream connections for 2 minutes by default. Holding ours
+# a little longer means the proxy always closes first, so it never reuses a
+# connection we are closing. Idle connections cost gthread/gevent workers only
+# a file descriptor; sync workers don't support keep-alive and ignore this.
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 125))
+
+# Recycle workers periodically to bound slow leaks; the jitter keeps them from
+# all restarting at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+timeout = 30
+graceful_timeout = 30  # in-flight requests get this long after SIGTERM/HUP
+
+
+def when_ready(server):
+    server.log.info('%s workers (%s%s) for %.2g CPUs', workers, worker_class,
+                    f' x {threads} threads' if threads > 1 else '', cpu_count)
+    # Move everything allocated during warm-up out of the GC's tracked
+    # generations; otherwise the first collection in each worker touches
+    # (and so copies) the shared pages
+    gc.freeze()
+
+
+def worker_exit(server, worker):
+    # Runs in the exiting worker: write the counts since its last periodic flush
+    import metrics
+    metrics.registry.flush()
+
+
+def child_exit(server, worker):
+    # Keep the exited worker's request counts without keeping its snapshot file
+    import metrics
+    metrics.retire_worker(worker.pid)
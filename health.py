@@ -0,0 +1,152 @@
+"""
+Liveness and readiness probes.
+
+/health/live only proves the process can answer. /health/ready checks what a
+request actually depends on: the database (with a bounded timeout), the
+catalog cache, SQLite's pending-write backlog, free disk space and readable
+static directories. Readiness results are cached for READY_CACHE_SECONDS so
+aggressive load-balancer probing doesn't turn into database load.
+"""
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from flask import jsonify
+
+from database import SCHEMA_VERSION
+
+READY_CACHE_SECONDS = 0.25
+DB_TIMEOUT_SECONDS = float(os.environ.get('HEALTH_DB_TIMEOUT', 0.25))
+MIN_FREE_DISK_BYTES = int(os.environ.get('HEALTH_MIN_FREE_MB', 100)) * 1024 * 1024
+# A journal/WAL this large means writes are piling up faster than they checkpoint
+WRITE_BACKLOG_WARN_BYTES = 16 * 1024 * 1024
+
+OK, WARN, FAIL = 'ok', 'warn', 'fail'
+
+
+def check_database(db_manager):
+    path = db_manager.db_path
+    if not os.path.exists(path):
+        return FAIL, {'error': f'{path} does not exist'}
+    started = time.perf_counter()
+    try:
+        # mode=ro so a probe never creates or writes the file; timeout bounds lock waits
+        conn = sqlite3.connect(f'file:{os.path.abspath(path)}?mode=ro', uri=True, timeout=DB_TIMEOUT_SECONDS)
+        try:
+            details = {'schema_version': conn.execute('PRAGMA user_version').fetchone()[0]}
+            if details['schema_version'] >= SCHEMA_VERSION:
+                details['catalog_version'] = conn.execute('SELECT version FROM catalog_meta').fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return FAIL, {'error': str(e), 'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)}
+    details['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    if details['schema_version'] < SCHEMA_VERSION:
+        details['error'] = f'schema version {details["schema_version"]} < {SCHEMA_VERSION}; run `flask init-db`'
+        return FAIL, details
+    return OK, details
+
+
+def check_cache(db_manager):
+    entries = len(db_manager.cache)
+    # Cold is not fatal (the first request fills it), but it shouldn't happen after warm_start
+    return (OK if entries else WARN), {'entries': entries, 'version': db_manager.cache.version}
+
+
+def check_write_backlog(db_manager):
+    """SQLite has no write queue; its pending-write backlog is the rollback journal / WAL"""
+    backlog = {}
+    for suffix in ('-journal', '-wal'):
+        try:
+            backlog[suffix.lstrip('-')] = os.path.getsize(db_manager.db_path + suffix)
+        except OSError:
+            pass
+    total = sum(backlog.values())
+    return (WARN if total > WRITE_BACKLOG_WARN_BYTES else OK), dict(backlog, bytes=total)
+
+
+def check_disk(paths):
+    status, details = OK, {}
+    for name, path in paths.items():
+        try:
+            free = shutil.disk_usage(path).free
+        except OSError as e:
+            status, details[name] = FAIL, {'error': str(e)}
+            continue
+        details[name] = {'free_mb': free // (1024 * 1024)}
+        if free < MIN_FREE_DISK_BYTES:
+            status = FAIL
+    return status, details
+
+
+def check_static_dirs(static_folder):
+    unreadable = []
+    images_dir = os.path.join(static_folder, 'Images')
+    try:
+        directories = [images_dir] + [entry.path for entry in os.scandir(images_dir) if entry.is_dir()]
+    except OSError:
+        directories = [images_dir]
+    for directory in directories:
+        if not os.access(directory, os.R_OK | os.X_OK):
+            unreadable.append(os.path.relpath(directory, static_folder))
+    return (FAIL if unreadable else OK), {'checked': len(directories), 'unreadable': unreadable}
+
+
+class ReadinessProbe:
+    """Runs the readiness checks, caching the result for READY_CACHE_SECONDS"""
+
+    def __init__(self, app, db_manager):
+        self.app = app
+        self.db_manager = db_manager
+        self._result = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def run_checks(self):
+        db_dir = os.path.dirname(os.path.abspath(self.db_manager.db_path))
+        checks = {
+            'database': check_database(self.db_manager),
+            'cache': check_cache(self.db_manager),
+            'write_backlog': check_write_backlog(self.db_manager),
+            'disk': check_disk({'database': db_dir, 'static': self.app.static_folder}),
+            'static_dirs': check_static_dirs(self.app.static_folder),
+        }
+        ready = all(status != FAIL for status, _ in checks.values())
+        return {
+            'status': 'ready' if ready else 'not_ready',
+            'checks': {name: dict(details, status=status) for name, (status, details) in checks.items()},
+            'timestamp': datetime.now().isoformat(),
+        }
+
+    def result(self):
+        now = time.monotonic()
+        if self._result is None or now - self._checked_at > READY_CACHE_SECONDS:
+            with self._lock:
+                # Another thread may have refreshed while we waited
+                if self._result is None or time.monotonic() - self._checked_at > READY_CACHE_SECONDS:
+                    self._result = self.run_checks()
+                    self._checked_at = time.monotonic()
+        return self._result
+
+
+def init_app(app, db_manager):
+    probe = ReadinessProbe(app, db_manager)
+
+    @app.route('/health/live')
+    def health_live():
+        """Liveness: the worker is running and can answer requests"""
+        return jsonify({'status': 'alive', 'pid': os.getpid(), 'timestamp': datetime.now().isoformat()})
+
+    @app.route('/health/ready')
+    def health_ready():
+        """Readiness: dependencies are usable; 503 if any check fails"""
+        result = probe.result()
+        response = jsonify(result)
+        response.status_code = 200 if result['status'] == 'ready' else 503
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    return probe
@@ -0,0 +1,222 @@
+"""
+Preload hints for public pages.
+
+A browser only finds a page's stylesheets, fonts, main.js and hero image
+once it has parsed the HTML. At startup this module reads every public
+template once and works out what each route will ask for:
+
+- the <link rel="preload"> / <link rel="preconnect"> tags in its <head>, and
+  external stylesheets (Google Fonts, Font Awesome);
+- its own stylesheets and scripts, with the URLs page_styles() and
+  asset_url() will render (so the preload and the real request match);
+- for templates that show the carousel, the first showing item's image with
+  the same srcset/sizes as the hero <img>. That part follows the catalog
+  version and carousel schedule.
+
+Routes are matched to templates by the render_template() call in their view.
+Every hinted response gets a Link header (add_headers); CDNs such as
+Cloudflare turn those into 103 Early Hints on their own. In ASGI mode,
+asgi.py also sends a 103 itself when the server supports it (EARLY_HINTS=0
+turns that off).
+
+Hints are split by device class. Chromium browsers send Sec-CH-UA-Mobile, and
+get only the mobile or desktop half; others get both, each with its media
+query, so they fetch just what applies. Responses carry
+Vary: Sec-CH-UA-Mobile, which has three values and keeps them shareable by
+caches.
+"""
+import inspect
+import os
+import re
+import time
+from typing import NamedTuple, Optional
+
+import carousel
+
+EARLY_HINTS = os.environ.get('EARLY_HINTS', '1') != '0'
+DEVICE_HEADER = 'Sec-CH-UA-Mobile'
+# As the hero <img> in index.html
+CAROUSEL_SIZES = '(max-width: 768px) 220px, 800px'
+
+LINK_TAG = re.compile(r'<link\b[^>]*>')
+ATTRIBUTE = re.compile(r'([a-zA-Z-]+)(?:="([^"]*)")?')
+STATIC_URL = re.compile(r"^\{\{\s*url_for\('static',\s*filename='([^']+)'\)\s*\}\}$")
+ASSET_URL = re.compile(r"asset_url\('([^']+)'\)")
+PAGE_STYLES = re.compile(r"page_styles\((.*?)\)\s*\}\}", re.S)
+KEYWORD = re.compile(r"(mobile|desktop)\s*=\s*'([^']*)'")
+RENDERS = re.compile(r"render_template\(\s*'([^']+\.html)'")
+ORDER = {'preconnect': 0, 'style': 1, 'script': 2, 'image': 3}
+
+
+class Hint(NamedTuple):
+    href: str
+    rel: str = 'preload'
+    kind: Optional[str] = None  # the preload "as"
+    media: Optional[str] = None
+    variant: Optional[str] = None  # 'mobile', 'desktop' or None for both
+    crossorigin: bool = False
+    imagesrcset: Optional[str] = None
+    imagesizes: Optional[str] = None
+
+    def urls(self):
+        """Every URL the hint may fetch (href and srcset candidates)"""
+        return [self.href] + [candidate.split()[0] for candidate in (self.imagesrcset or '').split(',') if candidate.strip()]
+
+    def header_value(self):
+        parts = [f'<{self.href}>', f'rel={self.rel}']
+        if self.kind:
+            parts.append(f'as={self.kind}')
+        for name in ('media', 'imagesrcset', 'imagesizes'):
+            value = getattr(self, name)
+            if value:
+                parts.append(f'{name}="{value}"')
+        if self.crossorigin:
+            parts.append('crossorigin')
+        return '; '.join(parts)
+
+
+def variant_of(media):
+    """Device class a media query targets, going by its width bounds"""
+    if not media:
+        return None
+    if 'max-width' in media and 'min-width' not in media:
+        return 'mobile'
+    if 'min-width' in media and 'max-width' not in media:
+        return 'desktop'
+    return None
+
+
+def device_class(headers):
+    """'mobile', 'desktop' or None (unknown) from the request's client hints"""
+    # Lowercase works for Werkzeug's headers and the lowercased dicts asgi.py builds
+    return {'?1': 'mobile', '?0': 'desktop'}.get(headers.get(DEVICE_HEADER.lower()))
+
+
+class PreloadHints:
+    """Per-route preload hints, built once from the templates"""
+
+    def __init__(self, app, assets, db_manager):
+        self.app = app
+        self.assets = assets
+        self.db_manager = db_manager
+        self.static_url_path = app.static_url_path
+        self.routes = {}  # endpoint -> template name
+        self.templates = {}  # template name -> [Hint] known from the template alone
+        self.carousel_templates = set()
+        self._carousel = (None, 0.0, ())  # (catalog version, valid until, hints)
+        self._values = {}  # (endpoint, device) -> (carousel hints used, header values)
+        self.build()
+
+    def build(self):
+        template_folder = os.path.join(self.app.root_path, self.app.template_folder)
+        for name in os.listdir(template_folder):
+            if name.endswith('.html'):
+                with open(os.path.join(template_folder, name), encoding='utf-8') as f:
+                    self.templates[name] = self._template_hints(name, f.read())
+        for endpoint, view in self.app.view_functions.items():
+            try:
+                source = inspect.getsource(inspect.unwrap(view))
+            except (OSError, TypeError):
+                continue
+            names = set(RENDERS.findall(source)) & set(self.templates)
+            if len(names) == 1:
+                self.routes[endpoint] = names.pop()
+
+    def _static(self, href):
+        match = STATIC_URL.match(href)
+        if match:
+            return f'{self.static_url_path}/{match.group(1)}'
+        return href if href.startswith(('https://', 'http://')) else None
+
+    def _template_hints(self, name, source):
+        head, _, body = source.partition('</head>')
+        hints = []
+        for tag in LINK_TAG.findall(head):
+            attributes = {key.lower(): value for key, value in ATTRIBUTE.findall(tag[len('<link'):-1])}
+            href = self._static(attributes.get('href') or '')
+            rel = attributes.get('rel')
+            if href is None:
+                continue
+            if rel == 'preconnect':
+                hints.append(Hint(href, 'preconnect', crossorigin='crossorigin' in attributes))
+            elif rel == 'preload' and attributes.get('as'):
+                media = attributes.get('media')
+                hints.append(Hint(href, kind=attributes['as'], media=media, variant=variant_of(media),
+                                  crossorigin='crossorigin' in attributes))
+            elif rel == 'stylesheet' and href.startswith('https://'):
+                hints.append(Hint(href, kind='style'))
+
+        styles = PAGE_STYLES.search(source)
+        if styles:
+            media = dict(KEYWORD.findall(styles.group(1)))
+            for variant, href, query, _ in self.assets.stylesheets(name, **media):
+                hints.append(Hint(href, kind='style', media=query, variant=variant))
+        for path in ASSET_URL.findall(source):
+            hints.append(Hint(self.assets.asset_url(path), kind='script' if path.endswith('.js') else 'style'))
+        if 'carousel_items' in body:
+            self.carousel_templates.add(name)
+        return hints
+
+    def _carousel_hints(self):
+        version, valid_until, hints = self._carousel
+        now = time.time()
+        current = self.db_manager.catalog_version()
+        if version == current and now < valid_until:
+            return hints
+        showing, next_change = carousel.schedule(self.db_manager.get_carousel_items(), now)
+        hints = ()
+        if showing:
+            item = showing[0]
+            mobile = f'{self.static_url_path}/{item.mobile_image_path or item.image_path}'
+            if item.mobile_image_path and item.image_path != item.mobile_image_path:
+                srcset = f'{mobile} 480w, {self.static_url_path}/{item.image_path} 800w'
+                hints = (Hint(mobile, kind='image', imagesrcset=srcset, imagesizes=CAROUSEL_SIZES),)
+            else:
+                hints = (Hint(mobile, kind='image'),)
+        self._carousel = (current, next_change or float('inf'), hints)
+        return hints
+
+    def for_endpoint(self, endpoint, device=None):
+        """Link header values for a route, for one device class or (None) both"""
+        template = self.routes.get(endpoint)
+        if template is None:
+            return []
+        dynamic = self._carousel_hints() if template in self.carousel_templates else ()
+        cached = self._values.get((endpoint, device))
+        if cached is not None and cached[0] is dynamic:
+            return cached[1]
+        # The carousel image stands in for the template's own preloads of the same files
+        replaced = {url for hint in dynamic for url in hint.urls()}
+        hints = list(dynamic) + [hint for hint in self.templates[template] if hint.href not in replaced]
+        seen, values = set(), []
+        for hint in sorted(hints, key=lambda hint: ORDER.get(hint.kind or hint.rel, 4)):
+            if device and hint.variant and hint.variant != device:
+                continue
+            if (hint.href, hint.media) in seen:
+                continue
+            seen.add((hint.href, hint.media))
+            values.append(hint.header_value())
+        self._values[(endpoint, device)] = (dynamic, values)
+        return values
+
+    def for_path(self, path, headers):
+        """Link header values for a GET of path (for 103 Early Hints before the app runs)"""
+        try:
+            endpoint, _ = self.app.url_map.bind('localhost').match(path, method='GET')
+        except Exception:  # NotFound, redirects, method mismatches: no hints
+            return []
+        return self.for_endpoint(endpoint, device_class(headers))
+
+    def apply(self, request, response):
+        """Add the Link header to a successful page response (called from add_headers)"""
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200 or \
+                response.mimetype != 'text/html' or request.endpoint not in self.routes:
+            return
+        values = self.for_endpoint(request.endpoint, device_class(request.headers))
+        if values:
+            response.headers['Link'] = ', '.join(values)
+            response.vary.add(DEVICE_HEADER)
+
+
+def init_app(app, assets, db_manager):
+    return PreloadHints(app, assets, db_manager)
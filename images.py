@@ -0,0 +1,292 @@
+"""
+Admin image uploads.
+
+POST /admin/api/images/upload streams multipart files straight to a spool
+directory, hashing them as they arrive, so no upload is held in memory.
+Each file is checked by its magic bytes, deduplicated by SHA-256 against
+the image_assets inventory, and handed to a process pool that re-encodes it
+to WebP (and AVIF when the installed Pillow supports it) and writes a
+thumbnail. The request returns 202 as soon as the files are on disk; the
+forms poll GET /admin/api/images/<id> until the asset is ready.
+
+Pillow is optional: without it WebP uploads are stored as-is and other
+formats keep their original encoding (no thumbnail).
+"""
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+from werkzeug.utils import secure_filename
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow not installed: store uploads without re-encoding
+    Image = None
+
+MAX_UPLOAD_BYTES = int(os.environ.get('IMAGE_MAX_UPLOAD_MB', 25)) * 1024 * 1024  # per file
+MAX_DIMENSION = 2400   # longest side of the stored image
+THUMBNAIL_SIZE = 480   # longest side of the thumbnail
+WEBP_QUALITY = 82
+AVIF_QUALITY = 60
+POOL_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+
+# Upload target -> directory under static/
+UPLOAD_FOLDERS = {
+    'rentals': 'Images/SingularRentals',
+    'packages': 'Images/Packages',
+    'team': 'Images/Team',
+    'carousel': 'Images/HomePageAdverts',
+    'gallery': 'Images/EventPhotos',
+}
+
+# Leading bytes -> extension for the formats we accept
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+
+def sniff_format(head):
+    """Image format from the first bytes of a file, or None if it isn't one we accept"""
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'avif', b'avis'):
+        return 'avif'
+    return None
+
+
+class HashingSpool:
+    """Writable file for werkzeug's stream_factory that hashes and size-checks as it spools"""
+
+    def __init__(self, directory, limit=MAX_UPLOAD_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=directory, prefix='upload-', delete=False)
+        self.name = self._file.name
+        self.limit = limit
+        self.size = 0
+        self.head = b''
+        self._hash = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            self.discard()
+            raise RequestEntityTooLarge(f'Images are limited to {self.limit // (1024 * 1024)} MB each')
+        if len(self.head) < 16:
+            self.head = (self.head + data)[:16]
+        self._hash.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def close(self):
+        self._file.close()
+
+    def discard(self):
+        self._file.close()
+        try:
+            os.remove(self.name)
+        except FileNotFoundError:
+            pass
+
+
+def _can_save(image_format):
+    Image.init()  # registers every plugin so SAVE is complete
+    return image_format in Image.SAVE
+
+
+def _atomic_save(image, path, **options):
+    tmp_path = f'{path}.tmp'
+    image.save(tmp_path, **options)
+    os.replace(tmp_path, path)
+
+
+def process_image(source, static_folder, folder, stem, source_format):
+    """Re-encode an upload and write its thumbnail; runs in the process pool.
+
+    Returns the inventory fields to record (paths relative to static/).
+    """
+    directory = os.path.join(static_folder, folder)
+    os.makedirs(directory, exist_ok=True)
+    try:
+        if Image is None:
+            path = f'{folder}/{stem}.{source_format}'
+            shutil.move(source, os.path.join(static_folder, path))
+            return {'path': path, 'thumbnail_path': None, 'width': None, 'height': None}
+
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            image.thumbnail((MAX_DIMENSION, MAX_DIMENSION))
+            path = f'{folder}/{stem}.webp'
+            _atomic_save(image, os.path.join(static_folder, path), format='WEBP', quality=WEBP_QUALITY, method=6)
+            if _can_save('AVIF'):
+                _atomic_save(image, os.path.join(static_folder, folder, f'{stem}.avif'),
+                             format='AVIF', quality=AVIF_QUALITY)
+            width, height = image.size
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            thumbnail_path = f'{folder}/{stem}-thumb.webp'
+            _atomic_save(image, os.path.join(static_folder, thumbnail_path), format='WEBP', quality=WEBP_QUALITY)
+        return {'path': path, 'thumbnail_path': thumbnail_path, 'width': width, 'height': height}
+    finally:
+        if os.path.exists(source):
+            os.remove(source)
+
+
+class ImageProcessor:
+    """Owns the per-process pool and records results in the inventory"""
+
+    def __init__(self, db_manager, static_folder, spool_dir=None):
+        self.db_manager = db_manager
+        self.static_folder = static_folder
+        self.spool_dir = spool_dir or os.environ.get('UPLOAD_SPOOL_DIR') or \
+            os.path.join(tempfile.gettempdir(), 'glitzme-uploads')
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # A pool doesn't survive fork, so each Gunicorn worker starts its own on first upload.
+        # spawn keeps the children from inheriting the worker's threads and sockets.
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=POOL_WORKERS,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _discard_pool(self, pool):
+        # A pool process died (OOM kill on a huge image, say); the pool refuses
+        # all further work, so the next upload starts a new one
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def stream_factory(self, total_content_length, content_type, filename, content_length=None):
+        return HashingSpool(self.spool_dir)
+
+    def submit(self, spool, filename, folder):
+        """Register a spooled upload and queue it for processing; returns (asset, duplicate)"""
+        source_format = sniff_format(spool.head)
+        if source_format is None:
+            spool.discard()
+            raise ValueError(f'{filename or "upload"} is not a JPEG, PNG, GIF, WebP or AVIF image')
+        asset, created = self.db_manager.add_image_asset(spool.sha256, folder, spool.size, filename)
+        if not created and asset['status'] != 'failed':
+            spool.discard()
+            return asset, True
+        if not created:
+            self.db_manager.update_image_asset(asset['id'], status='processing', error=None)
+            asset['status'] = 'processing'
+
+        spool.close()  # flush before the pool process reads it
+        stem = f'{secure_filename(os.path.splitext(filename or "")[0]) or "image"}-{spool.sha256[:8]}'
+        pool = self._executor()
+        try:
+            future = pool.submit(process_image, spool.name, self.static_folder, folder, stem, source_format)
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            pool = self._executor()
+            future = pool.submit(process_image, spool.name, self.static_folder, folder, stem, source_format)
+        future.add_done_callback(lambda done: self._record(asset['id'], done, pool))
+        return asset, False
+
+    def _record(self, asset_id, future, pool):
+        try:
+            fields = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._discard_pool(pool)
+            self.db_manager.update_image_asset(asset_id, status='failed', error=str(e))
+        else:
+            self.db_manager.update_image_asset(asset_id, status='ready', error=None, **fields)
+
+
+def _asset_json(asset, duplicate=False):
+    return {
+        'id': asset['id'],
+        'status': asset['status'],
+        'path': asset['path'],
+        'thumbnail_path': asset['thumbnail_path'],
+        'width': asset['width'],
+        'height': asset['height'],
+        'error': asset['error'],
+        'duplicate': duplicate,
+    }
+
+
+def init_app(app, db_manager, require_admin_auth):
+    processor = ImageProcessor(db_manager, app.static_folder)
+
+    @app.route('/admin/api/images/upload', methods=['POST'])
+    @require_admin_auth
+    def admin_api_images_upload():
+        """Stream one or more images (field "images") to disk and queue them for processing"""
+        # Parse the raw WSGI stream ourselves so files go through HashingSpool instead of memory
+        created = []
+
+        def stream_factory(*args, **kwargs):
+            spool = processor.stream_factory(*args, **kwargs)
+            created.append(spool)
+            return spool
+
+        try:
+            _, form, files = parse_form_data(request.environ, stream_factory=stream_factory)
+        except Exception:  # RequestEntityTooLarge from a spool, a dropped connection...
+            for spool in created:
+                spool.discard()
+            raise
+        spools = [storage.stream for storage in files.getlist('images')]
+        for spool in created:
+            if not any(spool is kept for kept in spools):
+                spool.discard()  # file parts under other field names, or cut off by a parse error
+        folder = UPLOAD_FOLDERS.get(form.get('folder', 'rentals'))
+        if folder is None or not spools:
+            for spool in spools:
+                spool.discard()
+            return jsonify({'success': False, 'error': 'Choose a valid folder and at least one image.'}), 400
+
+        results, errors = [], []
+        for storage in files.getlist('images'):
+            try:
+                asset, duplicate = processor.submit(storage.stream, storage.filename, folder)
+            except ValueError as e:
+                errors.append(str(e))
+                continue
+            results.append(_asset_json(asset, duplicate))
+        status = 202 if results else 400
+        return jsonify({'success': bool(results), 'images': results, 'errors': errors}), status
+
+    @app.route('/admin/api/images/<int:asset_id>')
+    @require_admin_auth
+    def admin_api_image_status(asset_id):
+        """Processing status of an uploaded image"""
+        asset = db_manager.get_image_asset(asset_id)
+        if asset is None:
+            return jsonify({'success': False, 'error': 'Unknown image'}), 404
+        return jsonify(dict(_asset_json(asset), success=True))
+
+    return processor
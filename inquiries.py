@@ -0,0 +1,35 @@
+"""
+Contact form submissions.
+
+Validation and feedback shared by the Flask view and the native async handler
+in asgi.py, so both modes accept and store exactly the same inquiries.
+
+Feedback travels back as a query token (``/contact?inquiry=sent``) rather than
+a flashed message, so public pages never need the session cookie and stay
+cacheable by shared caches. Only the fixed messages in FEEDBACK are ever
+rendered; unknown tokens are ignored.
+"""
+FIELDS = ('name', 'email', 'phone', 'event_date', 'event_type', 'message')
+REQUIRED = ('name', 'email', 'message')
+MAX_FIELD_LENGTH = 5000
+MAX_BODY_BYTES = 64 * 1024
+
+SENT = 'sent'
+MISSING = 'missing'
+FEEDBACK = {
+    SENT: ('success', 'Thank you for your inquiry! We will contact you within 24 hours to discuss your event needs.'),
+    MISSING: ('error', 'Please fill in all required fields (Name, Email, and Message).'),
+}
+
+
+def parse(form):
+    """(fields for DatabaseManager.add_inquiry, MISSING or None) from a submitted form"""
+    fields = {name: (form.get(name) or '').strip()[:MAX_FIELD_LENGTH] or None for name in FIELDS}
+    if not all(fields[name] for name in REQUIRED):
+        return fields, MISSING
+    return fields, None
+
+
+def feedback(token):
+    """(category, message) for a feedback token from the query string, or None"""
+    return FEEDBACK.get(token)
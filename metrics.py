@@ -0,0 +1,279 @@
+"""
+Request instrumentation for GlitzME Rentals.
+
+Records per-endpoint latency, DB time, template render time and response
+size in log-bucketed histograms and serves them on /metrics in the
+Prometheus text format.
+
+Each worker keeps its metrics in memory and periodically writes a snapshot
+to METRICS_DIR (one JSON file per pid). /metrics merges every snapshot, so
+the numbers cover all Gunicorn workers whichever one answers the scrape.
+A worker flushes once more as it exits (worker_exit in gunicorn.conf.py);
+then the master's child_exit hook folds its snapshot into retired.json and
+deletes it (retire_worker), so counters stay monotonic across restarts while a scrape
+reads one file per live worker plus one.
+"""
+import fcntl
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import Response, abort, g, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+
+# Log-scaled bucket bounds: 0.5 ms .. ~16 s and 256 B .. 16 MiB
+LATENCY_BUCKETS = tuple(0.0005 * 2 ** i for i in range(16))
+SIZE_BUCKETS = tuple(256 * 2 ** i for i in range(17))
+
+FLUSH_INTERVAL = 1.0  # seconds between snapshot writes per worker
+RETIRED_FILE = 'retired.json'  # counts of every worker that has exited
+
+HISTOGRAMS = {
+    'glitzme_request_duration_seconds': ('Request latency by endpoint', LATENCY_BUCKETS),
+    'glitzme_request_db_seconds': ('Time spent in DatabaseManager per request', LATENCY_BUCKETS),
+    'glitzme_template_render_seconds': ('Template render time by template', LATENCY_BUCKETS),
+    'glitzme_response_size_bytes': ('Response body size by endpoint (after compression)', SIZE_BUCKETS),
+}
+COUNTERS = {
+    'glitzme_requests_total': 'Requests by endpoint, method and status',
+}
+
+
+def _default_metrics_dir(master_pid=None):
+    # Gunicorn workers share their master's pid as parent, so they agree on the directory
+    return os.path.join(tempfile.gettempdir(), f'glitzme-metrics-{master_pid or os.getppid()}')
+
+
+def _merge(snapshots):
+    histograms, counters = {}, {}
+    for snapshot in snapshots:
+        for name, labels, counts, total in snapshot['histograms']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.setdefault(key, [[0] * len(counts), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, counters
+
+
+def _as_snapshot(histograms, counters):
+    return {
+        'histograms': [[name, labels, counts, total] for (name, labels), (counts, total) in histograms.items()],
+        'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+    }
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # gone, or being replaced; next scrape will see it
+
+
+def _write_snapshot(path, snapshot):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+class _DirectoryLock:
+    """flock on the metrics directory's lock file: shared for scrapes, exclusive for retiring"""
+
+    def __init__(self, directory, operation):
+        self.path = os.path.join(directory, 'retired.lock')
+        self.operation = operation
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self.fd, self.operation)
+
+    def __exit__(self, *exc):
+        os.close(self.fd)  # releases the lock
+
+
+def retire_worker(pid, directory=None):
+    """Fold an exited worker's snapshot into retired.json and delete it.
+
+    Runs in the Gunicorn master (child_exit in gunicorn.conf.py), whose pid
+    names the default directory.
+    """
+    directory = directory or os.environ.get('METRICS_DIR') or _default_metrics_dir(os.getpid())
+    path = os.path.join(directory, f'worker-{pid}.json')
+    if os.path.exists(f'{path}.tmp'):
+        os.remove(f'{path}.tmp')  # killed mid-flush
+    if not os.path.exists(path):
+        return
+    with _DirectoryLock(directory, fcntl.LOCK_EX):
+        snapshot = _read_snapshot(path)
+        if snapshot is not None:
+            retired_path = os.path.join(directory, RETIRED_FILE)
+            retired = _read_snapshot(retired_path)
+            _write_snapshot(retired_path, _as_snapshot(*_merge([snapshot] + ([retired] if retired else []))))
+        os.remove(path)
+
+
+class MetricsRegistry:
+    """Per-process histograms and counters with a shared on-disk snapshot"""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._histograms = {}  # (name, labels) -> [bucket counts..., +Inf count], sum
+        self._counters = {}    # (name, labels) -> value
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def observe(self, name, value, **labels):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0]
+            index = len(buckets)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    index = i
+                    break
+            entry[0][index] += 1
+            entry[1] += value
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    # SNAPSHOTS
+    def _directory(self):
+        if self.directory is None:
+            self.directory = os.environ.get('METRICS_DIR') or _default_metrics_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        return self.directory
+
+    def _snapshot(self):
+        with self._lock:
+            return _as_snapshot(self._histograms, self._counters)
+
+    def _own_file(self):
+        return os.path.join(self._directory(), f'worker-{os.getpid()}.json')
+
+    def maybe_flush(self):
+        """Write this worker's snapshot if the last write is older than FLUSH_INTERVAL"""
+        now = time.monotonic()
+        if now - self._last_flush < FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        self.flush()
+
+    def flush(self):
+        _write_snapshot(self._own_file(), self._snapshot())
+
+    def collect(self):
+        """Merge every worker's snapshot (live state for this worker)"""
+        directory = self._directory()
+        own_file = self._own_file()
+        snapshots = [self._snapshot()]
+        # Shared lock: a worker being retired is counted in its file or in retired.json, never both
+        with _DirectoryLock(directory, fcntl.LOCK_SH):
+            paths = glob.glob(os.path.join(directory, 'worker-*.json')) + [os.path.join(directory, RETIRED_FILE)]
+            snapshots += [_read_snapshot(path) for path in paths if path != own_file]
+        return _merge(snapshot for snapshot in snapshots if snapshot is not None)
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)"""
+        histograms, counters = self.collect()
+        lines = []
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for (metric, labels), (counts, total) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+                lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        for name, help_text in COUNTERS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+registry = MetricsRegistry()
+
+
+# FLASK INTEGRATION
+def _record_db_time(elapsed):
+    if has_request_context():
+        g._metrics_db_time = g.get('_metrics_db_time', 0.0) + elapsed
+
+
+def _template_started(sender, template, context, **extra):
+    g._metrics_template_start = time.perf_counter()
+
+
+def _template_finished(sender, template, context, **extra):
+    start = g.pop('_metrics_template_start', None)
+    if start is not None:
+        registry.observe('glitzme_template_render_seconds', time.perf_counter() - start,
+                         template=template.name or 'string')
+
+
+def init_app(app, db_manager):
+    """Register the instrumentation hooks and the /metrics endpoint.
+
+    Call before other extensions register after_request handlers (Flask runs
+    them in reverse order), so the recorded size is what goes on the wire.
+    """
+    db_manager.query_observers.append(_record_db_time)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        registry.observe('glitzme_request_duration_seconds', time.perf_counter() - start,
+                         endpoint=endpoint, method=request.method)
+        registry.observe('glitzme_request_db_seconds', g.pop('_metrics_db_time', 0.0), endpoint=endpoint)
+        size = response.content_length
+        if size is None:
+            size = response.calculate_content_length() or 0  # None for streamed bodies
+        registry.observe('glitzme_response_size_bytes', size, endpoint=endpoint)
+        registry.inc('glitzme_requests_total', endpoint=endpoint, method=request.method,
+                     status=str(response.status_code))
+        registry.maybe_flush()
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus scrape endpoint (set METRICS_TOKEN to require a bearer token)"""
+        token = os.environ.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(403)
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,158 @@
+"""
+Typed catalog rows.
+
+DatabaseManager builds these straight from SQLite with row_factory() instead
+of copying every sqlite3.Row into a dict. They are frozen and slotted, so a
+single cached instance is shared by every request in a worker: views can't
+mutate them, and a slotted row holds no per-instance __dict__. Template
+conveniences (like ``image``) are properties rather than keys added per
+request. The shared cache backends store them as their field values, in
+JSON (see cache.py).
+
+Measure the difference with ``python benchmarks/row_memory.py``.
+"""
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+
+def row_factory(model):
+    """sqlite3 row factory that builds model instances by column name.
+
+    Columns the model doesn't declare are ignored, so SELECT * keeps working
+    when a migration adds a column before the model knows about it.
+    """
+    names = [field.name for field in fields(model)]
+    plans = {}  # cursor.description -> how to map a row onto the model
+
+    def plan(description):
+        columns = {column[0]: index for index, column in enumerate(description)}
+        if all(name in columns for name in names):
+            return tuple(columns[name] for name in names), None  # positional: the fast path
+        return None, [(columns[name], name) for name in names if name in columns]
+
+    def factory(cursor, row):
+        description = cursor.description
+        try:
+            positions, keywords = plans[description]
+        except KeyError:
+            positions, keywords = plans[description] = plan(description)
+        if positions is not None:
+            return model(*[row[index] for index in positions])
+        return model(**{name: row[index] for index, name in keywords})
+    return factory
+
+
+class Model:
+    """Base for the row models"""
+    __slots__ = ()
+
+
+@dataclass(frozen=True, slots=True)
+class RentalItem(Model):
+    id: int
+    name: str
+    image_path: str
+    price: str
+    deposit: Optional[str] = None
+    price_text: str = 'Price'
+    deposit_text: str = 'Required Deposit (Refundable)'
+    category: str = 'general'
+    description: Optional[str] = None
+    is_active: bool = True
+    display_order: int = 0
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+    @property
+    def image(self):
+        return self.image_path
+
+
+@dataclass(frozen=True, slots=True)
+class PackageItem(Model):
+    id: int
+    name: str
+    image_path: str
+    price: str
+    price_text: str = 'Contact For Details'
+    description: Optional[str] = None
+    is_active: bool = True
+    display_order: int = 0
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+    @property
+    def image(self):
+        return self.image_path
+
+
+@dataclass(frozen=True, slots=True)
+class TeamMember(Model):
+    id: int
+    name: str
+    role: str
+    image_path: str
+    mobile_image_path: Optional[str] = None
+    display_order: int = 0
+    is_active: bool = True
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+    @property
+    def image(self):
+        return self.image_path
+
+
+@dataclass(frozen=True, slots=True)
+class CarouselItem(Model):
+    id: int
+    title: str
+    image_path: str
+    alt_text: str
+    mobile_image_path: Optional[str] = None
+    link_url: Optional[str] = None
+    link_text: Optional[str] = None
+    display_order: int = 0
+    is_active: bool = True
+    starts_at: Optional[str] = None  # UTC, see carousel.py
+    ends_at: Optional[str] = None
+    created_at: Optional[str] = None
+
+    @property
+    def image(self):
+        return self.image_path
+
+
+@dataclass(frozen=True, slots=True)
+class SiteSetting(Model):
+    setting_key: str
+    setting_value: Optional[str]
+    setting_type: str = 'text'
+    description: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class SiteSettings:
+    """Read-only setting_key -> setting_value mapping (templates use .get)"""
+    values: Mapping[str, str]
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls(MappingProxyType({key: value for key, value in rows}))
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
@@ -0,0 +1,265 @@
+"""
+Opt-in sampling profiler for production workers.
+
+An admin sets a sample percentage on /admin/profiling. That percentage of
+requests is then profiled by a background thread that samples the request
+thread's stack every PROFILE_INTERVAL seconds. Each profiled request writes
+two files to PROFILE_DIR:
+
+    <time>-<pid>-<endpoint>.collapsed   folded stacks (flamegraph.pl / speedscope)
+    <time>-<pid>-<endpoint>.sql.log     statements DatabaseManager ran, with offsets
+
+The percentage lives in PROFILE_DIR/config.json so every worker picks it up
+within a second. When it is 0 the per-request cost is one clock read and a
+comparison, and no SQL tracing is installed.
+"""
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, request
+
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.002))
+CONFIG_CHECK_INTERVAL = 1.0  # seconds between config.json checks per worker
+MAX_PROFILES = 500           # oldest profiles beyond this are deleted
+
+
+class RequestProfiler:
+    """Samples the stacks of registered threads and records their SQL"""
+
+    def __init__(self, directory=None, interval=PROFILE_INTERVAL):
+        self.directory = directory or os.environ.get('PROFILE_DIR') or \
+            os.path.join(tempfile.gettempdir(), 'glitzme-profiles')
+        self.interval = interval
+        self.sample_percent = 0.0
+        self.db_manager = None
+        self._config_checked = 0.0
+        self._config_mtime = None
+        self._samples = {}  # thread id -> Counter of folded stacks
+        self._sql = {}      # thread id -> (start, [(offset, statement), ...])
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sampler = None
+        self._sampler_pid = None
+
+    # CONFIGURATION
+    @property
+    def config_path(self):
+        return os.path.join(self.directory, 'config.json')
+
+    def set_sample_percent(self, percent):
+        """Persist the sample percentage for all workers; ValueError if it isn't a finite number"""
+        percent = float(percent)
+        if not math.isfinite(percent):
+            raise ValueError(f'sample percentage must be a finite number, not {percent}')
+        percent = max(0.0, min(100.0, percent))
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{self.config_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'sample_percent': percent}, f)
+        os.replace(tmp_path, self.config_path)
+        self._apply(percent)
+        self._config_checked = 0.0
+
+    def refresh(self):
+        """Re-read config.json if it changed (at most once per CONFIG_CHECK_INTERVAL)"""
+        now = time.monotonic()
+        if now - self._config_checked < CONFIG_CHECK_INTERVAL:
+            return
+        self._config_checked = now
+        try:
+            mtime = os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._config_mtime:
+            return
+        self._config_mtime = mtime
+        percent = 0.0
+        if mtime is not None:
+            try:
+                with open(self.config_path) as f:
+                    percent = float(json.load(f).get('sample_percent', 0))
+            except (OSError, ValueError):
+                return
+            if not math.isfinite(percent):
+                percent = 0.0  # written by hand or an older version: leave profiling off
+        self._apply(percent)
+
+    def _apply(self, percent):
+        self.sample_percent = percent
+        if self.db_manager is not None:
+            # Only pay for SQL tracing while profiling is switched on
+            self.db_manager.statement_tracer = self._trace_sql if percent > 0 else None
+
+    def should_profile(self):
+        self.refresh()
+        return self.sample_percent > 0 and random.random() * 100 < self.sample_percent
+
+    # SAMPLING
+    def start(self):
+        """Start profiling the calling thread"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._samples[thread_id] = Counter()
+            self._sql[thread_id] = (time.perf_counter(), [])
+        self._ensure_sampler()
+        self._wake.set()
+
+    def stop(self):
+        """Stop profiling the calling thread; returns (stack counts, sql log)"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            samples = self._samples.pop(thread_id, Counter())
+            _, statements = self._sql.pop(thread_id, (None, []))
+            if not self._samples:
+                self._wake.clear()
+        return samples, statements
+
+    @contextmanager
+    def profile(self):
+        """Profile the calling thread for the duration of the block"""
+        self.start()
+        result = {}
+        try:
+            yield result
+        finally:
+            result['samples'], result['statements'] = self.stop()
+
+    def _ensure_sampler(self):
+        # Threads don't survive fork, so start one per process
+        if self._sampler is not None and self._sampler_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sampler is None or self._sampler_pid != os.getpid():
+                self._sampler = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._sampler_pid = os.getpid()
+                self._sampler.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, counter in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counter[_fold(frame)] += 1
+
+    def _trace_sql(self, statement):
+        entry = self._sql.get(threading.get_ident())
+        if entry is not None:
+            start, statements = entry
+            statements.append((time.perf_counter() - start, statement))
+
+    # OUTPUT
+    def write(self, name, samples, statements):
+        """Write collapsed stacks and the SQL log; returns the .collapsed path"""
+        os.makedirs(self.directory, exist_ok=True)
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
+        now = time.time()
+        stamp = f'{time.strftime("%Y%m%d-%H%M%S", time.localtime(now))}.{int(now * 1000) % 1000:03d}'
+        base = os.path.join(self.directory, f'{stamp}-{os.getpid()}-{safe_name}')
+        with open(f'{base}.collapsed', 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        with open(f'{base}.sql.log', 'w') as f:
+            for offset, statement in statements:
+                f.write(f'{offset * 1000:9.3f} ms  {" ".join(statement.split())}\n')
+        self._prune()
+        return f'{base}.collapsed'
+
+    def list_profiles(self):
+        """Most recent .collapsed files first"""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.collapsed')]
+        except FileNotFoundError:
+            return []
+        return sorted(names, reverse=True)
+
+    def _prune(self):
+        profiles = self.list_profiles()
+        for name in profiles[MAX_PROFILES:]:
+            base = name[:-len('.collapsed')]
+            for suffix in ('.collapsed', '.sql.log'):
+                try:
+                    os.remove(os.path.join(self.directory, base + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+def _fold(frame):
+    """Folded stack, root first: module:function;module:function"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{frame.f_globals.get("__name__", "?")}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+profiler = RequestProfiler()
+
+
+# REQUEST MIX REPLAY
+REQUEST_LINE = re.compile(r'\b(GET|HEAD|POST)\s+(/\S*)')
+
+
+def load_request_mix(path):
+    """(method, path) pairs from an access log or a file of "GET /path" lines"""
+    requests = []
+    with open(path) as f:
+        for line in f:
+            match = REQUEST_LINE.search(line)
+            if match:
+                requests.append((match.group(1), match.group(2)))
+    return requests
+
+
+def replay(app, requests, repeat=1):
+    """Replay requests through the Flask test client under the profiler.
+
+    Returns (stack counts, sql log, {path: [latencies]}).
+    """
+    client = app.test_client()
+    latencies = {}
+    db_manager = profiler.db_manager
+    previous_tracer = db_manager.statement_tracer if db_manager else None
+    if db_manager:
+        db_manager.statement_tracer = profiler._trace_sql
+    try:
+        with profiler.profile() as result:
+            for _ in range(repeat):
+                for method, path in requests:
+                    started = time.perf_counter()
+                    client.open(path, method=method)
+                    latencies.setdefault(path, []).append(time.perf_counter() - started)
+    finally:
+        if db_manager:
+            db_manager.statement_tracer = previous_tracer
+    return result['samples'], result['statements'], latencies
+
+
+# FLASK INTEGRATION
+def init_app(app, db_manager):
+    profiler.db_manager = db_manager
+
+    @app.before_request
+    def maybe_start_profile():
+        if profiler.should_profile():
+            g._profiling = True
+            profiler.start()
+
+    @app.teardown_request
+    def finish_profile(exc):
+        if g.pop('_profiling', False):
+            samples, statements = profiler.stop()
+            profiler.write(request.endpoint or 'unmatched', samples, statements)
@@ -0,0 +1,288 @@
+"""
+Catalog snapshot replication for multi-node deployments.
+
+One writer node (the one serving /admin) publishes the catalog as versioned,
+read-only, gzip-compressed SQLite snapshots to a shared store; any number of
+read nodes pull the newest one and atomically swap it in as their
+DATABASE_PATH:
+
+    writer:  flask publish-snapshots --watch     (next to Gunicorn)
+    reader:  flask follow-snapshots --watch      (next to Gunicorn, with REPLICA_MODE=1)
+
+Snapshots are copied with the SQLite online backup API, so the writer keeps
+serving while one is taken, and each is consistent as of one catalog
+version. Tables that aren't public catalog data (PRIVATE_TABLES) are emptied
+and the file vacuumed before it leaves the writer.
+
+The store is a directory: a shared volume, a mounted bucket or, for local
+testing, any path. manifest.json names the latest snapshot and is replaced
+only after the snapshot itself is in place, so a reader never sees a
+manifest pointing at a partial file.
+
+Read nodes open the database read-only and memory-mapped (see
+DatabaseManager). A swap replaces the file rather than writing into it, so
+open connections finish on the old snapshot and new ones see the new one.
+Admin pages and form posts on a read node are sent to REPLICA_WRITER_URL.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from flask import Response, redirect, request
+
+from database import SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+REPLICA_STORE = os.environ.get('REPLICA_STORE')
+REPLICA_WRITER_URL = os.environ.get('REPLICA_WRITER_URL', '').rstrip('/')
+SNAPSHOT_KEEP = int(os.environ.get('SNAPSHOT_KEEP', 5))
+
+# Not catalog data: never leaves the writer
+PRIVATE_TABLES = ('inquiries', 'image_assets')
+MANIFEST = 'manifest.json'
+SNAPSHOT_PREFIX = 'catalog-'
+BACKUP_PAGES = 256  # pages copied per backup step; writers can commit between steps
+CHUNK_SIZE = 1024 * 1024
+
+
+class DirectoryStore:
+    """Snapshot store backed by a directory, standing in for object storage"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _replace(self, name, write):
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, 0o644)  # mkstemp creates it owner-only
+            os.replace(tmp, os.path.join(self.path, name))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def put(self, name, source_path):
+        with open(source_path, 'rb') as source:
+            self._replace(name, lambda f: shutil.copyfileobj(source, f, CHUNK_SIZE))
+
+    def open(self, name):
+        return open(os.path.join(self.path, name), 'rb')
+
+    def read(self, name):
+        """Object contents, or None if it doesn't exist"""
+        try:
+            with self.open(name) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, name, data):
+        self._replace(name, lambda f: f.write(data))
+
+    def delete(self, name):
+        try:
+            os.unlink(os.path.join(self.path, name))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix=''):
+        """Names under prefix, oldest first"""
+        try:
+            entries = [entry for entry in os.scandir(self.path) if entry.name.startswith(prefix)]
+        except FileNotFoundError:
+            return []
+        return [entry.name for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime)]
+
+
+def build_snapshot(db_path, out_dir):
+    """Back up db_path into a compressed, catalog-only snapshot: (path, catalog version, sha256)"""
+    raw = os.path.join(out_dir, 'snapshot.db')
+    source = sqlite3.connect(f'file:{os.path.abspath(db_path)}?mode=ro', uri=True)
+    target = sqlite3.connect(raw)
+    try:
+        source.backup(target, pages=BACKUP_PAGES, sleep=0.001)
+        version = target.execute('SELECT version FROM catalog_meta').fetchone()[0]
+        for table in PRIVATE_TABLES:
+            target.execute(f'DELETE FROM {table}')
+        target.commit()
+        # A plain rollback-journal file that readers can open immutable, with
+        # the deleted rows' pages gone rather than merely freed
+        target.execute('PRAGMA journal_mode = DELETE')
+        target.execute('VACUUM')
+    finally:
+        target.close()
+        source.close()
+
+    compressed = raw + '.gz'
+    digest = hashlib.sha256()
+    with open(raw, 'rb') as f, open(compressed, 'wb') as out:
+        with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=6, mtime=0) as gz:
+            while chunk := f.read(CHUNK_SIZE):
+                gz.write(chunk)
+    with open(compressed, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return compressed, version, digest.hexdigest()
+
+
+class SnapshotPublisher:
+    """Writer side: publishes a snapshot whenever the catalog version changes"""
+
+    def __init__(self, db_manager, store, keep=SNAPSHOT_KEEP):
+        self.db_manager = db_manager
+        self.store = store
+        self.keep = keep
+
+    def manifest(self):
+        data = self.store.read(MANIFEST)
+        return json.loads(data) if data else None
+
+    def publish(self, force=False):
+        """Publish the current catalog; returns the new manifest, or None if it was already published"""
+        current = self.manifest()
+        if not force and current and current['version'] == self.db_manager.catalog_version():
+            return None
+        with tempfile.TemporaryDirectory() as tmp:
+            path, version, sha256 = build_snapshot(self.db_manager.db_path, tmp)
+            # The digest in the name keeps snapshots distinct even if a restored
+            # database reuses a version number
+            name = f'{SNAPSHOT_PREFIX}v{version:08d}-{sha256[:12]}.db.gz'
+            if current and current['snapshot'] == name:
+                return None
+            self.store.put(name, path)
+            manifest = {
+                'version': version,
+                'snapshot': name,
+                'sha256': sha256,
+                'bytes': os.path.getsize(path),
+                'schema_version': SCHEMA_VERSION,
+                'published_at': time.time(),
+            }
+        self.store.write(MANIFEST, json.dumps(manifest, indent=2).encode())
+        self.prune(name)
+        return manifest
+
+    def prune(self, latest):
+        """Keep the newest `keep` snapshots (readers may still be downloading the previous one)"""
+        names = [name for name in self.store.list(SNAPSHOT_PREFIX) if name != latest]
+        for name in names[:max(0, len(names) - (self.keep - 1))]:
+            self.store.delete(name)
+
+    def watch(self, interval, on_publish=None):
+        while True:
+            try:
+                manifest = self.publish()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning('Snapshot publish failed: %s', e)
+                manifest = None
+            if manifest and on_publish:
+                on_publish(manifest)
+            time.sleep(interval)
+
+
+class SnapshotFollower:
+    """Read node side: installs the newest published snapshot as db_path"""
+
+    def __init__(self, db_path, store):
+        self.db_path = os.path.abspath(db_path)
+        self.store = store
+        self.marker = self.db_path + '.snapshot.json'  # manifest of the installed snapshot
+
+    def installed(self):
+        try:
+            with open(self.marker) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def sync(self):
+        """Install the published snapshot if it differs from ours; returns its manifest, or None"""
+        data = self.store.read(MANIFEST)
+        if not data:
+            return None
+        manifest = json.loads(data)
+        installed = self.installed()
+        if installed and installed['snapshot'] == manifest['snapshot'] and os.path.exists(self.db_path):
+            return None
+        if manifest['schema_version'] < SCHEMA_VERSION:
+            logger.warning('Snapshot %s has schema version %s, this code needs %s; waiting for the writer to upgrade',
+                           manifest['snapshot'], manifest['schema_version'], SCHEMA_VERSION)
+            return None
+
+        directory = os.path.dirname(self.db_path)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.snapshot-')  # same filesystem, so the swap is atomic
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as out, self.store.open(manifest['snapshot']) as source:
+                with gzip.GzipFile(fileobj=_Hashing(source, digest), mode='rb') as gz:
+                    shutil.copyfileobj(gz, out, CHUNK_SIZE)
+                out.flush()
+                os.fsync(out.fileno())
+            if digest.hexdigest() != manifest['sha256']:
+                raise ValueError(f"{manifest['snapshot']}: checksum mismatch")
+            check = sqlite3.connect(f'file:{tmp}?mode=ro', uri=True)
+            try:
+                if check.execute('PRAGMA quick_check').fetchone()[0] != 'ok':
+                    raise ValueError(f"{manifest['snapshot']}: failed integrity check")
+            finally:
+                check.close()
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, self.db_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        with open(self.marker + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(self.marker + '.tmp', self.marker)
+        return manifest
+
+    def watch(self, interval, on_sync=None):
+        while True:
+            try:
+                manifest = self.sync()
+            except (OSError, ValueError, sqlite3.Error) as e:
+                logger.warning('Snapshot sync failed: %s', e)
+                manifest = None
+            if manifest and on_sync:
+                on_sync(manifest)
+            time.sleep(interval)
+
+
+class _Hashing:
+    """File wrapper that hashes what is read through it"""
+
+    def __init__(self, f, digest):
+        self.f = f
+        self.digest = digest
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.digest.update(data)
+        return data
+
+
+def init_app(app, db_manager):
+    """On read nodes, send anything that would write (admin, form posts) to the writer"""
+    if not db_manager.read_only:
+        return
+
+    @app.before_request
+    def forward_writes():
+        if not (request.path.startswith('/admin') or request.method not in ('GET', 'HEAD')):
+            return None
+        if REPLICA_WRITER_URL:
+            query = request.query_string.decode()
+            return redirect(REPLICA_WRITER_URL + request.path + (f'?{query}' if query else ''), code=307)
+        return Response('This is a read-only replica.\n', status=503, mimetype='text/plain')
@@ -0,0 +1,346 @@
+"""
+Resized catalog images: /img/<width>/<path under static/>.
+
+Catalog rows often point at full-size event photos (up to ~500 KB) that are
+shown in 300-400px cards. Templates ask for a width from WIDTHS with
+resized_url() / resized_srcset(); the first request for a width decodes the
+original in a process pool (the same per-process spawn pool pattern as
+images.py), scales it down to that width and stores a WebP in CACHE_DIR.
+Any other width is a 404, so URLs can't be varied to fill the cache or the
+pool.
+
+The cache is bounded (RESIZE_CACHE_MB) and evicts least recently used files.
+Its index is a fixed-size file mapped into every worker: a set-associative
+table of (key, size, last access) slots with the running total in a header.
+Hits look up the slot without locking and stamp its access time; inserts and
+evictions take a thread lock plus flock on a lock file, so Gunicorn workers
+share one cache and one byte count. A cache file is named after its key (a
+hash of path, width, and the source's mtime and size), so replacing the
+original under the same name makes a new entry and the old one ages out.
+
+Hits are sent with send_file, which Gunicorn hands to sendfile(2). URLs
+rendered by resized_url() carry ?v=<source mtime>; those responses are
+cached for a year as immutable, unversioned ones like other static files.
+
+Pillow is optional: without it (or if an image can't be decoded) the
+original file is served instead.
+"""
+import fcntl
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import os
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from flask import abort, request, send_file, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow not installed: serve originals
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+URL_PREFIX = '/img'
+WIDTHS = tuple(sorted({int(width) for width in os.environ.get('RESIZE_WIDTHS', '240,480,800,1200').split(',')}))
+CACHE_DIR = os.environ.get('RESIZE_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'glitzme-resized')
+CACHE_BYTES = int(os.environ.get('RESIZE_CACHE_MB', 256)) * 1024 * 1024
+POOL_WORKERS = int(os.environ.get('RESIZE_WORKERS', 2))
+RESIZE_TIMEOUT = 30  # seconds a request waits for the pool
+SOURCE_FOLDER = 'Images'  # only files under static/Images are resized
+SOURCE_EXTENSIONS = ('.webp', '.jpg', '.jpeg', '.png', '.gif', '.avif')
+WEBP_QUALITY = 82
+EVICT_TO = 0.9  # an over-full cache is trimmed to this share of CACHE_BYTES
+IMMUTABLE_MAX_AGE = 31536000
+STATIC_MAX_AGE = 604800  # as /static/ in add_headers
+EXIF_ORIENTATION = 0x0112
+
+# Index file: a header, then BUCKETS x WAYS slots. A slot with size 0 is free.
+INDEX_MAGIC = b'GZRSZ001'
+HEADER = struct.Struct('<8sIIQ')  # magic, buckets, ways, total bytes
+HEADER_SIZE = 64
+TOTAL_OFFSET = 16
+SLOT = struct.Struct('<16sII8x')  # key digest, file size, last access (unix seconds)
+ACCESS = struct.Struct('<I')
+ACCESS_OFFSET = 20
+BUCKETS = 8192
+WAYS = 8
+
+
+def resize_image(source, target, width):
+    """Write source scaled down to width as a WebP at target; runs in the process pool.
+
+    Returns the size of the written file.
+    """
+    tmp_path = f'{target}.{os.getpid()}.tmp'
+    with Image.open(source) as image:
+        # Quarter turns swap the sides, so bound whichever one ends up horizontal
+        turned = image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8)
+        if image.format == 'WEBP' and (image.height if turned else image.width) <= width:
+            image.close()
+            with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+                dst.write(src.read())  # already small enough: keep the original encoding
+        else:
+            # thumbnail() only shrinks and lets JPEG decode at a reduced scale
+            image.thumbnail((1 << 16, width) if turned else (width, 1 << 16))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            image.save(tmp_path, format='WEBP', quality=WEBP_QUALITY, method=4)
+    os.replace(tmp_path, target)
+    return os.path.getsize(target)
+
+
+class DiskIndex:
+    """LRU bookkeeping for the cache directory, shared between processes through mmap"""
+
+    def __init__(self, directory, capacity_bytes):
+        self.directory = directory
+        self.capacity_bytes = capacity_bytes
+        self.path = os.path.join(directory, 'index.bin')
+        self._size = HEADER_SIZE + BUCKETS * WAYS * SLOT.size
+        self._map = None
+        self._lock_fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def file_path(self, key):
+        return os.path.join(self.directory, f'{key.hex()}.webp')
+
+    def _mapped(self):
+        # flock belongs to the open file and the mapping to the process, so each
+        # Gunicorn worker opens its own after fork
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._lock_fd = os.open(os.path.join(self.directory, 'index.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+                    try:
+                        self._map = self._open_map()
+                    finally:
+                        fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+                    self._pid = os.getpid()
+        return self._map
+
+    def _open_map(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fresh = os.fstat(fd).st_size != self._size
+            if not fresh:
+                with mmap.mmap(fd, HEADER_SIZE) as header:
+                    fresh = HEADER.unpack_from(header)[:3] != (INDEX_MAGIC, BUCKETS, WAYS)
+            if fresh:
+                # New or incompatible index: files it doesn't know about would never be evicted
+                for name in os.listdir(self.directory):
+                    if name.endswith(('.webp', '.tmp')):
+                        os.remove(os.path.join(self.directory, name))
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self._size)
+            mapped = mmap.mmap(fd, self._size)
+            if fresh:
+                HEADER.pack_into(mapped, 0, INDEX_MAGIC, BUCKETS, WAYS, 0)
+            return mapped
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def _locked(self):
+        mapped = self._mapped()
+        with self._lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield mapped
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _slots(key):
+        bucket = int.from_bytes(key[:4], 'little') % BUCKETS
+        start = HEADER_SIZE + bucket * WAYS * SLOT.size
+        return range(start, start + WAYS * SLOT.size, SLOT.size)
+
+    def touch(self, key):
+        """Mark key as used now; False if it isn't cached"""
+        mapped = self._mapped()
+        for offset in self._slots(key):
+            slot_key, size, _ = SLOT.unpack_from(mapped, offset)
+            if size and slot_key == key:
+                ACCESS.pack_into(mapped, offset + ACCESS_OFFSET, int(time.time()))
+                return True
+        return False
+
+    def add(self, key, size):
+        """Record a cache file, evicting least recently used ones to stay within capacity"""
+        with self._locked() as mapped:
+            total = struct.unpack_from('<Q', mapped, TOTAL_OFFSET)[0]
+            target = None
+            for offset in self._slots(key):
+                slot_key, slot_size, accessed = SLOT.unpack_from(mapped, offset)
+                if slot_size and slot_key == key:
+                    target, total = offset, total - slot_size  # written again by another worker
+                    break
+                if not slot_size and target is None:
+                    target = offset
+            if target is None:
+                # Bucket full: its least recently used entry makes room
+                target = min(self._slots(key), key=lambda offset: SLOT.unpack_from(mapped, offset)[2])
+                total -= self._evict(mapped, target)
+            SLOT.pack_into(mapped, target, key, size, int(time.time()))
+            total += size
+            if total > self.capacity_bytes:
+                total = self._trim(mapped, total, key)
+            struct.pack_into('<Q', mapped, TOTAL_OFFSET, total)
+
+    def _evict(self, mapped, offset):
+        slot_key, size, _ = SLOT.unpack_from(mapped, offset)
+        SLOT.pack_into(mapped, offset, bytes(16), 0, 0)
+        try:
+            os.remove(self.file_path(slot_key))
+        except FileNotFoundError:
+            pass
+        return size
+
+    def _trim(self, mapped, total, keep):
+        used = [(accessed, offset)
+                for offset, (slot_key, size, accessed) in zip(
+                    range(HEADER_SIZE, self._size, SLOT.size),
+                    SLOT.iter_unpack(memoryview(mapped)[HEADER_SIZE:]))
+                if size and slot_key != keep]
+        for _, offset in sorted(used):
+            if total <= self.capacity_bytes * EVICT_TO:
+                break
+            total -= self._evict(mapped, offset)
+        return total
+
+    def stats(self):
+        """(entries, total bytes) currently recorded"""
+        mapped = self._mapped()
+        entries = sum(1 for _, size, _ in SLOT.iter_unpack(memoryview(mapped)[HEADER_SIZE:]) if size)
+        return entries, struct.unpack_from('<Q', mapped, TOTAL_OFFSET)[0]
+
+
+class Resizer:
+    """Serves /img/<width>/<path>, resizing on a miss"""
+
+    def __init__(self, static_folder, cache_dir=CACHE_DIR, capacity_bytes=CACHE_BYTES):
+        self.static_folder = static_folder
+        self.index = DiskIndex(cache_dir, capacity_bytes)
+        self._pool = None
+        self._pool_pid = None
+        self._pending = {}  # key -> future, so concurrent misses share one resize
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # As ImageProcessor: one spawn pool per Gunicorn worker, started on first use
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ProcessPoolExecutor(max_workers=POOL_WORKERS,
+                                             mp_context=multiprocessing.get_context('spawn'))
+            self._pool_pid = os.getpid()
+            self._pending = {}
+        return self._pool
+
+    def source(self, path):
+        """(absolute path, os.stat_result) of a resizable original, or None"""
+        if not path.startswith(f'{SOURCE_FOLDER}/') or not path.lower().endswith(SOURCE_EXTENSIONS):
+            return None
+        source = safe_join(self.static_folder, path)
+        try:
+            return source, os.stat(source)
+        except (TypeError, OSError):  # safe_join refused the path, or no such file
+            return None
+
+    @staticmethod
+    def version(stat):
+        return format(stat.st_mtime_ns // 1000000, 'x')
+
+    @staticmethod
+    def key(path, width, stat):
+        return hashlib.blake2b(f'{path}\0{width}\0{stat.st_mtime_ns}\0{stat.st_size}'.encode(),
+                               digest_size=16).digest()
+
+    def url(self, path, width):
+        """URL of path (relative to static/) at width, versioned by the source's mtime"""
+        found = self.source(path) if width in WIDTHS else None
+        if found is None:
+            return url_for('static', filename=path)
+        return url_for('resized_image', width=width, path=path, v=self.version(found[1]))
+
+    def srcset(self, path, *widths):
+        """srcset value listing path at each width"""
+        return ', '.join(f'{self.url(path, width)} {width}w' for width in widths)
+
+    def _resize(self, key, source, width):
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor().submit(resize_image, source, self.index.file_path(key), width)
+                self._pending[key] = future
+        try:
+            size = future.result(timeout=RESIZE_TIMEOUT)
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None  # a pool process died (OOM kill, say): start a new pool next time
+            raise
+        finally:
+            with self._lock:
+                if self._pending.get(key) is future and future.done():
+                    del self._pending[key]
+        self.index.add(key, size)
+
+    def _send(self, key, stat):
+        try:
+            return send_file(self.index.file_path(key), mimetype='image/webp', etag=key.hex(),
+                             last_modified=stat.st_mtime, conditional=True)
+        except FileNotFoundError:  # evicted by another worker meanwhile
+            return None
+
+    def respond(self, width, path):
+        found = self.source(path)
+        if width not in WIDTHS or found is None:
+            abort(404)
+        source, stat = found
+        key = self.key(path, width, stat)
+        response = None
+        if Image is not None:
+            if self.index.touch(key):
+                response = self._send(key, stat)
+            if response is None:
+                try:
+                    self._resize(key, source, width)
+                except Exception as e:  # undecodable image, broken or busy pool: serve the original
+                    logger.warning('Could not resize %s to %spx: %s', path, width, e)
+                else:
+                    response = self._send(key, stat)
+        if response is None:
+            response = send_from_directory(self.static_folder, path, conditional=True)
+
+        # add_headers leaves /img/ responses alone
+        response.cache_control.public = True
+        if request.args.get('v') == self.version(stat):
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.max_age = STATIC_MAX_AGE
+        return response
+
+
+def init_app(app):
+    resizer = Resizer(app.static_folder)
+
+    @app.route(f'{URL_PREFIX}/<int:width>/<path:path>')
+    def resized_image(width, path):
+        """An image under static/Images scaled down to one of the allowed widths"""
+        return resizer.respond(width, path)
+
+    app.add_template_global(resizer.url, 'resized_url')
+    app.add_template_global(resizer.srcset, 'resized_srcset')
+    return resizer
@@ -0,0 +1,72 @@
+"""
+Site settings form handling for /admin/settings.
+
+Each setting row carries a setting_type (text, textarea, email, url); the
+submitted value is checked against it before anything is written. A save
+writes only the settings whose value actually changed, in one transaction
+(DatabaseManager.update_site_settings), so the catalog version moves once per
+save and every worker drops its cached pages and settings together.
+
+A blank field leaves the stored value as it is.
+"""
+import re
+from urllib.parse import urlsplit
+
+EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+MAX_LENGTH = {'text': 300, 'textarea': 5000}
+DEFAULT_MAX_LENGTH = 1000
+
+
+def _check_email(value):
+    return None if EMAIL.match(value) else 'must be an email address'
+
+
+def _check_url(value):
+    parts = urlsplit(value)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return 'must be a full http(s) URL'
+    return None
+
+
+def _check_single_line(value):
+    return 'must be a single line' if '\n' in value or '\r' in value else None
+
+
+CHECKS = {
+    'text': _check_single_line,
+    'email': _check_email,
+    'url': _check_url,
+}
+
+
+def validate(setting, value):
+    """Error message for value under setting's type, or None if it is acceptable"""
+    limit = MAX_LENGTH.get(setting.setting_type, DEFAULT_MAX_LENGTH)
+    if len(value) > limit:
+        return f'must be at most {limit} characters'
+    check = CHECKS.get(setting.setting_type)
+    return check(value) if check else None
+
+
+def parse(form, settings):
+    """({key: value} to write, {key: error}) for a submitted form.
+
+    Only keys of existing settings that appear in the form are considered,
+    and values equal to the stored ones are dropped here already.
+    """
+    changes, errors = {}, {}
+    for setting in settings:
+        value = (form.get(setting.setting_key) or '').strip()
+        if not value or value == setting.setting_value:
+            continue
+        error = validate(setting, value)
+        if error:
+            errors[setting.setting_key] = error
+        else:
+            changes[setting.setting_key] = value
+    return changes, errors
+
+
+def label(setting):
+    """Human name for a setting in messages"""
+    return setting.description or setting.setting_key.replace('_', ' ').capitalize()
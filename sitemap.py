@@ -0,0 +1,145 @@
+"""
+Sitemap generation from the catalog.
+
+Entries carry real lastmod values: the newest updated_at of the rows shown
+on a page, or the template's modification time for static pages. Output is
+streamed straight into a gzip compressor and cached per catalog version.
+The cached bytes are served as-is, with an ETag.
+
+Catalogs over MAX_URLS_PER_SITEMAP entries are split into numbered chunks
+behind a sitemap index, as the sitemaps.org protocol requires.
+"""
+import gzip
+import hashlib
+import io
+import os
+import threading
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+MAX_URLS_PER_SITEMAP = 50000
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def _w3c(timestamp):
+    """'YYYY-MM-DD HH:MM:SS' (SQLite CURRENT_TIMESTAMP, UTC) or epoch seconds -> W3C datetime"""
+    if timestamp is None:
+        return None
+    if isinstance(timestamp, (int, float)):
+        moment = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    else:
+        moment = datetime.strptime(str(timestamp)[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+
+class SitemapBuilder:
+    """Builds gzipped sitemap documents, cached per catalog version"""
+
+    def __init__(self, db_manager, base_url, items_per_page, template_folder, static_folder):
+        self.db_manager = db_manager
+        self.base_url = base_url.rstrip('/')
+        self.items_per_page = items_per_page
+        self.template_folder = template_folder
+        self.static_folder = static_folder
+        self._cache = (None, {})  # (catalog version, {document name: (gzipped bytes, digest)})
+        self._lock = threading.Lock()
+
+    # ENTRIES
+    def _mtime(self, *parts):
+        try:
+            return os.path.getmtime(os.path.join(*parts))
+        except OSError:
+            return None
+
+    def _listing_entries(self, path, items):
+        """One entry per paginated listing page, dated by its newest item"""
+        pages = max(1, (len(items) + self.items_per_page - 1) // self.items_per_page)
+        for page in range(1, pages + 1):
+            page_items = items[(page - 1) * self.items_per_page:page * self.items_per_page]
+            lastmod = max((item.updated_at for item in page_items if item.updated_at), default=None)
+            loc = path if page == 1 else f'{path}?page={page}'
+            yield loc, _w3c(lastmod), 'weekly', '0.8' if page == 1 else '0.6'
+
+    def _item_entries(self, path, items):
+        for item in items:
+            yield f'{path}/{item.id}', _w3c(item.updated_at), 'monthly', '0.5'
+
+    def entries(self):
+        """Yield (path, lastmod, changefreq, priority) for every public URL"""
+        team = self.db_manager.get_team_members()
+        settings_updated = self.db_manager.get_site_settings_updated_at()
+        home_lastmod = max(filter(None, [settings_updated] + [member.updated_at for member in team]), default=None)
+        yield '/', _w3c(home_lastmod), 'weekly', '1.0'
+        rental_items = self.db_manager.get_rental_items()
+        package_items = self.db_manager.get_package_items()
+        yield from self._listing_entries('/rentals', rental_items)
+        yield from self._listing_entries('/packages', package_items)
+        yield from self._item_entries('/rentals', rental_items)
+        yield from self._item_entries('/packages', package_items)
+        yield '/about', _w3c(self._mtime(self.template_folder, 'about.html')), 'monthly', '0.6'
+        yield '/gallery', _w3c(self._mtime(self.static_folder, 'Images', 'EventPhotos')), 'weekly', '0.7'
+        yield '/contact', _w3c(self._mtime(self.template_folder, 'contact.html')), 'monthly', '0.5'
+
+    # DOCUMENTS
+    def _render(self, write_lines):
+        """Stream lines from write_lines into gzip; returns (gzipped bytes, content digest)"""
+        buffer = io.BytesIO()
+        digest = hashlib.sha1()
+        # mtime=0 keeps the gzip bytes identical for identical content
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as out:
+            for line in write_lines():
+                data = line.encode('utf-8')
+                digest.update(data)
+                out.write(data)
+        return buffer.getvalue(), digest.hexdigest()
+
+    def _urlset(self, entries):
+        def lines():
+            yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+            yield f'<urlset xmlns="{SITEMAP_NS}">\n'
+            for path, lastmod, changefreq, priority in entries:
+                yield '    <url>\n'
+                yield f'        <loc>{escape(self.base_url + path)}</loc>\n'
+                if lastmod:
+                    yield f'        <lastmod>{lastmod}</lastmod>\n'
+                yield f'        <changefreq>{changefreq}</changefreq>\n'
+                yield f'        <priority>{priority}</priority>\n'
+                yield '    </url>\n'
+            yield '</urlset>\n'
+        return lines
+
+    def _index(self, chunks):
+        def lines():
+            yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+            yield f'<sitemapindex xmlns="{SITEMAP_NS}">\n'
+            for number, chunk in enumerate(chunks, start=1):
+                lastmod = max((entry[1] for entry in chunk if entry[1]), default=None)
+                yield '    <sitemap>\n'
+                yield f'        <loc>{escape(self.base_url)}/sitemap-{number}.xml</loc>\n'
+                if lastmod:
+                    yield f'        <lastmod>{lastmod}</lastmod>\n'
+                yield '    </sitemap>\n'
+            yield '</sitemapindex>\n'
+        return lines
+
+    def _build(self):
+        entries = list(self.entries())
+        if len(entries) <= MAX_URLS_PER_SITEMAP:
+            return {'sitemap.xml': self._render(self._urlset(entries))}
+        chunks = [entries[i:i + MAX_URLS_PER_SITEMAP] for i in range(0, len(entries), MAX_URLS_PER_SITEMAP)]
+        documents = {'sitemap.xml': self._render(self._index(chunks))}
+        for number, chunk in enumerate(chunks, start=1):
+            documents[f'sitemap-{number}.xml'] = self._render(self._urlset(chunk))
+        return documents
+
+    def get(self, name):
+        """(gzipped bytes, content digest) for a sitemap document, or None if it doesn't exist"""
+        version = self.db_manager.catalog_version()
+        cached_version, documents = self._cache
+        if cached_version != version:
+            with self._lock:
+                cached_version, documents = self._cache
+                if cached_version != version:
+                    documents = self._build()
+                    self._cache = (version, documents)
+        return documents.get(name)
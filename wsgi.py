@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module warms templates and the catalog cache; with
+preload_app enabled that happens once in the Gunicorn master.
+"""
+from app import app, warm_start
+
+warm_start()